@@ -0,0 +1,214 @@
+"""Offline fit/predict benchmarks on synthetic data, compared with stored baselines.
+
+Usage:
+
+    python benchmarks/run_benchmarks.py --save benchmarks/baselines.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baselines.json
+
+The first command records the best of `--repeat` timings of every case (keeping
+the baselines of the cases that were not run); the second one times them again
+and exits with status 1 when a case is slower than its baseline by more than
+`--tolerance` (relative), when a case has no baseline or when PATH does not exist
+(`--allow-missing` skips these cases instead). Baselines depend on the machine,
+so record them on the machine that runs the comparison (see `make
+benchmark-baseline` and `make benchmark`): benchmarks/baselines.json has no
+cases until then. Every run also exits with status 1 when packed weights
+("sign" or "int8") predict slower than uniform weights by more than
+`--tolerance`. `-k` selects the cases whose name contains the given string, and
+`--quick` keeps the smallest sizes only.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+from time import perf_counter
+
+import numpy as np
+from sklearn.datasets import make_classification, make_regression
+
+from genbooster.adaboostregressor import AdaBoostRegressor
+from genbooster.genboosterclassifier import BoosterClassifier
+from genbooster.genboosterregressor import BoosterRegressor
+from genbooster.randombagregressor import RandomBagRegressor
+from genbooster.regressionmodels import LinfaRegressor
+
+N_SAMPLES = [1000, 10000]
+N_FEATURES = [10, 100]
+N_ESTIMATORS = [10, 100]
+DIRECT_LINK = [True, False]
+# Packed weights, whose predictions must be no slower than with uniform weights
+PACKED_DISTRIBUTIONS = ["sign", "int8"]
+
+# Staged models: name, constructor, task. Early stopping is disabled so that
+# every case fits the same number of stages.
+MODELS = [
+    ("BoosterRegressor[rust_extratree]",
+     lambda **params: BoosterRegressor(base_estimator="rust_extratree", tolerance=0.0, **params),
+     "regression"),
+    ("BoosterRegressor[LinfaRegressor]",
+     lambda **params: BoosterRegressor(base_estimator=LinfaRegressor(), tolerance=0.0, **params),
+     "regression"),
+    ("BoosterClassifier[rust_extratree]",
+     lambda **params: BoosterClassifier(base_estimator="rust_extratree", tolerance=0.0, **params),
+     "classification"),
+    ("RandomBagRegressor[rust_extratree]",
+     lambda **params: RandomBagRegressor(base_estimator="rust_extratree", **params),
+     "regression"),
+    ("AdaBoostRegressor[rust_extratree]",
+     lambda **params: AdaBoostRegressor(base_estimator="rust_extratree", tolerance=0.0, **params),
+     "regression"),
+]
+
+
+def make_data(task: str, n_samples: int, n_features: int):
+    """Synthetic data set (the same for a given task and size)."""
+    if task == "classification":
+        return make_classification(n_samples=n_samples, n_features=n_features,
+                                   n_informative=min(n_features, 5), random_state=42)
+    return make_regression(n_samples=n_samples, n_features=n_features, noise=1.0, random_state=42)
+
+
+def make_cases(quick: bool = False) -> list:
+    """Benchmark cases as (name, model factory, task, n_samples, n_features)."""
+    sizes = lambda values: values[:1] if quick else values
+    cases = []
+    for name, make_model, task in MODELS:
+        grid = itertools.product(sizes(N_SAMPLES), sizes(N_FEATURES), sizes(N_ESTIMATORS), DIRECT_LINK)
+        for n_samples, n_features, n_estimators, direct_link in grid:
+            params = {"n_estimators": n_estimators, "direct_link": direct_link, "random_state": 42}
+            case = f"{name}-n{n_samples}-p{n_features}-s{n_estimators}-dl{int(direct_link)}"
+            factory = lambda make_model=make_model, params=params: make_model(**params)
+            cases.append((case, factory, task, n_samples, n_features))
+    for n_samples, n_features in itertools.product(sizes(N_SAMPLES), sizes(N_FEATURES)):
+        cases.append((f"LinfaRegressor-n{n_samples}-p{n_features}", LinfaRegressor,
+                      "regression", n_samples, n_features))
+    # Hidden layers of packed and uniform weights, with a cheap base learner
+    grid = itertools.product(["uniform"] + PACKED_DISTRIBUTIONS, sizes(N_SAMPLES), sizes(N_FEATURES),
+                             sizes(N_ESTIMATORS))
+    for distribution, n_samples, n_features, n_estimators in grid:
+        params = {"n_estimators": n_estimators, "n_hidden_features": 50, "weights_distribution": distribution,
+                  "random_state": 42}
+        factory = lambda params=params: BoosterRegressor(base_estimator=LinfaRegressor(), tolerance=0.0, **params)
+        cases.append((f"BoosterRegressor[{distribution}]-n{n_samples}-p{n_features}-s{n_estimators}", factory,
+                      "regression", n_samples, n_features))
+    return cases
+
+
+def time_case(make_model, X, y, repeat: int) -> dict:
+    """Best fit and predict times (in seconds) over `repeat` runs."""
+    fit_times, predict_times = [], []
+    for _ in range(repeat):
+        model = make_model()
+        start = perf_counter()
+        model.fit(X, y)
+        fit_times.append(perf_counter() - start)
+        start = perf_counter()
+        model.predict(X)
+        predict_times.append(perf_counter() - start)
+    return {"fit": min(fit_times), "predict": min(predict_times)}
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list:
+    """(case, phase, ratio) of the timings slower than their baseline by more than tolerance."""
+    slower = []
+    for case, timings in results.items():
+        for phase, seconds in timings.items():
+            baseline = baselines.get(case, {}).get(phase)
+            if baseline:
+                ratio = seconds / baseline
+                if ratio > 1.0 + tolerance:
+                    slower.append((case, phase, ratio))
+    return slower
+
+
+def compare_packed(results: dict, tolerance: float) -> list:
+    """(case, "predict", ratio) of the packed weights cases predicting slower than the
+    same case with uniform weights by more than tolerance."""
+    slower = []
+    for distribution in PACKED_DISTRIBUTIONS:
+        prefix = f"BoosterRegressor[{distribution}]-"
+        for case, timings in results.items():
+            uniform = results.get(case.replace(prefix, "BoosterRegressor[uniform]-", 1))
+            if case.startswith(prefix) and uniform:
+                ratio = timings["predict"] / uniform["predict"]
+                if ratio > 1.0 + tolerance:
+                    slower.append((case, "predict", ratio))
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", metavar="PATH", help="write the timings as baselines to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="compare the timings with the baselines in PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative slowdown reported as a regression (default: 0.25)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the best is kept (default: 3)")
+    parser.add_argument("-k", dest="keyword", default="", help="only run the cases whose name contains KEYWORD")
+    parser.add_argument("--quick", action="store_true", help="only run the smallest sizes")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="skip the cases without a baseline (or a missing PATH) instead of failing")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            # Nothing to compare with: a failure unless explicitly allowed
+            print(f"no baselines in {args.compare} (record them on this machine with --save "
+                  "or `make benchmark-baseline`)", file=sys.stderr)
+            if not args.allow_missing:
+                return 1
+            stored = {"machine": platform.platform(), "cases": {}}
+        if stored.get("machine") not in (None, platform.platform()):
+            print(f"warning: baselines recorded on {stored.get('machine')}", file=sys.stderr)
+        baselines = stored["cases"]
+
+    results = {}
+    data = {}
+    for case, make_model, task, n_samples, n_features in make_cases(args.quick):
+        if args.keyword not in case:
+            continue
+        key = (task, n_samples, n_features)
+        if key not in data:
+            data[key] = make_data(*key)
+        X, y = data[key]
+        results[case] = time_case(make_model, np.asarray(X), y, args.repeat)
+        timings = results[case]
+        line = f"{case:<60} fit {timings['fit']:9.4f}s  predict {timings['predict']:9.4f}s"
+        if case in baselines:
+            line += "  ({:.2f}x, {:.2f}x)".format(*(timings[phase] / baselines[case][phase]
+                                                   for phase in ("fit", "predict")))
+        print(line, flush=True)
+
+    if args.save:
+        # Cases that were not run keep their baselines
+        try:
+            with open(args.save) as f:
+                saved = json.load(f)["cases"]
+        except FileNotFoundError:
+            saved = {}
+        saved.update(results)
+        with open(args.save, "w") as f:
+            json.dump({"machine": platform.platform(), "cases": saved}, f, indent=2, sort_keys=True)
+
+    missing = [case for case in results if args.compare and case not in baselines]
+    for case in missing:
+        print(f"{'skipped' if args.allow_missing else 'MISSING'}: {case} has no baseline in {args.compare}",
+              file=sys.stderr)
+    if args.allow_missing:
+        missing = []
+    slower = compare(results, baselines, args.tolerance)
+    for case, phase, ratio in slower:
+        print(f"SLOWER: {case} {phase} {ratio:.2f}x baseline", file=sys.stderr)
+    slower_packed = compare_packed(results, args.tolerance)
+    for case, phase, ratio in slower_packed:
+        print(f"SLOWER: {case} {phase} {ratio:.2f}x uniform weights", file=sys.stderr)
+    return 1 if slower or slower_packed or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
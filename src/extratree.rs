@@ -0,0 +1,232 @@
+use rand::seq::SliceRandom;
+use rand::Rng;
+
+/// Marker stored in `feature`, `left` and `right` for leaf nodes
+/// (same convention as scikit-learn's `tree_.children_left`).
+pub const TREE_LEAF: i64 = -1;
+
+// Features whose range in a node is below this value are not split on
+const FEATURE_THRESHOLD: f64 = 1e-7;
+
+/// Read access to a `(n_samples, n_features)` matrix of base learner inputs.
+pub trait Features {
+    fn n_rows(&self) -> usize;
+    fn n_cols(&self) -> usize;
+    fn get(&self, row: usize, col: usize) -> f64;
+}
+
+#[derive(Clone, Copy, Debug)]
+pub struct ExtraTreeParams {
+    pub max_depth: Option<usize>,
+    pub min_samples_split: usize,
+    pub min_samples_leaf: usize,
+    pub max_features: Option<usize>,
+}
+
+impl Default for ExtraTreeParams {
+    // Same defaults as sklearn.tree.ExtraTreeRegressor
+    fn default() -> Self {
+        ExtraTreeParams {
+            max_depth: None,
+            min_samples_split: 2,
+            min_samples_leaf: 1,
+            max_features: None,
+        }
+    }
+}
+
+/// Regression tree with randomly drawn split thresholds, stored as flat node arrays.
+/// `value` holds `n_outputs` consecutive leaf values per node.
+#[derive(Clone, Debug, Default)]
+pub struct ExtraTreeRegressor {
+    pub n_outputs: usize,
+    pub feature: Vec<i64>,
+    pub threshold: Vec<f64>,
+    pub left: Vec<i64>,
+    pub right: Vec<i64>,
+    pub value: Vec<f64>,
+}
+
+impl ExtraTreeRegressor {
+    /// `y` is a row-major `(n_samples, n_outputs)` matrix.
+    pub fn fit<F: Features, R: Rng>(
+        params: &ExtraTreeParams,
+        x: &F,
+        y: &[f64],
+        n_outputs: usize,
+        sample_weight: Option<&[f64]>,
+        rng: &mut R,
+    ) -> Self {
+        let mut tree = ExtraTreeRegressor {
+            n_outputs,
+            ..Default::default()
+        };
+        let n_samples = x.n_rows();
+        let n_features = x.n_cols();
+        let max_features = params.max_features.unwrap_or(n_features).min(n_features).max(1);
+        let weight = |i: usize| sample_weight.map_or(1.0, |w| w[i]);
+        let target = |i: usize| &y[i * n_outputs..(i + 1) * n_outputs];
+
+        let mut indices: Vec<usize> = (0..n_samples).collect();
+        let mut features: Vec<usize> = (0..n_features).collect();
+        let mut wy_sum = vec![0.0; n_outputs];
+        let mut wy_left = vec![0.0; n_outputs];
+        // (node, start, end, depth): the node's samples are indices[start..end]
+        let mut stack: Vec<(usize, usize, usize, usize)> = Vec::new();
+        if n_samples > 0 {
+            let root = tree.add_node();
+            stack.push((root, 0, n_samples, 0));
+        }
+
+        while let Some((node, start, end, depth)) = stack.pop() {
+            let (mut w_sum, mut wyy_sum) = (0.0, 0.0);
+            wy_sum.fill(0.0);
+            for &i in &indices[start..end] {
+                let w = weight(i);
+                w_sum += w;
+                for (acc, &yi) in wy_sum.iter_mut().zip(target(i)) {
+                    *acc += w * yi;
+                    wyy_sum += w * yi * yi;
+                }
+            }
+            let mut impurity = 0.0;
+            if w_sum > 0.0 {
+                let node_value = &mut tree.value[node * n_outputs..(node + 1) * n_outputs];
+                for (v, &wy) in node_value.iter_mut().zip(&wy_sum) {
+                    *v = wy / w_sum;
+                    impurity -= *v * *v;
+                }
+                impurity += wyy_sum / w_sum;
+            }
+
+            let n_node = end - start;
+            let is_leaf = n_node < params.min_samples_split
+                || n_node < 2 * params.min_samples_leaf
+                || params.max_depth.map_or(false, |d| depth >= d)
+                || w_sum <= 0.0
+                || impurity <= f64::EPSILON;
+            if is_leaf {
+                continue;
+            }
+
+            // Draw one random threshold per candidate feature and keep the split
+            // with the largest weighted variance reduction (summed over outputs)
+            let mut best: Option<(usize, f64, f64)> = None;
+            let mut n_visited = 0;
+            features.shuffle(rng);
+            for &f in features.iter() {
+                if n_visited >= max_features {
+                    break;
+                }
+                let (mut lo, mut hi) = (f64::INFINITY, f64::NEG_INFINITY);
+                for &i in &indices[start..end] {
+                    let v = x.get(i, f);
+                    lo = lo.min(v);
+                    hi = hi.max(v);
+                }
+                if hi <= lo + FEATURE_THRESHOLD {
+                    continue;
+                }
+                n_visited += 1;
+
+                let mut threshold = lo + rng.gen::<f64>() * (hi - lo);
+                if threshold >= hi {
+                    threshold = lo;
+                }
+                let (mut n_left, mut w_left) = (0usize, 0.0);
+                wy_left.fill(0.0);
+                for &i in &indices[start..end] {
+                    if x.get(i, f) <= threshold {
+                        let w = weight(i);
+                        n_left += 1;
+                        w_left += w;
+                        for (acc, &yi) in wy_left.iter_mut().zip(target(i)) {
+                            *acc += w * yi;
+                        }
+                    }
+                }
+                let n_right = n_node - n_left;
+                let w_right = w_sum - w_left;
+                if n_left < params.min_samples_leaf
+                    || n_right < params.min_samples_leaf
+                    || w_left <= 0.0
+                    || w_right <= 0.0
+                {
+                    continue;
+                }
+                let proxy: f64 = wy_left
+                    .iter()
+                    .zip(&wy_sum)
+                    .map(|(&l, &total)| l * l / w_left + (total - l) * (total - l) / w_right)
+                    .sum();
+                if best.map_or(true, |(_, _, b)| proxy > b) {
+                    best = Some((f, threshold, proxy));
+                }
+            }
+
+            let (f, threshold) = match best {
+                Some((f, threshold, _)) => (f, threshold),
+                None => continue,
+            };
+            // Partition the node's samples in place: left child first
+            let node_indices = &mut indices[start..end];
+            let mut mid = 0;
+            for k in 0..node_indices.len() {
+                if x.get(node_indices[k], f) <= threshold {
+                    node_indices.swap(k, mid);
+                    mid += 1;
+                }
+            }
+            let left = tree.add_node();
+            let right = tree.add_node();
+            tree.feature[node] = f as i64;
+            tree.threshold[node] = threshold;
+            tree.left[node] = left as i64;
+            tree.right[node] = right as i64;
+            stack.push((right, start + mid, end, depth + 1));
+            stack.push((left, start, start + mid, depth + 1));
+        }
+        tree
+    }
+
+    /// Row-major `(n_samples, n_outputs)` predictions.
+    pub fn predict<F: Features>(&self, x: &F) -> Vec<f64> {
+        let mut predictions = Vec::with_capacity(x.n_rows() * self.n_outputs);
+        for row in 0..x.n_rows() {
+            match self.apply_row(x, row) {
+                Some(node) => predictions.extend_from_slice(self.node_value(node)),
+                None => predictions.extend(std::iter::repeat(0.0).take(self.n_outputs)),
+            }
+        }
+        predictions
+    }
+
+    // Leaf reached by one sample (None for an empty tree)
+    fn apply_row<F: Features>(&self, x: &F, row: usize) -> Option<usize> {
+        if self.left.is_empty() {
+            return None;
+        }
+        let mut node = 0;
+        while self.left[node] != TREE_LEAF {
+            node = if x.get(row, self.feature[node] as usize) <= self.threshold[node] {
+                self.left[node] as usize
+            } else {
+                self.right[node] as usize
+            };
+        }
+        Some(node)
+    }
+
+    fn node_value(&self, node: usize) -> &[f64] {
+        &self.value[node * self.n_outputs..(node + 1) * self.n_outputs]
+    }
+
+    fn add_node(&mut self) -> usize {
+        self.feature.push(TREE_LEAF);
+        self.threshold.push(0.0);
+        self.left.push(TREE_LEAF);
+        self.right.push(TREE_LEAF);
+        self.value.extend(std::iter::repeat(0.0).take(self.n_outputs));
+        self.left.len() - 1
+    }
+}
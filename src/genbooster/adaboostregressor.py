@@ -3,7 +3,10 @@ import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, RegressorMixin
 from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
 from sklearn.tree import ExtraTreeRegressor
+from .sparse import make_scaler, scale_inputs
+from .memory import memory_usage
 try:
     from .rust_core import AdaBoostRegressor as _AdaBoostRegressor
 except ImportError:
@@ -17,7 +20,8 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
     
     Parameters:
 
-        base_estimator: Base learner to use for the booster.
+        base_estimator: Base learner to use for the booster, or "rust_extratree" 
+        for the native Rust extra tree (fit and predict then stay in Rust).
 
         n_estimators: Number of boosting stages to perform.
 
@@ -27,13 +31,53 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
 
         direct_link: Whether to use direct link for the base learner or not.
 
-        weights_distribution: Distribution of the weights for the booster (uniform or normal).
+        weights_distribution: Distribution of the weights for the booster (uniform or normal), 
+        or a structured random projection: "achlioptas" or "very_sparse" (sparse signed
+        weights, applied with a sparse kernel) or "srht" (subsampled randomized Hadamard 
+        transform, applied with a fast Walsh-Hadamard transform when cheaper than a dense product), 
+        or packed weights: "sign" (+1 or -1, stored as bits) or "int8" (k / 127 for an integer 
+        k, stored as bytes), unpacked for the matrix products of predictions.
 
         dropout: Dropout rate.
 
+        subsample: Fraction of the training samples each stage's base learner is fitted 
+        on, drawn without replacement. The errors and sample weights of all samples are 
+        still updated.
+
+        colsample: Fraction of the input features each stage sees, drawn without 
+        replacement, for both its hidden layer and its direct link.
+
+        compact_weights: Whether to store one seed per stage instead of its hidden layer 
+        weights, which are then regenerated when predicting (the model size is then 
+        mostly the base learners, at the cost of slower predictions).
+
+        weights_cache_size: Number of regenerated stage weights kept in memory with 
+        compact_weights (the least recently used are dropped first).
+
         tolerance: Tolerance for early stopping.
 
         random_state: Random state.
+
+        validation_fraction: Proportion of the training data set aside for early stopping 
+        (only used when n_iter_no_change is not None).
+
+        n_iter_no_change: Number of stages without improvement of the validation loss 
+        (by more than tolerance) before stopping. None disables validation-based early stopping.
+
+        relative_tolerance: Whether tolerance is relative (scale-free): an improvement of the 
+        validation loss must then exceed tolerance times the best validation loss so far. 
+        The stop on the weighted training error (below tolerance) stays absolute.
+
+        dtype: Precision of the inputs and hidden features, np.float64 or np.float32 
+        (which halves their memory). Targets and predictions stay in float64.
+
+        profile: Whether to record the time spent in each phase of every stage, and 
+        the training loss after it, in fit_profile_ (profiling has almost no cost 
+        when disabled).
+
+        track_memory: Whether to record the peak bytes allocated by the Rust side of 
+        the fit (inputs and copies, hidden features, residuals, native base learners; 
+        not the memory of Python base learners) in peak_fit_memory_.
         
     Attributes:
 
@@ -42,6 +86,18 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
         booster_: The boosting model.
 
         scaler_: StandardScaler for feature scaling.
+
+        n_estimators_: Number of boosting stages actually fitted.
+
+        validation_loss_: Validation mean squared error after each stage (empty without 
+        validation-based early stopping).
+
+        fit_profile_: With profile, a record array of the nanoseconds spent in each phase 
+        of every stage (see BoosterRegressor; "update" covers the sample weights), and the 
+        weighted training loss of the stage ("loss"). None otherwise.
+
+        peak_fit_memory_: With track_memory, peak bytes allocated by the Rust side of 
+        the last fit, above the bytes allocated when it started. None otherwise.
     """
     
     def __init__(
@@ -53,8 +109,18 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
         direct_link: bool = True,
         weights_distribution: str = "uniform",
         dropout: float = 0.0,
+        subsample: float = 1.0,
+        colsample: float = 1.0,
+        compact_weights: bool = False,
+        weights_cache_size: int = 0,
         tolerance: float = 1e-4,
-        random_state: Optional[int] = None
+        random_state: Optional[int] = None,
+        validation_fraction: float = 0.1,
+        n_iter_no_change: Optional[int] = None,
+        relative_tolerance: bool = False,
+        dtype=np.float64,
+        profile: bool = False,
+        track_memory: bool = False
     ):
         self.base_estimator = base_estimator
         self.n_estimators = n_estimators
@@ -63,8 +129,18 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
         self.direct_link = direct_link
         self.weights_distribution = weights_distribution
         self.dropout = dropout
+        self.subsample = subsample
+        self.colsample = colsample
+        self.compact_weights = compact_weights
+        self.weights_cache_size = weights_cache_size
         self.tolerance = tolerance
         self.random_state = random_state
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.relative_tolerance = relative_tolerance
+        self.dtype = dtype
+        self.profile = profile
+        self.track_memory = track_memory
         self.scaler_ = StandardScaler()
 
     def fit(self, X, y) -> "AdaBoostRegressor":
@@ -72,18 +148,24 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
         
         Parameters:
 
-            X: Input data
+            X: Input data, dense or scipy sparse (kept in CSR format, and scaled 
+            without centering).
             
-            y: Target values
+            y: Target values, of shape (n_samples,) or (n_samples, n_outputs)
         """
-        # Convert inputs to numpy arrays
-        X_arr = np.asarray(X.values if hasattr(X, 'values') else X, dtype=np.float64)
-        y_arr = np.asarray(y, dtype=np.float64)
-        
-        # Fit and transform with StandardScaler
-        self.scaler_ = StandardScaler()
-        X_scaled = self.scaler_.fit_transform(X_arr)
+        # Convert inputs to arrays
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        y_arr = np.ascontiguousarray(y, dtype=np.float64)
         
+        # Fit and transform with StandardScaler (scale only for sparse inputs)
+        self.scaler_ = make_scaler(X)
+        X_scaled = scale_inputs(self.scaler_, X, self.dtype, fit=True)
+        return self._fit_scaled(X_scaled, y_arr)
+
+    def _fit_scaled(self, X_scaled, y_arr) -> "AdaBoostRegressor":
+        """Fit the AdaBoost regressor on inputs already scaled by scaler_ (see fit), 
+        so that the per-class boosters of a classifier can share them."""
         # Initialize base estimator if None
         if self.base_estimator is None:
             self.base_estimator_ = ExtraTreeRegressor(random_state=self.random_state)
@@ -100,10 +182,31 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
             weights_distribution=self.weights_distribution,
             dropout=self.dropout,
             tolerance=self.tolerance,
-            random_state=self.random_state
+            random_state=self.random_state,
+            n_iter_no_change=self.n_iter_no_change,
+            relative_tolerance=self.relative_tolerance,
+            subsample=self.subsample,
+            colsample=self.colsample,
+            compact_weights=self.compact_weights,
+            weights_cache_size=self.weights_cache_size,
+            profile=self.profile,
+            track_memory=self.track_memory
         )
         
-        self.booster_.fit(X_scaled, y_arr)
+        # Hold out validation data for early stopping
+        validation = {}
+        if self.n_iter_no_change is not None:
+            X_scaled, X_val, y_arr, y_val = train_test_split(
+                X_scaled, y_arr, test_size=self.validation_fraction, 
+                random_state=self.random_state
+            )
+            validation = {"x_val": X_val, "y_val": y_val}
+        
+        self.booster_.fit(X_scaled, y_arr, **validation)
+        self.n_estimators_ = self.booster_.n_estimators
+        self.validation_loss_ = self.booster_.validation_loss
+        self.fit_profile_ = self.booster_.fit_profile
+        self.peak_fit_memory_ = self.booster_.peak_fit_memory
         return self
 
     def predict(self, X) -> np.ndarray:
@@ -119,6 +222,33 @@ class AdaBoostRegressor(BaseEstimator, RegressorMixin):
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        X = np.array(X, dtype=np.float64, copy=True, order='C')
-        scaled_X = self.scaler_.transform(X)
-        return self.booster_.predict(scaled_X)
\ No newline at end of file
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
+        return self.booster_.predict(scaled_X)
+
+    def staged_predict(self, X):
+        """Predictions after each boosting stage, computed in a single pass.
+
+        Parameters:
+
+            X: Input data.
+            
+        Yields:
+
+            predictions: Predictions of the first 1, 2, ..., n_estimators_ stages.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
+        yield from self.booster_.staged_predict(scaled_X)
+
+    def memory_usage(self) -> dict:
+        """Bytes held by the fitted model.
+
+        Returns:
+
+            usage: Bytes of the stage weights ("weights"), of the input columns of the 
+            stages ("columns"), of the alphas ("alphas"), of the scaler ("scaler"), 
+            of each base learner ("learners", an array; Python learners count their pickled 
+            size), and their sum ("total").
+        """
+        return memory_usage([self.booster_], [self.scaler_])
\ No newline at end of file
@@ -0,0 +1,201 @@
+from typing import Optional
+import numpy as np
+from .genboosterregressor import BoosterRegressor
+from .randombagregressor import RandomBagRegressor
+from .adaboostregressor import AdaBoostRegressor
+
+
+def export_model(model, path: Optional[str] = None) -> dict:
+    """Export a fitted regressor to plain NumPy arrays.
+
+    The bundle holds the scaler statistics, the stacked hidden layer weights (with
+    the input columns of each stage under column subsampling), and the base
+    learners as tree node arrays or linear coefficients. It is evaluated
+    by genbooster.inference, which only depends on NumPy.
+
+    Parameters:
+
+        model: Fitted BoosterRegressor, RandomBagRegressor or AdaBoostRegressor, whose
+        base learners are native ("rust_extratree" or LinfaRegressor) or
+        scikit-learn trees or linear models.
+
+        path: If given, the bundle is also saved there with numpy.savez.
+
+    Returns:
+
+        bundle: Dictionary of arrays.
+    """
+    if isinstance(model, RandomBagRegressor):
+        kind = "bagging"
+    elif isinstance(model, BoosterRegressor):
+        kind = "boosting"
+    elif isinstance(model, AdaBoostRegressor):
+        kind = "adaboost"
+    else:
+        raise TypeError(f"{type(model).__name__} cannot be exported")
+    stages = model.booster_.export()
+    y_mean = getattr(model, "y_mean_", None)
+    bundle = {
+        "kind": np.array(kind),
+        # Scalers fitted on sparse inputs do not center them
+        "scaler_mean": np.asarray(model.scaler_.mean_ if model.scaler_.with_mean 
+                                  else np.zeros_like(model.scaler_.scale_), dtype=np.float64),
+        "scaler_scale": np.asarray(model.scaler_.scale_, dtype=np.float64),
+        "y_mean": np.asarray(0.0 if y_mean is None else y_mean, dtype=np.float64),
+        "weights": np.asarray(stages["weights"], dtype=np.float64),
+        # (n_stages, n_columns), or empty when every stage sees all columns
+        "columns": np.zeros((0, 0), dtype=np.int64) if stages["columns"] is None
+                   else np.asarray(stages["columns"], dtype=np.int64),
+        "n_hidden_features": np.array(stages["n_hidden_features"]),
+        "direct_link": np.array(stages["direct_link"]),
+        "learning_rate": np.array(stages["learning_rate"]),
+        "alphas": np.asarray(stages.get("alphas", []), dtype=np.float64),
+        "n_outputs": np.array(stages["n_outputs"]),
+        "multi_output": np.array(stages["multi_output"]),
+    }
+    learners = stages["learners"]
+    n_outputs = stages["n_outputs"]
+    if all(_is_tree(learner) for learner in learners):
+        bundle.update(_tree_arrays(learners, n_outputs))
+    elif all(_is_linear(learner) for learner in learners):
+        bundle.update(_linear_arrays(learners, n_outputs))
+    else:
+        raise ValueError(
+            "Only tree and linear base learners can be exported, "
+            f"got {type(learners[0]).__name__}"
+        )
+    if path is not None:
+        np.savez(path, **bundle)
+    return bundle
+
+
+def fuse_linear_stages(model) -> dict:
+    """Fold the stages of a regressor with linear base learners into one model.
+
+    Each stage is linear in [X, relu(X W_i)], so (with the scaling of X folded into
+    the weights) boosting predictions reduce to X a + relu(X W + bias) b + c: one
+    matrix product, a ReLU and one more product. Bagging keeps one coefficient set
+    per stage, evaluated for all stages at once before taking the median.
+
+    Parameters:
+
+        model: Fitted BoosterRegressor or RandomBagRegressor, whose base learners are 
+        linear (LinfaRegressor, or scikit-learn models with coef_ and intercept_).
+
+    Returns:
+
+        fused: Dictionary of arrays, evaluated by genbooster.inference.predict_fused.
+    """
+    bundle = export_model(model)
+    kind = str(bundle["kind"])
+    if kind not in ("boosting", "bagging") or str(bundle["learner"]) != "linear":
+        raise ValueError("Only boosting and bagging models with linear base learners can be fused")
+    mean, scale = bundle["scaler_mean"], bundle["scaler_scale"]
+    weights, coef, intercept = bundle["weights"], bundle["coef"], bundle["intercept"]
+    n_stages, n_inputs, n_outputs = coef.shape
+    n_hidden = int(bundle["n_hidden_features"])
+    n_direct = n_inputs - n_hidden
+    # Coefficients of the original features (zero without direct link)
+    direct_coef = np.zeros((n_stages, len(mean), n_outputs))
+    columns = bundle["columns"]
+    if columns.size > 0:
+        # Stages that see a subset of the columns get zero weights and coefficients 
+        # for the other ones
+        full_weights = np.zeros((len(mean), weights.shape[1]))
+        for i, stage_columns in enumerate(columns):
+            stage = slice(i * n_hidden, (i + 1) * n_hidden)
+            full_weights[stage_columns, stage] = weights[:, stage]
+            direct_coef[i, stage_columns] = coef[i, :n_direct]
+        weights = full_weights
+    else:
+        direct_coef[:, :n_direct] = coef[:, :n_direct]
+    hidden_coef = coef[:, n_direct:]
+    # (x - mean) / scale . w = x . (w / scale) - (mean / scale) . w
+    direct_coef = direct_coef / scale[None, :, None]
+    intercept = intercept - np.einsum("d,sdo->so", mean, direct_coef)
+    fused = {
+        "kind": np.array(kind),
+        "weights": weights / scale[:, None],
+        "bias": -(mean / scale) @ weights,
+        "multi_output": bundle["multi_output"],
+    }
+    if kind == "boosting":
+        learning_rate = float(bundle["learning_rate"])
+        fused.update({
+            "direct_coef": learning_rate * direct_coef.sum(axis=0),
+            "hidden_coef": learning_rate * hidden_coef.reshape(n_stages * n_hidden, n_outputs),
+            "intercept": bundle["y_mean"] + learning_rate * intercept.sum(axis=0),
+        })
+    else:
+        fused.update({
+            "direct_coef": direct_coef,
+            "hidden_coef": hidden_coef,
+            "intercept": bundle["y_mean"] + intercept,
+        })
+    return fused
+
+
+def _is_tree(learner) -> bool:
+    # Native trees are exported as dicts of node arrays
+    return (isinstance(learner, dict) and "left" in learner) or hasattr(learner, "tree_")
+
+
+def _is_linear(learner) -> bool:
+    return (isinstance(learner, dict) and "coef" in learner) or (
+        hasattr(learner, "coef_") and hasattr(learner, "intercept_")
+    )
+
+
+def _tree_arrays(learners, n_outputs) -> dict:
+    # Trees are concatenated, with child indices shifted to the concatenated arrays
+    feature, threshold, left, right, value = [], [], [], [], []
+    offsets = [0]
+    for learner in learners:
+        if isinstance(learner, dict):
+            nodes = learner
+        else:
+            tree = learner.tree_
+            nodes = {"feature": tree.feature, "threshold": tree.threshold,
+                     "left": tree.children_left, "right": tree.children_right,
+                     "value": tree.value[:, :, 0]}
+        offset = offsets[-1]
+        node_left = np.asarray(nodes["left"], dtype=np.int64)
+        node_right = np.asarray(nodes["right"], dtype=np.int64)
+        feature.append(np.maximum(np.asarray(nodes["feature"], dtype=np.int64), 0))
+        threshold.append(np.asarray(nodes["threshold"], dtype=np.float64))
+        left.append(np.where(node_left >= 0, node_left + offset, -1))
+        right.append(np.where(node_right >= 0, node_right + offset, -1))
+        value.append(np.asarray(nodes["value"], dtype=np.float64).reshape(-1, n_outputs))
+        offsets.append(offset + len(node_left))
+    return {
+        "learner": np.array("tree"),
+        "tree_offsets": np.array(offsets, dtype=np.int64),
+        "tree_feature": _concat(feature, np.int64),
+        "tree_threshold": _concat(threshold, np.float64),
+        "tree_left": _concat(left, np.int64),
+        "tree_right": _concat(right, np.int64),
+        "tree_value": np.concatenate(value) if value else np.zeros((0, n_outputs)),
+        # scikit-learn trees are evaluated on float32 inputs
+        "tree_float32": np.array(any(not isinstance(learner, dict) for learner in learners)),
+    }
+
+
+def _concat(arrays, dtype) -> np.ndarray:
+    return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+
+def _linear_arrays(learners, n_outputs) -> dict:
+    coef, intercept = [], []
+    for learner in learners:
+        if isinstance(learner, dict):
+            learner_coef, learner_intercept = learner["coef"], learner["intercept"]
+        else:
+            learner_coef, learner_intercept = learner.coef_, learner.intercept_
+        # (n_outputs, n_inputs) as in scikit-learn, transposed to (n_inputs, n_outputs)
+        coef.append(np.asarray(learner_coef, dtype=np.float64).reshape(n_outputs, -1).T)
+        intercept.append(np.broadcast_to(np.asarray(learner_intercept, dtype=np.float64), (n_outputs,)))
+    return {
+        "learner": np.array("linear"),
+        "coef": np.stack(coef) if coef else np.zeros((0, 0, n_outputs)),
+        "intercept": np.stack(intercept) if intercept else np.zeros((0, n_outputs)),
+    }
@@ -2,11 +2,16 @@ from typing import Optional, Union
 import numpy as np
 import pandas as pd
 import nnetsauce as ns
-from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
+from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin, clone
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.linear_model import Ridge
 from sklearn.tree import ExtraTreeRegressor
+from sklearn.utils import check_random_state
+from itertools import zip_longest
+from joblib import Parallel, delayed
 from .genboosterregressor import BoosterRegressor
+from .sparse import make_scaler, scale_inputs
+from .memory import memory_usage
 
 
 class BoosterClassifier(BaseEstimator, ClassifierMixin):
@@ -24,13 +29,28 @@ class BoosterClassifier(BaseEstimator, ClassifierMixin):
 
         direct_link: Whether to use direct link for the base learner or not.
 
-        weights_distribution: Distribution of the weights for the booster (uniform or normal).
+        weights_distribution: Distribution of the weights for the booster (uniform or normal), 
+        or a structured random projection: "achlioptas" or "very_sparse" (sparse signed
+        weights, applied with a sparse kernel) or "srht" (subsampled randomized Hadamard 
+        transform, applied with a fast Walsh-Hadamard transform when cheaper than a dense product), 
+        or packed weights: "sign" (+1 or -1, stored as bits) or "int8" (k / 127 for an integer 
+        k, stored as bytes), unpacked for the matrix products of predictions.
 
         dropout: Dropout rate.
 
+        subsample: Fraction of the training samples each stage's base learner is fitted on.
+
+        colsample: Fraction of the input features each stage sees.
+
         tolerance: Tolerance for early stopping.
 
         random_state: Random state.
+
+        n_jobs: Number of threads fitting the per-class boosters in parallel (None means 1, 
+        -1 means all CPUs). Native base learners fit without holding the GIL.
+
+        multi_output: Whether to fit a single multi-output booster on the one-hot encoded 
+        classes instead of one booster per class (the base learner must accept 2D targets).
     
     Attributes:
 
@@ -54,8 +74,12 @@ class BoosterClassifier(BaseEstimator, ClassifierMixin):
                 direct_link: bool = True,
                 weights_distribution: str = 'uniform',
                 dropout: float = 0.0,
+                subsample: float = 1.0,
+                colsample: float = 1.0,
                 tolerance: float = 1e-4,
-                random_state: Optional[int] = 42):
+                random_state: Optional[int] = 42,
+                n_jobs: Optional[int] = None,
+                multi_output: bool = False):
         if base_estimator is None:
             self.base_estimator = ExtraTreeRegressor()
         else: 
@@ -66,8 +90,12 @@ class BoosterClassifier(BaseEstimator, ClassifierMixin):
         self.direct_link = direct_link
         self.weights_distribution = weights_distribution
         self.dropout = dropout
+        self.subsample = subsample
+        self.colsample = colsample
         self.tolerance = tolerance
         self.random_state = random_state        
+        self.n_jobs = n_jobs
+        self.multi_output = multi_output
         self.boosters_ = [] 
     
     def fit(self, X, y) -> "BoosterClassifier":
@@ -85,29 +113,50 @@ class BoosterClassifier(BaseEstimator, ClassifierMixin):
         self.n_classes_ = len(self.classes_)        
         Y = one_hot_encode2(y, self.n_classes_)
         
+        # Scale X once: the worker threads share the scaled inputs and the scaler 
+        # instead of each scaling a copy (sparse inputs are kept sparse)
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        self.scaler_ = make_scaler(X)
+        X_scaled = scale_inputs(self.scaler_, X, np.float64, fit=True)
+        
+        # Draw the seeds of the boosters up front (from the global generator without 
+        # random_state), so that they do not depend on the order the threads run in
+        seeds = check_random_state(self.random_state).randint(0, 2**31 - 1, size=self.n_classes_)
+        
+        # Train a single booster on all classes at once
+        if self.multi_output:
+            self.boosters_ = [self._fit_booster(X_scaled, Y, int(seeds[0]))]
+            return self
+        
         # Train one booster per class
-        for i in range(self.n_classes_):
-            booster = BoosterRegressor(
-                base_estimator=self.base_estimator,
-                n_estimators=self.n_estimators,
-                learning_rate=self.learning_rate,
-                n_hidden_features=self.n_hidden_features,
-                direct_link=self.direct_link,
-                weights_distribution=self.weights_distribution,
-                tolerance=self.tolerance, 
-                dropout=self.dropout, 
-                random_state=self.random_state
-            )
-            
-            # Convert X and y to the right format without reshaping y
-            X_arr = np.asarray(X.values if hasattr(X, 'values') else X, dtype=np.float64)
-            y_arr = np.asarray(Y[:, i], dtype=np.float64)
-            
-            # Fit the booster
-            booster.fit(X=X_arr, y=y_arr)
-            self.boosters_.append(booster)
+        self.boosters_ = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(self._fit_booster)(X_scaled, np.asarray(Y[:, i], dtype=np.float64), int(seeds[i]))
+            for i in range(self.n_classes_)
+        )
         
         return self
+
+    def _fit_booster(self, X, y, seed) -> BoosterRegressor:
+        # Seeded copy of the base estimator, rather than the shared one seeded in place
+        base_estimator = self.base_estimator
+        if hasattr(base_estimator, "get_params") and "random_state" in base_estimator.get_params():
+            base_estimator = clone(base_estimator).set_params(random_state=seed)
+        booster = BoosterRegressor(
+            base_estimator=base_estimator,
+            n_estimators=self.n_estimators,
+            learning_rate=self.learning_rate,
+            n_hidden_features=self.n_hidden_features,
+            direct_link=self.direct_link,
+            weights_distribution=self.weights_distribution,
+            tolerance=self.tolerance, 
+            dropout=self.dropout, 
+            subsample=self.subsample,
+            colsample=self.colsample,
+            random_state=seed
+        )
+        booster.scaler_ = self.scaler_
+        return booster._fit_scaled(X, y, seed)
     
     def predict(self, X) -> np.ndarray:
         """Make predictions with the boosting model.
@@ -138,10 +187,68 @@ class BoosterClassifier(BaseEstimator, ClassifierMixin):
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        raw_preds = np.asarray([booster.predict(X) for booster in self.boosters_])
-        shifted_preds = raw_preds - np.max(raw_preds, axis=0)
-        exp_preds = np.exp(shifted_preds)
-        return exp_preds / np.sum(exp_preds, axis=0)
+        if self.multi_output:
+            raw_preds = self.boosters_[0].predict(X).T
+        else:
+            raw_preds = np.asarray([booster.predict(X) for booster in self.boosters_])
+        return softmax(raw_preds)
+
+    def staged_predict(self, X):
+        """Class predictions after each boosting stage.
+        
+        Parameters:
+
+            X: Input data.
+            
+        Yields:
+
+            preds: Class predictions of the first 1, 2, ... stages.
+        """
+        for proba in self.staged_predict_proba(X):
+            yield np.argmax(proba, axis=0)
+
+    def staged_predict_proba(self, X):
+        """Probability predictions after each boosting stage, computed in a single pass.
+        
+        Parameters:
+
+            X: Input data.
+            
+        Yields:
+
+            preds: Probability predictions of the first 1, 2, ... stages. Per-class 
+            boosters that stopped early keep their last predictions.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        if self.multi_output:
+            for raw_preds in self.boosters_[0].staged_predict(X):
+                yield softmax(raw_preds.T)
+            return
+        raw_preds = [None] * len(self.boosters_)
+        for stage_preds in zip_longest(*[booster.staged_predict(X) for booster in self.boosters_]):
+            raw_preds = [last if preds is None else preds 
+                         for preds, last in zip(stage_preds, raw_preds)]
+            yield softmax(np.asarray(raw_preds))
+
+    def memory_usage(self) -> dict:
+        """Bytes held by the fitted model, summed over its boosters_.
+
+        Returns:
+
+            usage: Bytes of the stage weights ("weights"), of the input columns of the 
+            stages ("columns"), of the scaler ("scaler"), of each base learner ("learners", 
+            an array; Python learners count their pickled size), and their sum ("total"). 
+            "alphas" is 0 (AdaBoost only).
+        """
+        return memory_usage([booster.booster_ for booster in self.boosters_],
+                            [booster.scaler_ for booster in self.boosters_])
+
+# softmax over classes (axis 0)
+def softmax(raw_preds):
+    shifted_preds = raw_preds - np.max(raw_preds, axis=0)
+    exp_preds = np.exp(shifted_preds)
+    return exp_preds / np.sum(exp_preds, axis=0)
 
 # one-hot encoding
 def one_hot_encode2(y, n_classes):
@@ -5,8 +5,12 @@ import nnetsauce as ns
 from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.linear_model import Ridge
+from sklearn.model_selection import train_test_split
 from sklearn.tree import ExtraTreeRegressor
 from .rust_core import RustBooster as _RustBooster
+from .inference import predict_fused
+from .sparse import make_scaler, scale_inputs
+from .memory import memory_usage
 import random
 
 
@@ -15,7 +19,8 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
 
         Parameters:
 
-            base_estimator: Base learner to use for the booster.
+            base_estimator: Base learner to use for the booster, or "rust_extratree" 
+            for the native Rust extra tree (fit and predict then stay in Rust).
 
             n_estimators: Number of boosting stages to perform.
 
@@ -25,21 +30,86 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
 
             direct_link: Whether to use direct link for the base learner or not.
 
-            weights_distribution: Distribution of the weights for the booster (uniform or normal).
+            weights_distribution: Distribution of the weights for the booster (uniform or normal), 
+            or a structured random projection: "achlioptas" or "very_sparse" (sparse signed
+            weights, applied with a sparse kernel) or "srht" (subsampled randomized Hadamard 
+            transform, applied with a fast Walsh-Hadamard transform when cheaper than a dense product), 
+            or packed weights: "sign" (+1 or -1, stored as bits) or "int8" (k / 127 for an integer 
+            k, stored as bytes), unpacked for the matrix products of predictions.
 
             dropout: Dropout rate.
 
+            subsample: Fraction of the training samples each stage's base learner is fitted 
+            on, drawn without replacement (stochastic gradient boosting). The residuals of 
+            all samples are still updated.
+
+            colsample: Fraction of the input features each stage sees, drawn without 
+            replacement, for both its hidden layer and its direct link. Predictions 
+            only read the columns of each stage.
+
+            compact_weights: Whether to store one seed per stage instead of its hidden layer 
+            weights, which are then regenerated when predicting (the model size is then 
+            mostly the base learners, at the cost of slower predictions).
+
+            weights_cache_size: Number of regenerated stage weights kept in memory with 
+            compact_weights (the least recently used are dropped first).
+
             tolerance: Tolerance for early stopping.
 
             random_state: Random state.
 
+            validation_fraction: Proportion of the training data set aside for early stopping 
+            (only used when n_iter_no_change is not None).
+
+            n_iter_no_change: Number of stages without improvement of the validation loss 
+            (by more than tolerance) before stopping. None stops on the change in training 
+            residuals instead.
+
+            relative_tolerance: Whether tolerance is relative (scale-free): an improvement of the 
+            validation loss must then exceed tolerance times the best validation loss so far. 
+            Without validation, the change in the residual norm is compared with tolerance 
+            times the norm after the previous stage.
+
+            warm_start: Whether to add stages to the fitted model when calling fit again 
+            (on the same data) with a larger n_estimators, instead of refitting from scratch.
+
+            dtype: Precision of the inputs and hidden features, np.float64 or np.float32 
+            (which halves their memory). Targets and predictions stay in float64.
+
+            profile: Whether to record the time spent in each phase of every stage, and 
+            the training loss after it, in fit_profile_ (profiling has almost no cost 
+            when disabled).
+
+            track_memory: Whether to record the peak bytes allocated by the Rust side of 
+            the fit (inputs and copies, hidden features, residuals, native base learners; 
+            not the memory of Python base learners) in peak_fit_memory_.
+
         Attributes:
 
             base_estimator_: The base learner.
 
             booster_: The boosting model.
 
-            y_mean_: Mean of the target variable.
+            y_mean_: Mean of the target variable (one value per output for 2D targets).
+
+            n_estimators_: Number of boosting stages actually fitted.
+
+            validation_loss_: Validation mean squared error after each stage (empty without 
+            validation-based early stopping).
+
+            seed_: Seed of the fit (kept when warm starting).
+
+            fit_profile_: With profile, a record array with one record per stage: the 
+            nanoseconds spent drawing its random columns, weights and rows ("sampling"), 
+            computing its hidden features ("forward"), cloning the base estimator ("clone"), 
+            converting its inputs ("copy"), fitting it ("fit"), predicting ("predict"), 
+            updating the residuals ("update") and checking early stopping ("validation"), 
+            and the training mean squared error after the stage ("loss"). None otherwise.
+
+            peak_fit_memory_: With track_memory, peak bytes allocated by the Rust side of 
+            the last fit, above the bytes allocated when it started. None otherwise.
+
+            fused_: Stages folded into a single model by compile (None otherwise).
 
         Examples:
 
@@ -56,8 +126,19 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
         direct_link: bool = True,
         weights_distribution: str = 'uniform',
         dropout: float = 0.0,
+        subsample: float = 1.0,
+        colsample: float = 1.0,
+        compact_weights: bool = False,
+        weights_cache_size: int = 0,
         tolerance: float = 1e-4,
-        random_state: Optional[int] = 42
+        random_state: Optional[int] = 42,
+        validation_fraction: float = 0.1,
+        n_iter_no_change: Optional[int] = None,
+        relative_tolerance: bool = False,
+        warm_start: bool = False,
+        dtype=np.float64,
+        profile: bool = False,
+        track_memory: bool = False
     ):
         self.base_estimator = base_estimator
         if base_estimator is None:
@@ -70,8 +151,19 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
         self.direct_link = direct_link
         self.weights_distribution = weights_distribution
         self.dropout = dropout
+        self.subsample = subsample
+        self.colsample = colsample
+        self.compact_weights = compact_weights
+        self.weights_cache_size = weights_cache_size
         self.tolerance = tolerance
         self.random_state = random_state
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.relative_tolerance = relative_tolerance
+        self.warm_start = warm_start
+        self.dtype = dtype
+        self.profile = profile
+        self.track_memory = track_memory
         self.scaler_ = StandardScaler()
         self.y_mean_ = None
 
@@ -80,14 +172,24 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
         
         Parameters:
 
-            X: Input data.
+            X: Input data, dense or scipy sparse (kept in CSR format, and scaled 
+            without centering).
 
-            y: Target data.
+            y: Target data, of shape (n_samples,) or (n_samples, n_outputs). 
+            With several outputs, each stage fits a single (multi-output) base learner.
             
         Returns:
 
             self: The fitted boosting model.
         """        
+        # Only the new stages are fitted when warm starting
+        warm_start = self.warm_start and getattr(self, "booster_", None) is not None
+        if warm_start and self.n_estimators < self.n_estimators_:
+            raise ValueError(
+                f"n_estimators={self.n_estimators} must be at least the number of fitted "
+                f"stages ({self.n_estimators_}) with warm_start"
+            )
+        
         # Set random seed if provided
         if self.random_state is not None:
             # Convert to int for Python's random.seed
@@ -97,30 +199,39 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
             random.seed(seed_int)
             if hasattr(self.base_estimator, "random_state"):
                 self.base_estimator.random_state = seed_int
-            # Convert to u64 for Rust
-            seed = np.uint64(seed_int)
         else:
-            # Use a random seed if none provided
-            seed_int = np.random.randint(0, 2**31 - 1)
+            # Use a random seed if none provided (the same one when warm starting)
+            seed_int = self.seed_ if warm_start else np.random.randint(0, 2**31 - 1)
             np.random.seed(seed_int)
             random.seed(seed_int)
-            seed = np.uint64(seed_int)
-            
-        # Convert to numpy arrays and ensure float64 dtype with C-contiguous memory layout
-        X = np.array(X, dtype=np.float64, copy=True, order='C')
-        y = np.array(y, dtype=np.float64, copy=True, order='C')
-        
-        # Scale X and force conversion to numpy array
-        scaled_X = np.array(self.scaler_.fit_transform(X), dtype=np.float64, copy=True, order='C')
         
-        self.y_mean_ = float(np.mean(y))
-        centered_y = np.array(y - self.y_mean_, dtype=np.float64, copy=True, order='C')
+        # Scale X in the model's precision, as a C-contiguous array or a CSR matrix 
+        # (the fitted stages expect the scaling of the first fit when warm starting)
+        if not warm_start:
+            self.scaler_ = make_scaler(X)
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype, fit=not warm_start)
+        return self._fit_scaled(scaled_X, y, seed_int, warm_start)
+
+    def _fit_scaled(self, scaled_X, y, seed_int, warm_start=False) -> "BoosterRegressor":
+        """Fit the boosting model on inputs already scaled by scaler_ (see fit).
+
+        The global random number generators are left as they are, so that boosters 
+        sharing scaled inputs (the per-class boosters of a classifier) can be fitted 
+        in parallel threads.
+        """
+        # Convert to u64 for Rust
+        seed = np.uint64(seed_int)
+            
+        # Targets in float64
+        y = np.asarray(y, dtype=np.float64)
         
-        # Ensure y is 1D array
-        if centered_y.ndim == 2:
-            if centered_y.shape[1] != 1:
-                raise ValueError("y must have shape (n_samples,) or (n_samples, 1)")
-            centered_y = centered_y.ravel()  # Convert to 1D array
+        # (n_samples, 1) targets are treated as 1D
+        if y.ndim == 2 and y.shape[1] == 1:
+            y = y.ravel()
+        # Center the targets (on the mean of the first fit when warm starting)
+        if not warm_start:
+            self.y_mean_ = float(np.mean(y)) if y.ndim == 1 else np.mean(y, axis=0)
+        centered_y = np.ascontiguousarray(y - self.y_mean_, dtype=np.float64)
             
         # Use Ridge as default base estimator if none provided
         if self.base_estimator is None:
@@ -128,24 +239,60 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
         else:
             self.base_estimator_ = self.base_estimator            
             
-        # Initialize Rust booster
-        self.booster_ = _RustBooster(
-            self.base_estimator_,
-            self.n_estimators,
-            self.learning_rate,
-            self.n_hidden_features,
-            self.direct_link,
-            weights_distribution=self.weights_distribution,
-            tolerance=self.tolerance
-        )        
+        # Initialize Rust booster (a warm start only raises its number of stages,
+        # restored if the fit fails)
+        if warm_start:
+            n_fitted = self.booster_.n_estimators
+            self.booster_.n_estimators = self.n_estimators
+        else:
+            self.fused_ = None
+            self.booster_ = _RustBooster(
+                self.base_estimator_,
+                self.n_estimators,
+                self.learning_rate,
+                self.n_hidden_features,
+                self.direct_link,
+                weights_distribution=self.weights_distribution,
+                tolerance=self.tolerance,
+                n_iter_no_change=self.n_iter_no_change,
+                relative_tolerance=self.relative_tolerance,
+                subsample=self.subsample,
+                colsample=self.colsample,
+                compact_weights=self.compact_weights,
+                weights_cache_size=self.weights_cache_size,
+                profile=self.profile,
+                track_memory=self.track_memory
+            )
+        
+        # Hold out validation data for early stopping
+        validation = {}
+        if self.n_iter_no_change is not None:
+            scaled_X, X_val, centered_y, y_val = train_test_split(
+                scaled_X, centered_y, test_size=self.validation_fraction, 
+                random_state=seed_int
+            )
+            validation = {"x_val": X_val, "y_val": y_val}
         
-        # Fit the model
-        self.booster_.fit_boosting(
-            scaled_X,
-            centered_y,
-            dropout=self.dropout,
-            seed=seed
-        )        
+        # Fit the model (a failed warm start leaves the fitted stages as they were)
+        try:
+            self.booster_.fit_boosting(
+                scaled_X,
+                centered_y,
+                dropout=self.dropout,
+                seed=seed,
+                warm_start=warm_start,
+                **validation
+            )
+        except Exception:
+            if warm_start:
+                self.booster_.n_estimators = n_fitted
+            raise
+        self.fused_ = None
+        self.seed_ = seed_int
+        self.n_estimators_ = self.booster_.n_estimators
+        self.validation_loss_ = self.booster_.validation_loss
+        self.fit_profile_ = self.booster_.fit_profile
+        self.peak_fit_memory_ = self.booster_.peak_fit_memory
         return self
         
     def predict(self, X) -> np.ndarray:
@@ -161,5 +308,83 @@ class BoosterRegressor(BaseEstimator, RegressorMixin):
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        scaled_X = self.scaler_.transform(X)
-        return self.booster_.predict_boosting(scaled_X) + self.y_mean_
\ No newline at end of file
+        if getattr(self, "fused_", None) is not None:
+            return predict_fused(self.fused_, X)
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
+        return self.booster_.predict_boosting(scaled_X) + self.y_mean_
+
+    def compile(self) -> "BoosterRegressor":
+        """Fold all stages into a single model, when the base learners are linear.
+
+        The prediction is then X a + relu(X W + bias) b + c, with the scaling, the 
+        learning rate and y_mean_ folded in (one matrix product for the hidden layer 
+        and one for the output, without calling the base learners). Refitting 
+        discards the fused model.
+            
+        Returns:
+
+            self: The compiled model.
+        """
+        from .export import fuse_linear_stages
+        self.fused_ = fuse_linear_stages(self)
+        return self
+
+    def predict_anytime(self, X, max_stages: Optional[int] = None, 
+                        time_budget: Optional[float] = None):
+        """Make predictions with the first boosting stages only, within a stage or time budget.
+
+        Stages are evaluated in order, and evaluation stops before a stage that would 
+        exceed the budget. Boosting stages are additive, so the partial sum is a coarser 
+        but meaningful prediction.
+
+        Parameters:
+
+            X: Input data.
+
+            max_stages: Maximum number of stages to evaluate (None for all stages).
+
+            time_budget: Time budget in seconds for evaluating the stages (None or inf for 
+            no limit, 0 for no stage). Negative or NaN budgets raise a ValueError.
+            
+        Returns:
+        
+            preds: Predictions.
+
+            n_stages: Number of stages used.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
+        preds, n_stages = self.booster_.predict_boosting_anytime(
+            scaled_X, max_stages=max_stages, time_budget=time_budget
+        )
+        return preds + self.y_mean_, n_stages
+
+    def staged_predict(self, X):
+        """Predictions after each boosting stage, computed in a single pass.
+
+        Parameters:
+
+            X: Input data.
+            
+        Yields:
+        
+            preds: Predictions of the first 1, 2, ..., n_estimators_ stages.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
+        for preds in self.booster_.staged_predict_boosting(scaled_X):
+            yield preds + self.y_mean_
+
+    def memory_usage(self) -> dict:
+        """Bytes held by the fitted model.
+
+        Returns:
+
+            usage: Bytes of the stage weights ("weights"), of the input columns of the 
+            stages ("columns"), of the scaler ("scaler"), of each base learner ("learners", 
+            an array; Python learners count their pickled size), and their sum ("total"). 
+            "alphas" is 0 (AdaBoost only).
+        """
+        return memory_usage([self.booster_], [self.scaler_])
\ No newline at end of file
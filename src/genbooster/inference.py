@@ -0,0 +1,129 @@
+"""Batch prediction with models exported by genbooster.export, using NumPy only.
+
+This module does not import the rest of genbooster (nor scikit-learn), so it can
+be copied as is to serving hosts where only NumPy is installed.
+"""
+import numpy as np
+
+
+def load_bundle(path: str) -> dict:
+    """Load an exported model saved as .npz.
+
+    Parameters:
+
+        path: Path of the .npz file.
+
+    Returns:
+
+        bundle: Dictionary of arrays.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+def predict(bundle: dict, X) -> np.ndarray:
+    """Make predictions with an exported model.
+
+    Parameters:
+
+        bundle: Exported model (see genbooster.export.export_model and load_bundle).
+
+        X: Input data, of shape (n_samples, n_features).
+
+    Returns:
+
+        preds: Predictions, of shape (n_samples,) or (n_samples, n_outputs).
+    """
+    if hasattr(X, "toarray"):
+        # scipy sparse inputs
+        X = X.toarray()
+    X = np.asarray(X, dtype=np.float64)
+    scaled_X = (X - bundle["scaler_mean"]) / bundle["scaler_scale"]
+    n_hidden = int(bundle["n_hidden_features"])
+    n_outputs = int(bundle["n_outputs"])
+    weights = bundle["weights"]
+    n_stages = weights.shape[1] // n_hidden if n_hidden > 0 else 0
+    columns = bundle.get("columns")
+    sampled = columns is not None and columns.size > 0
+    if not sampled:
+        # Hidden features of every stage with one matrix product
+        hidden = np.maximum(scaled_X @ weights, 0.0)
+
+    stage_preds = np.zeros((n_stages, X.shape[0], n_outputs))
+    for i in range(n_stages):
+        stage = slice(i * n_hidden, (i + 1) * n_hidden)
+        if sampled:
+            # The stage only reads its columns, for its hidden layer and its direct link
+            stage_X = scaled_X[:, columns[i]]
+            stage_hidden = np.maximum(stage_X @ weights[:, stage], 0.0)
+        else:
+            stage_X, stage_hidden = scaled_X, hidden[:, stage]
+        direct = stage_X if bool(bundle["direct_link"]) else stage_X[:, :0]
+        inputs = np.hstack([direct, stage_hidden])
+        if str(bundle["learner"]) == "tree":
+            stage_preds[i] = _predict_tree(bundle, i, inputs)
+        else:
+            stage_preds[i] = inputs @ bundle["coef"][i] + bundle["intercept"][i]
+
+    kind = str(bundle["kind"])
+    if kind == "boosting":
+        preds = float(bundle["learning_rate"]) * stage_preds.sum(axis=0)
+    elif kind == "bagging":
+        preds = np.median(stage_preds, axis=0) if n_stages > 0 else stage_preds.sum(axis=0)
+    else:
+        alphas = bundle["alphas"]
+        preds = np.tensordot(alphas, stage_preds, axes=1) / alphas.sum()
+    preds = preds + bundle["y_mean"]
+    return preds if bool(bundle["multi_output"]) else preds[:, 0]
+
+
+def predict_fused(fused: dict, X) -> np.ndarray:
+    """Make predictions with a fused linear model (see genbooster.export.fuse_linear_stages).
+
+    Parameters:
+
+        fused: Fused model.
+
+        X: Input data, of shape (n_samples, n_features).
+
+    Returns:
+
+        preds: Predictions, of shape (n_samples,) or (n_samples, n_outputs).
+    """
+    if hasattr(X, "toarray"):
+        # scipy sparse inputs
+        X = X.toarray()
+    X = np.asarray(X, dtype=np.float64)
+    hidden = np.maximum(X @ fused["weights"] + fused["bias"], 0.0)
+    if str(fused["kind"]) == "boosting":
+        preds = X @ fused["direct_coef"] + hidden @ fused["hidden_coef"] + fused["intercept"]
+    else:
+        # Predictions of every stage, (n_samples, n_stages, n_outputs)
+        hidden_coef = fused["hidden_coef"]
+        hidden = hidden.reshape(X.shape[0], hidden_coef.shape[0], hidden_coef.shape[1])
+        stage_preds = (np.einsum("nd,sdo->nso", X, fused["direct_coef"])
+                       + np.einsum("nsh,sho->nso", hidden, hidden_coef) + fused["intercept"])
+        preds = np.median(stage_preds, axis=1)
+    return preds if bool(fused["multi_output"]) else preds[:, 0]
+
+
+def _predict_tree(bundle, stage, inputs):
+    # All samples descend the tree together, one level per iteration
+    start, end = bundle["tree_offsets"][stage], bundle["tree_offsets"][stage + 1]
+    value = bundle["tree_value"]
+    if start == end:
+        return np.zeros((inputs.shape[0], value.shape[1]))
+    if bool(bundle["tree_float32"]):
+        # scikit-learn trees compare float32 inputs to their thresholds
+        inputs = inputs.astype(np.float32).astype(np.float64)
+    left, right = bundle["tree_left"], bundle["tree_right"]
+    feature, threshold = bundle["tree_feature"], bundle["tree_threshold"]
+    rows = np.arange(inputs.shape[0])
+    node = np.full(inputs.shape[0], start)
+    internal = left[node] >= 0
+    while internal.any():
+        active = node[internal]
+        go_left = inputs[rows[internal], feature[active]] <= threshold[active]
+        node[internal] = np.where(go_left, left[active], right[active])
+        internal = left[node] >= 0
+    return value[node]
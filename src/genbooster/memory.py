@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def scaler_nbytes(scaler) -> int:
+    """Bytes of the fitted arrays of a scaler (0 before fitting)."""
+    return sum(value.nbytes for value in vars(scaler).values() if isinstance(value, np.ndarray))
+
+
+def memory_usage(boosters, scalers=()) -> dict:
+    """Byte breakdown of fitted Rust boosters and their scalers, summed over the boosters.
+
+    Parameters:
+
+        boosters: Fitted RustBooster or AdaBoostRegressor instances (booster_ of
+        the regressors).
+
+        scalers: Scalers of the inputs.
+
+    Returns:
+
+        usage: dict with the bytes of the stage weights ("weights", the seeds and cached
+        stages with compact_weights, or the packed bits or bytes), of the input columns
+        of the stages ("columns"), of the AdaBoost alphas ("alphas"), of the scalers
+        ("scaler"), the bytes of each base learner ("learners", an array in stage order,
+        booster after booster; Python learners count their pickled size), and the sum
+        of all of them ("total").
+    """
+    usages = [booster.memory_usage() for booster in boosters]
+    usage = {key: sum(int(u[key]) for u in usages) for key in ("weights", "columns", "alphas")}
+    usage["scaler"] = sum(scaler_nbytes(scaler) for scaler in scalers)
+    usage["learners"] = np.concatenate([np.asarray(u["learners"], dtype=np.int64) for u in usages]
+                                       or [np.zeros(0, dtype=np.int64)])
+    usage["total"] = sum(usage[key] for key in ("weights", "columns", "alphas", "scaler")) \
+        + int(usage["learners"].sum())
+    return usage
@@ -0,0 +1,57 @@
+import pickle
+from .rust_core import load_model as _load_booster
+from .rust_core import model_from_bytes as _booster_from_bytes
+
+
+def save_model(model, path: str) -> None:
+    """Save a fitted regressor in the binary model format.
+
+    The Rust model (weights and base learners) is written in a fixed binary layout,
+    and the rest of the estimator (scaler, target mean, parameters) is pickled
+    alongside it. Fitted estimators can also be pickled directly.
+
+    Parameters:
+
+        model: Fitted BoosterRegressor, RandomBagRegressor or AdaBoostRegressor.
+
+        path: Path of the model file.
+    """
+    booster = getattr(model, "booster_", None)
+    if booster is None:
+        raise TypeError(
+            f"{type(model).__name__} cannot be saved with save_model (use pickle instead)"
+        )
+    state = {key: value for key, value in model.__dict__.items() if key != "booster_"}
+    booster.save(path, pickle.dumps((type(model), state)))
+
+
+def load_model(path: str, mmap: bool = True):
+    """Load a regressor saved with save_model.
+
+    Model files contain pickled Python objects: only load files from a trusted source.
+
+    Parameters:
+
+        path: Path of the model file.
+
+        mmap: Whether to memory-map the hidden layer weights instead of copying them.
+        Processes loading the same file then share one copy of the weights, and
+        loading does not read them up front. The file must not be modified while
+        the model is in use.
+
+    Returns:
+
+        model: The fitted regressor (which can predict and be refitted, but not
+        warm started).
+    """
+    booster, metadata = _load_booster(path, mmap=mmap)
+    cls, state = pickle.loads(metadata)
+    model = cls.__new__(cls)
+    model.__dict__.update(state)
+    model.booster_ = booster
+    return model
+
+
+def _model_from_bytes(data: bytes):
+    # Unpickles Rust models (see RustBooster.__reduce__)
+    return _booster_from_bytes(data)[0]
@@ -6,6 +6,7 @@ from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.linear_model import Ridge
 from .rust_core import RustBooster as _RustBooster
+from .memory import memory_usage
     
 
 class RandomBagClassifier(BaseEstimator, ClassifierMixin):
@@ -23,11 +24,22 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
 
         direct_link: Whether to use direct link for the base learner or not.
 
-        weights_distribution: Distribution of the weights for the booster (uniform or normal).
+        weights_distribution: Distribution of the weights for the booster (uniform or normal), 
+        or a structured random projection: "achlioptas" or "very_sparse" (sparse signed
+        weights, applied with a sparse kernel) or "srht" (subsampled randomized Hadamard 
+        transform, applied with a fast Walsh-Hadamard transform when cheaper than a dense product), 
+        or packed weights: "sign" (+1 or -1, stored as bits) or "int8" (k / 127 for an integer 
+        k, stored as bytes), unpacked for the matrix products of predictions.
 
         dropout: Dropout rate.
 
         random_state: Random state.
+
+        n_jobs: Number of threads fitting the bagging stages in parallel (None means 1, 
+        -1 means all CPUs). The fitted model does not depend on this value.
+
+        multi_output: Whether to fit a single multi-output booster on the one-hot encoded 
+        classes instead of one booster per class (the base learner must accept 2D targets).
     
     Attributes:
 
@@ -51,7 +63,9 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
                 direct_link: bool = True,
                 weights_distribution: str = 'uniform',
                 dropout: float = 0.0,
-                random_state: Optional[int] = 42):
+                random_state: Optional[int] = 42,
+                n_jobs: Optional[int] = None,
+                multi_output: bool = False):
         if base_estimator is None:
             self.base_estimator = Ridge()
         else: 
@@ -63,6 +77,8 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
         self.weights_distribution = weights_distribution
         self.dropout = dropout
         self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.multi_output = multi_output
         self.y_mean_ = None
         self.boosters_ = None 
     
@@ -90,6 +106,20 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
         
         # Store the results of the list comprehension
         self.boosters_ = []
+        # Single booster on all classes at once
+        if self.multi_output:
+            booster = _RustBooster(
+                self.base_estimator,
+                self.n_estimators,
+                self.learning_rate,
+                self.n_hidden_features,
+                self.direct_link,
+                weights_distribution=self.weights_distribution
+            )
+            booster.fit_bagging(X, Y, dropout=self.dropout, seed=self.random_state, 
+                                n_jobs=self.n_jobs)
+            self.boosters_.append(booster)
+            return self
         for i in range(self.n_classes_):
             booster = _RustBooster(
                 self.base_estimator,
@@ -99,7 +129,8 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
                 self.direct_link,
                 weights_distribution=self.weights_distribution
             )
-            booster.fit_bagging(X, Y[:, i], dropout=self.dropout, seed=self.random_state)
+            booster.fit_bagging(X, Y[:, i], dropout=self.dropout, seed=self.random_state, 
+                                n_jobs=self.n_jobs)
             self.boosters_.append(booster)            
         return self
     
@@ -132,7 +163,22 @@ class RandomBagClassifier(BaseEstimator, ClassifierMixin):
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        raw_preds = np.asarray([booster.predict_bagging(X) for booster in self.boosters_])
+        if self.multi_output:
+            raw_preds = self.boosters_[0].predict_bagging(X).T
+        else:
+            raw_preds = np.asarray([booster.predict_bagging(X) for booster in self.boosters_])
         shifted_preds = raw_preds - np.max(raw_preds, axis=0)
         exp_preds = np.exp(shifted_preds)
-        return exp_preds / np.sum(exp_preds, axis=0)
\ No newline at end of file
+        return exp_preds / np.sum(exp_preds, axis=0)
+
+    def memory_usage(self) -> dict:
+        """Bytes held by the fitted model, summed over its boosters_.
+
+        Returns:
+
+            usage: Bytes of the stage weights ("weights"), of the input columns of the 
+            stages ("columns"), of the scaler ("scaler"), of each base learner ("learners", 
+            an array; Python learners count their pickled size), and their sum ("total"). 
+            "alphas" is 0 (AdaBoost only).
+        """
+        return memory_usage(self.boosters_)
\ No newline at end of file
@@ -6,6 +6,9 @@ from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.linear_model import Ridge
 from .rust_core import RustBooster as _RustBooster
+from .inference import predict_fused
+from .sparse import make_scaler, scale_inputs
+from .memory import memory_usage
 
 class RandomBagRegressor(BaseEstimator, RegressorMixin):
     """Generic Random Bagging Regressor (for any base learner).
@@ -22,17 +25,54 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
 
             direct_link: Whether to use direct link for the base learner or not.
 
-            weights_distribution: Distribution of the weights for the booster (uniform or normal).
+            weights_distribution: Distribution of the weights for the booster (uniform or normal), 
+            or a structured random projection: "achlioptas" or "very_sparse" (sparse signed
+            weights, applied with a sparse kernel) or "srht" (subsampled randomized Hadamard 
+            transform, applied with a fast Walsh-Hadamard transform when cheaper than a dense product), 
+            or packed weights: "sign" (+1 or -1, stored as bits) or "int8" (k / 127 for an integer 
+            k, stored as bytes), unpacked for the matrix products of predictions.
 
             dropout: Dropout rate.
 
+            colsample: Fraction of the input features each stage sees, drawn without 
+            replacement, for both its hidden layer and its direct link.
+
+            compact_weights: Whether to store one seed per stage instead of its hidden layer 
+            weights, which are then regenerated when predicting (the model size is then 
+            mostly the base learners, at the cost of slower predictions).
+
+            weights_cache_size: Number of regenerated stage weights kept in memory with 
+            compact_weights (the least recently used are dropped first).
+
             random_state: Random state.
 
+            n_jobs: Number of threads fitting the bagging stages in parallel (None means 1, 
+            -1 means all CPUs). The fitted model does not depend on this value.
+
+            dtype: Precision of the inputs and hidden features, np.float64 or np.float32 
+            (which halves their memory). Targets and predictions stay in float64.
+
+            profile: Whether to record the time spent in each phase of every stage in 
+            fit_profile_ (profiling has almost no cost when disabled).
+
+            track_memory: Whether to record the peak bytes allocated by the Rust side of 
+            the fit (inputs and copies, hidden features, residuals, native base learners; 
+            not the memory of Python base learners) in peak_fit_memory_.
+
         Attributes:
         
             baggers_: The bagging learners.
 
-            y_mean_: The mean of the target variable.
+            y_mean_: The mean of the target variable (one value per output for 2D targets).
+
+            fused_: Stage coefficients gathered by compile (None otherwise).
+
+            fit_profile_: With profile, a record array of the nanoseconds spent in each 
+            phase of every stage (see BoosterRegressor; stages are not predicted on the 
+            training data, so "loss" is nan). None otherwise.
+
+            peak_fit_memory_: With track_memory, peak bytes allocated by the Rust side of 
+            the last fit, above the bytes allocated when it started. None otherwise.
 
         Examples:
 
@@ -49,7 +89,14 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
         direct_link: bool = True,
         weights_distribution: str = 'uniform',
         dropout: float = 0.0,
-        random_state: Optional[int] = 42
+        colsample: float = 1.0,
+        compact_weights: bool = False,
+        weights_cache_size: int = 0,
+        random_state: Optional[int] = 42,
+        n_jobs: Optional[int] = None,
+        dtype=np.float64,
+        profile: bool = False,
+        track_memory: bool = False
     ):
         self.base_estimator = base_estimator
         self.n_estimators = n_estimators
@@ -58,7 +105,14 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
         self.direct_link = direct_link
         self.weights_distribution = weights_distribution
         self.dropout = dropout
+        self.colsample = colsample
+        self.compact_weights = compact_weights
+        self.weights_cache_size = weights_cache_size
         self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+        self.profile = profile
+        self.track_memory = track_memory
         self.scaler_ = StandardScaler()
         self.y_mean_ = None
 
@@ -67,7 +121,8 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
         
         Parameters:
 
-            X: Input data.
+            X: Input data, dense or scipy sparse (kept in CSR format, and scaled 
+            without centering).
 
             y: Target data.
             
@@ -79,9 +134,12 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
             X = X.values
         if isinstance(y, pd.DataFrame):
             y = y.values
-        scaled_X = self.scaler_.fit_transform(X)
-        self.y_mean_ = np.mean(y)
-        centered_y = y - self.y_mean_
+        self.fused_ = None
+        self.scaler_ = make_scaler(X)
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype, fit=True)
+        y = np.asarray(y, dtype=np.float64)
+        self.y_mean_ = np.mean(y, axis=0)
+        centered_y = np.ascontiguousarray(y - self.y_mean_)
         # Use Ridge as default base estimator if none provided
         if self.base_estimator is None:
             self.base_estimator_ = Ridge()
@@ -94,15 +152,23 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
             self.learning_rate,
             self.n_hidden_features,
             self.direct_link,
-            weights_distribution=self.weights_distribution
+            weights_distribution=self.weights_distribution,
+            colsample=self.colsample,
+            compact_weights=self.compact_weights,
+            weights_cache_size=self.weights_cache_size,
+            profile=self.profile,
+            track_memory=self.track_memory
         )        
         # Fit the model
         self.booster_.fit_bagging(
-            np.asarray(scaled_X, dtype=np.float64), 
+            scaled_X, 
             np.asarray(centered_y, dtype=np.float64),
             dropout=self.dropout,
-            seed=self.random_state if self.random_state is not None else 42
+            seed=self.random_state if self.random_state is not None else 42,
+            n_jobs=self.n_jobs
         )        
+        self.fit_profile_ = self.booster_.fit_profile
+        self.peak_fit_memory_ = self.booster_.peak_fit_memory
         return self
         
     def predict(self, X) -> np.ndarray:
@@ -118,5 +184,34 @@ class RandomBagRegressor(BaseEstimator, RegressorMixin):
         """
         if isinstance(X, pd.DataFrame):
             X = X.values
-        scaled_X = self.scaler_.transform(X)
+        if getattr(self, "fused_", None) is not None:
+            return predict_fused(self.fused_, X)
+        scaled_X = scale_inputs(self.scaler_, X, self.dtype)
         return self.booster_.predict_bagging(scaled_X) + self.y_mean_
+
+    def compile(self) -> "RandomBagRegressor":
+        """Evaluate all stages at once, when the base learners are linear.
+
+        The coefficients of every stage (with the scaling and y_mean_ folded in) are 
+        applied with batched products instead of calling each base learner, before 
+        taking the median. Refitting discards the fused model.
+            
+        Returns:
+
+            self: The compiled model.
+        """
+        from .export import fuse_linear_stages
+        self.fused_ = fuse_linear_stages(self)
+        return self
+
+    def memory_usage(self) -> dict:
+        """Bytes held by the fitted model.
+
+        Returns:
+
+            usage: Bytes of the stage weights ("weights"), of the input columns of the 
+            stages ("columns"), of the scaler ("scaler"), of each base learner ("learners", 
+            an array; Python learners count their pickled size), and their sum ("total"). 
+            "alphas" is 0 (AdaBoost only).
+        """
+        return memory_usage([self.booster_], [self.scaler_])
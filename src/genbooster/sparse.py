@@ -0,0 +1,41 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import StandardScaler
+
+
+def make_scaler(X) -> StandardScaler:
+    """StandardScaler for the training inputs X.
+
+    Sparse inputs are only scaled, not centered, so that they stay sparse.
+    """
+    return StandardScaler(with_mean=not sp.issparse(X))
+
+
+def scale_inputs(scaler: StandardScaler, X, dtype, fit: bool = False):
+    """Scale X in the model's precision, for the Rust core.
+
+    Parameters:
+
+        scaler: StandardScaler (see make_scaler).
+
+        X: Input data, dense or scipy sparse.
+
+        dtype: Precision of the inputs, np.float64 or np.float32.
+
+        fit: Whether to fit the scaler on X first.
+
+    Returns:
+
+        scaled_X: C-contiguous array, or CSR matrix with sorted indices. Sparse
+        inputs are densified when the scaler centers the data (fitted on dense inputs).
+    """
+    if sp.issparse(X) and scaler.with_mean:
+        X = X.toarray()
+    if not sp.issparse(X):
+        X = np.asarray(X, dtype=dtype)
+    scaled_X = scaler.fit_transform(X) if fit else scaler.transform(X)
+    if not sp.issparse(scaled_X):
+        return np.ascontiguousarray(scaled_X, dtype=dtype)
+    scaled_X = sp.csr_matrix(scaled_X, dtype=dtype)
+    scaled_X.sort_indices()
+    return scaled_X
@@ -1,10 +1,11 @@
-use numpy::{PyArray1, PyArray2, PyReadonlyArray1, PyReadonlyArray2, ToPyArray};
+use numpy::{IntoPyArray, PyArray1, PyArray2, PyReadonlyArray1, PyReadonlyArray2, ToPyArray};
 use pyo3::prelude::*;
-use pyo3::types::PyDict;
+use pyo3::types::{PyBytes, PyDict};
 use rand::Rng;
 use rand::SeedableRng;
 use rand::rngs::StdRng;
-use ndarray::{Array1, Array2, Axis};
+use ndarray::{Array1, Array2, ArrayView1, ArrayView2, ArrayViewMut2, Axis, CowArray, Ix2};
+use ndarray::linalg::general_mat_mul;
 use ndarray::s;
 use linfa::traits::{Fit, Predict};
 use linfa_linear::LinearRegression;
@@ -14,25 +15,1190 @@ use pyo3::exceptions::PyValueError;
 use linfa::Dataset;
 use linfa_linear::FittedLinearRegression;
 use rand_chacha::ChaCha20Rng;
+use std::ops::Range;
+use std::sync::OnceLock;
+use std::time::{Duration, Instant};
+mod extratree;
+mod memory;
+mod persistence;
+mod profile;
+mod projection;
+mod real;
 mod rust_utils;
-use rust_utils::create_rng;
+mod sparse;
+mod weights;
+use extratree::{ExtraTreeParams, ExtraTreeRegressor, Features};
+use memory::PeakTracker;
+use profile::{FitProfile, Phase, StageTimer};
+use projection::{random_weights, Projection, WeightsDistribution};
+use real::Real;
+use rust_utils::{create_rng, create_stream_rng};
+use sparse::Csr;
+use weights::{seeded_weights, PackedWeights, SeededWeights, WeightStore};
 
-#[derive(Clone, Copy)]
-enum WeightsDistribution {
-    Uniform,
-    Normal,
+// ChaCha stream used by native base learners, distinct from the hidden layer's
+const LEARNER_STREAM: u64 = 1;
+
+// First, create a new enum to hold uninitialized models
+enum RegressionModelParams {
+    LinearRegression(LinearRegression),
+    ElasticNet { penalty: f64, l1_ratio: f64 },
+}
+
+// Update RegressionModel enum for initialized models
+enum RegressionModel {
+    LinearRegression(FittedLinearRegression<f64>),  // Changed to FittedLinearRegression
+    ElasticNet(ElasticNet<f64>),
+}
+
+// Base learner template, resolved once from the `base_estimator` argument
+#[derive(Clone)]
+enum LearnerSpec {
+    Python(PyObject),
+    ExtraTree(ExtraTreeParams),
+    Linfa(String),
+}
+
+// Fitted base learner of one stage (linfa models are kept as their coefficients)
+enum BaseLearner {
+    Python(PyObject),
+    ExtraTree(ExtraTreeRegressor),
+    Linear { coefficients: Array1<f64>, intercept: f64 },
+}
+
+// Sorted indices of a `fraction` of 0..n drawn without replacement from `rng` (the
+// rows a stage is fitted on, or the columns it sees), or None for all of them
+fn sample_indices(rng: &mut ChaCha20Rng, n: usize, fraction: f64) -> Option<Vec<usize>> {
+    let n_sampled = sample_size(n, fraction)?;
+    let mut indices = rand::seq::index::sample(rng, n, n_sampled).into_vec();
+    indices.sort_unstable();
+    Some(indices)
+}
+
+// Number of indices drawn by `sample_indices` (None when nothing is drawn)
+fn sample_size(n: usize, fraction: f64) -> Option<usize> {
+    if fraction >= 1.0 || n == 0 {
+        None
+    } else {
+        Some(((fraction * n as f64).round() as usize).clamp(1, n))
+    }
+}
+
+fn check_fraction(name: &str, fraction: f64) -> PyResult<f64> {
+    if fraction > 0.0 && fraction <= 1.0 {
+        Ok(fraction)
+    } else {
+        Err(PyValueError::new_err(format!("{} must be in (0, 1], got {}", name, fraction)))
+    }
+}
+
+// Columns of x seen by stage `i` (None when every stage sees all of them)
+fn stage_columns(columns: &[Vec<usize>], i: usize) -> Option<&[usize]> {
+    columns.get(i).map(|c| c.as_slice())
+}
+
+// Number of worker threads for `n_jobs`, following the joblib convention
+// (None means 1, negative values count back from the number of CPUs)
+fn resolve_n_jobs(n_jobs: Option<i64>) -> usize {
+    let n_cpus = std::thread::available_parallelism().map_or(1, |n| n.get()) as i64;
+    match n_jobs {
+        None | Some(0) => 1,
+        Some(n) if n < 0 => (n_cpus + 1 + n).max(1) as usize,
+        Some(n) => n as usize,
+    }
+}
+
+// Weights of the stages fitted by one call, kept the way their store keeps them:
+// dense, packed right away, or dropped for seeded stores (which only keep the
+// seeds), so that fitting a compact or packed model never holds the dense
+// weights of all its stages
+enum NewWeights {
+    Dense(Vec<Array2<f64>>),
+    Packed(PackedWeights),
+    Seeded,
+}
+
+impl NewWeights {
+    // No weights yet, for stages to be added to `store`
+    fn new(store: &WeightStore) -> Self {
+        match store {
+            WeightStore::Seeded(_) => NewWeights::Seeded,
+            WeightStore::Packed(packed) => NewWeights::Packed(PackedWeights::new(
+                packed.weights_distribution,
+                packed.n_features,
+                packed.n_hidden_features,
+            )),
+            _ => NewWeights::Dense(Vec::new()),
+        }
+    }
+
+    fn push(&mut self, w: Array2<f64>) {
+        match self {
+            NewWeights::Dense(weights) => weights.push(w),
+            NewWeights::Packed(packed) => packed.push(w.view()),
+            NewWeights::Seeded => {}
+        }
+    }
+}
+
+// All stage weights side by side, (n_features, n_stages * n_hidden_features), so that
+// prediction computes the hidden features of every stage with one matrix product.
+// `previous` holds the weights of already fitted stages (warm start), and
+// `weights` must come from `NewWeights::new(previous)`. Seeded stores only keep
+// the `seeds` of the new weights.
+fn stack_weights(previous: &WeightStore, weights: NewWeights, seeds: &[u64]) -> WeightStore {
+    let (previous, weights) = match (previous, weights) {
+        (WeightStore::Seeded(previous), _) => return WeightStore::Seeded(previous.extend(seeds)),
+        (WeightStore::Packed(previous), NewWeights::Packed(weights)) => {
+            return WeightStore::Packed(previous.append(&weights))
+        }
+        (_, NewWeights::Dense(weights)) => (previous.view().unwrap(), weights),
+        _ => unreachable!("new weights do not match their store"),
+    };
+    let mut views: Vec<ArrayView2<f64>> = weights.iter().map(|w| w.view()).collect();
+    if previous.ncols() > 0 {
+        views.insert(0, previous);
+    }
+    WeightStore::Owned(ndarray::concatenate(Axis(1), &views).unwrap_or_else(|_| Array2::zeros((0, 0))))
+}
+
+// Kernels of the stages of a model (see `Projection`), built from their weights on
+// first use. Models replace them with empty ones whenever their weights change.
+#[derive(Default)]
+struct StageProjections(OnceLock<Vec<Projection>>);
+
+impl StageProjections {
+    fn get(
+        &self,
+        stacked_weights: &WeightStore,
+        n_stages: usize,
+        n_hidden: usize,
+        weights_distribution: WeightsDistribution,
+    ) -> &[Projection] {
+        self.0.get_or_init(|| {
+            // Dense kernels do not need the weights (nor their regeneration)
+            if !weights_distribution.uses_kernel(stacked_weights.shape().0, n_hidden) {
+                return (0..n_stages).map(|_| Projection::Dense).collect();
+            }
+            (0..n_stages)
+                .map(|i| Projection::new(stacked_weights.stage(i, n_hidden).view(), weights_distribution))
+                .collect()
+        })
+    }
+}
+
+// Store without stages: compact models keep the seeds of stages seeing
+// `n_features` columns, and regenerate their weights; sign and int8 weights
+// are packed
+fn empty_weights(
+    compact: bool,
+    weights_distribution: WeightsDistribution,
+    n_features: usize,
+    n_hidden_features: usize,
+    cache_size: usize,
+) -> WeightStore {
+    if !compact {
+        if weights_distribution.is_packed() {
+            return WeightStore::Packed(PackedWeights::new(weights_distribution, n_features, n_hidden_features));
+        }
+        return WeightStore::empty();
+    }
+    WeightStore::Seeded(SeededWeights::new(Vec::new(), weights_distribution, n_features, n_hidden_features, cache_size))
+}
+
+// Weights of a new stage drawn from `rng`. For compact models (given `seeds`), a
+// seed is drawn instead and pushed to `seeds`, and the weights are generated from it
+fn draw_weights(
+    rng: &mut ChaCha20Rng,
+    weights_distribution: WeightsDistribution,
+    n_features: usize,
+    n_hidden_features: usize,
+    seeds: Option<&mut Vec<u64>>,
+) -> Array2<f64> {
+    match seeds {
+        Some(seeds) => {
+            let seed = rng.gen::<u64>();
+            seeds.push(seed);
+            seeded_weights(seed, weights_distribution, n_features, n_hidden_features)
+        }
+        None => random_weights(rng, weights_distribution, n_features, n_hidden_features),
+    }
+}
+
+// Rows of the blocks in which prediction computes the hidden features of every
+// stage at once: the stacked hidden features then take at most
+// PREDICT_BLOCK_ROWS * n_stages * n_hidden_features values, whatever the number
+// of samples
+const PREDICT_BLOCK_ROWS: usize = 8192;
+
+// ReLU hidden features of every stage at once, (n_samples, n_stages * n_hidden_features)
+fn stacked_hidden<F: Real>(x: &Matrix<F>, stacked_weights: ArrayView2<F>) -> Array2<F> {
+    let mut hidden = x.dot(stacked_weights);
+    hidden.mapv_inplace(|v| if v > F::zero() { v } else { F::zero() });
+    hidden
+}
+
+// Input features of a fit or predict call, or inputs of a base learner: a dense
+// array (borrowed or owned), or a sparse CSR matrix
+enum Matrix<'a, F: Real> {
+    Dense(CowArray<'a, F, Ix2>),
+    Sparse(Csr<'a, F>),
+}
+
+impl<'a, F: Real> Matrix<'a, F> {
+    fn dim(&self) -> (usize, usize) {
+        match self {
+            Matrix::Dense(x) => x.dim(),
+            Matrix::Sparse(x) => (x.nrows(), x.n_cols),
+        }
+    }
+
+    fn view(&self) -> Matrix<'_, F> {
+        match self {
+            Matrix::Dense(x) => Matrix::Dense(CowArray::from(x.view())),
+            Matrix::Sparse(x) => Matrix::Sparse(x.view()),
+        }
+    }
+
+    fn dot(&self, w: ArrayView2<F>) -> Array2<F> {
+        match self {
+            Matrix::Dense(x) => x.dot(&w),
+            Matrix::Sparse(x) => x.dot(w),
+        }
+    }
+
+    // `out = self . w`
+    fn dot_into(&self, w: ArrayView2<F>, mut out: ArrayViewMut2<F>) {
+        match self {
+            Matrix::Dense(x) => general_mat_mul(F::one(), x, &w, F::zero(), &mut out),
+            Matrix::Sparse(x) => x.dot_into(w, out),
+        }
+    }
+
+    fn select_columns(&self, columns: &[usize]) -> Matrix<'static, F> {
+        match self {
+            Matrix::Dense(x) => Matrix::Dense(CowArray::from(x.select(Axis(1), columns))),
+            Matrix::Sparse(x) => Matrix::Sparse(x.select_columns(columns)),
+        }
+    }
+
+    // Contiguous rows (viewed when dense, copied when sparse)
+    fn slice_rows(&self, rows: Range<usize>) -> Matrix<'_, F> {
+        match self {
+            Matrix::Dense(x) => Matrix::Dense(CowArray::from(x.slice(s![rows, ..]))),
+            Matrix::Sparse(x) => Matrix::Sparse(x.select_rows(&rows.collect::<Vec<_>>())),
+        }
+    }
+
+    fn select_rows(&self, rows: &[usize]) -> Matrix<'static, F> {
+        match self {
+            Matrix::Dense(x) => Matrix::Dense(CowArray::from(x.select(Axis(0), rows))),
+            Matrix::Sparse(x) => Matrix::Sparse(x.select_rows(rows)),
+        }
+    }
+
+    // Calls `f` with the column and value of the nonzero entries of row `i`
+    fn for_each_in_row(&self, i: usize, mut f: impl FnMut(usize, F)) {
+        match self {
+            Matrix::Dense(x) => {
+                let nonzero = x.row(i).into_iter().enumerate().filter(|&(_, &v)| v != F::zero());
+                nonzero.for_each(|(j, &v)| f(j, v));
+            }
+            Matrix::Sparse(x) => {
+                let (columns, values) = x.row(i);
+                columns.iter().zip(values).for_each(|(&j, &v)| f(j, v));
+            }
+        }
+    }
+
+    // NumPy array or scipy CSR matrix (dense owned inputs are moved, not copied)
+    fn into_py(self, py: Python) -> PyResult<PyObject> {
+        match self {
+            Matrix::Dense(x) => Ok(x.into_owned().into_pyarray(py).to_object(py)),
+            Matrix::Sparse(x) => x.to_scipy(py),
+        }
+    }
+
+    // Dense features, for learners that do not take sparse inputs
+    fn into_dense(self) -> CowArray<'a, F, Ix2> {
+        match self {
+            Matrix::Dense(x) => x,
+            Matrix::Sparse(x) => CowArray::from(x.to_dense()),
+        }
+    }
+}
+
+// Base learner inputs of one stage at a time: the hidden features, preceded by
+// the original features when `direct_link` is set. The buffer is allocated and
+// the original features are written once, then each stage only overwrites the
+// hidden columns. With column subsampling, the direct link holds the columns
+// seen by the stage, and is rewritten by each stage. Sparse features stay
+// sparse: the buffer then only holds the hidden columns, and the direct link is
+// a sparse matrix built for each stage.
+struct StageInputs<F: Real> {
+    combined: Array2<F>,
+    n_direct: usize,
+    sparse_direct: bool,
+}
+
+impl<F: Real> StageInputs<F> {
+    // `n_columns` is the number of columns of x seen by each stage (None for all)
+    fn new(x: &Matrix<F>, n_columns: Option<usize>, n_hidden_features: usize, direct_link: bool) -> Self {
+        let (n_samples, n_features) = x.dim();
+        let (n_direct, sparse_direct) = match x {
+            Matrix::Dense(_) if direct_link => (n_columns.unwrap_or(n_features), false),
+            Matrix::Dense(_) => (0, false),
+            Matrix::Sparse(_) => (0, direct_link),
+        };
+        let mut combined = Array2::zeros((n_samples, n_direct + n_hidden_features));
+        if let (Matrix::Dense(x), None) = (x, n_columns) {
+            combined.slice_mut(s![.., ..n_direct]).assign(&x.slice(s![.., ..n_direct]));
+        }
+        StageInputs { combined, n_direct, sparse_direct }
+    }
+
+    // Base learner inputs, once the hidden columns are written
+    fn inputs(&self, x: &Matrix<F>) -> Matrix<'_, F> {
+        match x {
+            Matrix::Sparse(x) if self.sparse_direct => Matrix::Sparse(x.hstack(self.combined.view())),
+            _ => Matrix::Dense(CowArray::from(self.combined.view())),
+        }
+    }
+
+    // Inputs from precomputed hidden features (used as is without direct link)
+    fn load<'a>(&'a mut self, x: &Matrix<F>, hidden: ArrayView2<'a, F>) -> Matrix<'a, F> {
+        match x {
+            Matrix::Sparse(x) if self.sparse_direct => return Matrix::Sparse(x.hstack(hidden)),
+            _ => {}
+        }
+        let n_direct = self.n_direct;
+        if n_direct == 0 {
+            return Matrix::Dense(CowArray::from(hidden));
+        }
+        self.combined.slice_mut(s![.., n_direct..]).assign(&hidden);
+        Matrix::Dense(CowArray::from(self.combined.view()))
+    }
+
+    // Inputs of a training stage: ReLU(x . w) with inverted dropout, written in
+    // place by a single product (with the kernel `projection` of w) and a single
+    // pass over the hidden columns
+    fn forward(
+        &mut self,
+        x: &Matrix<F>,
+        w: ArrayView2<F>,
+        projection: &Projection,
+        dropout: f64,
+        seed: u64,
+    ) -> Matrix<'_, F> {
+        let mut rng = create_rng(seed);
+        let n_direct = self.n_direct;
+        let keep = F::from_f64(1.0 - dropout);
+        let mut hidden = self.combined.slice_mut(s![.., n_direct..]);
+        projection.apply(x, w, hidden.view_mut());
+        // Logical (row-major) order, so that dropout masks do not depend on the layout
+        for val in hidden.iter_mut() {
+            let relu = if *val > F::zero() { *val } else { F::zero() };
+            *val = if dropout <= 0.0 {
+                relu
+            } else if rng.gen::<f64>() < dropout {
+                F::zero()
+            } else {
+                relu / keep
+            };
+        }
+        self.inputs(x)
+    }
+
+    // `forward` for a stage that only sees the given columns of x (all of them when None)
+    fn forward_columns(
+        &mut self,
+        x: &Matrix<F>,
+        columns: Option<&[usize]>,
+        w: ArrayView2<F>,
+        projection: &Projection,
+        dropout: f64,
+        seed: u64,
+    ) -> Matrix<'_, F> {
+        let columns = match columns {
+            Some(columns) => columns,
+            None => return self.forward(x, w, projection, dropout, seed),
+        };
+        let x = x.select_columns(columns);
+        let n_direct = self.n_direct;
+        if let Matrix::Dense(x) = &x {
+            if n_direct > 0 {
+                self.combined.slice_mut(s![.., ..n_direct]).assign(x);
+            }
+        }
+        self.forward(&x, w, projection, dropout, seed)
+    }
+}
+
+// Held-out data scored after every stage. Its predictions are updated with each
+// new stage instead of being recomputed from all stages.
+struct Validation<'a, F: Real> {
+    x: Matrix<'a, F>,
+    y: ArrayView2<'a, f64>,
+    inputs: StageInputs<F>,
+    predictions: Array2<f64>,
+}
+
+impl<'a, F: Real> Validation<'a, F> {
+    fn new(
+        x: Matrix<'a, F>,
+        y: ArrayView2<'a, f64>,
+        n_columns: Option<usize>,
+        n_hidden_features: usize,
+        direct_link: bool,
+    ) -> Self {
+        Validation {
+            inputs: StageInputs::new(&x, n_columns, n_hidden_features, direct_link),
+            x,
+            y,
+            predictions: Array2::zeros(y.raw_dim()),
+        }
+    }
+
+    fn add_stage(
+        &mut self,
+        base_learner: &BaseLearner,
+        columns: Option<&[usize]>,
+        w: ArrayView2<f64>,
+        projection: &Projection,
+        weight: f64,
+    ) -> PyResult<()> {
+        let (inputs, predictions) = (&mut self.inputs, &mut self.predictions);
+        add_stage_predictions(&self.x, columns, w, projection, base_learner, weight, inputs, predictions)
+    }
+
+    // Mean squared error of `scale` times the accumulated predictions
+    fn loss(&self, scale: f64) -> f64 {
+        let squared_error: f64 = self
+            .y
+            .iter()
+            .zip(self.predictions.iter())
+            .map(|(&y, &pred)| (y - scale * pred).powi(2))
+            .sum();
+        squared_error / self.y.len().max(1) as f64
+    }
+}
+
+// Add `weight` times the predictions of one stage to `accumulator`
+// (no dropout, as in predict)
+fn add_stage_predictions<F: Real>(
+    x: &Matrix<F>,
+    columns: Option<&[usize]>,
+    w: ArrayView2<f64>,
+    projection: &Projection,
+    base_learner: &BaseLearner,
+    weight: f64,
+    inputs: &mut StageInputs<F>,
+    accumulator: &mut Array2<f64>,
+) -> PyResult<()> {
+    let w = F::weights(w);
+    let stage_inputs = inputs.forward_columns(x, columns, w.view(), projection, 0.0, 0);
+    let stage_predictions = base_learner.predict(&stage_inputs)?;
+    accumulator.scaled_add(weight, &stage_predictions);
+    Ok(())
+}
+
+// Calls `f` with the index of every stage, a range of rows, and the stage's
+// predictions for these rows. Without column subsampling, the hidden features of
+// all stages come from one matrix product per block of PREDICT_BLOCK_ROWS rows,
+// packed weights being unpacked once for all blocks (unless the weights are
+// regenerated from seeds or applied with the structured kernels `projections`:
+// then each stage computes its own, for all rows at once).
+fn for_each_stage_prediction<F: Real>(
+    x: &Matrix<F>,
+    stacked_weights: &WeightStore,
+    projections: &[Projection],
+    columns: &[Vec<usize>],
+    base_learners: &[BaseLearner],
+    n_hidden: usize,
+    direct_link: bool,
+    weights_distribution: WeightsDistribution,
+    mut f: impl FnMut(usize, Range<usize>, Array2<f64>),
+) -> PyResult<()> {
+    if base_learners.is_empty() {
+        return Ok(());
+    }
+    let (n_samples, n_features) = x.dim();
+    let n_columns = columns.first().map(Vec::len);
+    let stacked = if columns.is_empty() && !weights_distribution.uses_kernel(n_features, n_hidden) {
+        stacked_weights.dense_stacked()
+    } else {
+        None
+    };
+    let stacked = match stacked {
+        Some(stacked) => stacked,
+        // Each stage reads its own columns of x, regenerates its weights, or
+        // applies them with its structured kernel
+        _ => {
+            let mut inputs = StageInputs::new(x, n_columns, n_hidden, direct_link);
+            for (i, base_learner) in base_learners.iter().enumerate() {
+                let w = stacked_weights.stage(i, n_hidden);
+                let w = F::weights(w.view());
+                let stage_inputs =
+                    inputs.forward_columns(x, stage_columns(columns, i), w.view(), &projections[i], 0.0, 0);
+                f(i, 0..n_samples, base_learner.predict(&stage_inputs)?);
+            }
+            return Ok(());
+        }
+    };
+    let stacked = F::weights(stacked.view());
+    for block_start in (0..n_samples).step_by(PREDICT_BLOCK_ROWS) {
+        let rows = block_start..(block_start + PREDICT_BLOCK_ROWS).min(n_samples);
+        let x_block = x.slice_rows(rows.clone());
+        let mut inputs = StageInputs::new(&x_block, n_columns, n_hidden, direct_link);
+        let hidden = stacked_hidden(&x_block, stacked.view());
+        for (i, base_learner) in base_learners.iter().enumerate() {
+            let stage_inputs = inputs.load(&x_block, hidden.slice(s![.., i * n_hidden..(i + 1) * n_hidden]));
+            f(i, rows.clone(), base_learner.predict(&stage_inputs)?);
+        }
+    }
+    Ok(())
+}
+
+// Stops training once the monitored loss has not improved for `n_iter_no_change`
+// consecutive stages. An improvement must exceed `tolerance`, or `tolerance`
+// times the best loss so far when `relative` is set.
+struct EarlyStopping {
+    n_iter_no_change: usize,
+    tolerance: f64,
+    relative: bool,
+    best_loss: f64,
+    n_no_change: usize,
+}
+
+impl EarlyStopping {
+    fn new(n_iter_no_change: usize, tolerance: f64, relative: bool) -> Self {
+        EarlyStopping {
+            n_iter_no_change: n_iter_no_change.max(1),
+            tolerance,
+            relative,
+            best_loss: f64::INFINITY,
+            n_no_change: 0,
+        }
+    }
+
+    // Record the loss after a stage, and return whether to stop
+    fn update(&mut self, loss: f64) -> bool {
+        let margin = if self.relative { self.tolerance * self.best_loss.abs() } else { self.tolerance };
+        if !self.best_loss.is_finite() || loss < self.best_loss - margin {
+            self.n_no_change = 0;
+        } else {
+            self.n_no_change += 1;
+        }
+        self.best_loss = self.best_loss.min(loss);
+        self.n_no_change >= self.n_iter_no_change
+    }
+}
+
+// Views of optional validation inputs (in the precision of the training inputs) and targets
+unsafe fn validation_arrays<'py, F: Real>(
+    x_val: Option<&'py PyAny>,
+    y_val: Option<&'py PyAny>,
+) -> PyResult<Option<(Matrix<'py, F>, ArrayView2<'py, f64>)>> {
+    match (x_val, y_val) {
+        (Some(x_val), Some(y_val)) => {
+            let x_val = if sparse::is_sparse(x_val) {
+                Matrix::Sparse(Csr::from_scipy(x_val)?)
+            } else {
+                Matrix::Dense(CowArray::from(x_val.extract::<&PyArray2<F>>()?.as_array()))
+            };
+            Ok(Some((x_val, targets_as_array(y_val)?.0)))
+        }
+        (None, None) => Ok(None),
+        _ => Err(PyValueError::new_err("x_val and y_val must be provided together")),
+    }
+}
+
+impl<'a, F: Real> Features for ArrayView2<'a, F> {
+    fn n_rows(&self) -> usize {
+        self.nrows()
+    }
+
+    fn n_cols(&self) -> usize {
+        self.ncols()
+    }
+
+    #[inline]
+    fn get(&self, row: usize, col: usize) -> f64 {
+        self[[row, col]].to_f64()
+    }
+}
+
+// Input features of a fit or predict call, in single or double precision
+enum InputArray<'py> {
+    F32(Matrix<'py, f32>),
+    F64(Matrix<'py, f64>),
+}
+
+unsafe fn input_array(x: &PyAny) -> PyResult<InputArray> {
+    if sparse::is_sparse(x) {
+        // scipy CSR matrix, read in place
+        return if x.getattr("data")?.extract::<&PyArray1<f32>>().is_ok() {
+            Ok(InputArray::F32(Matrix::Sparse(Csr::from_scipy(x)?)))
+        } else {
+            Ok(InputArray::F64(Matrix::Sparse(Csr::from_scipy(x)?)))
+        };
+    }
+    match x.extract::<&PyArray2<f32>>() {
+        Ok(x) => Ok(InputArray::F32(Matrix::Dense(CowArray::from(x.as_array())))),
+        Err(_) => Ok(InputArray::F64(Matrix::Dense(CowArray::from(x.extract::<&PyArray2<f64>>()?.as_array())))),
+    }
+}
+
+// Evaluates `$body` with `$x` bound to the input features in their own precision
+macro_rules! with_input_array {
+    ($input:expr, |$x:ident| $body:expr) => {
+        match unsafe { input_array($input)? } {
+            InputArray::F32($x) => $body,
+            InputArray::F64($x) => $body,
+        }
+    };
+}
+
+// Input features of staged predictions: a NumPy array kept alive and read in
+// place, or a copy of a sparse matrix
+enum StagedMatrix<F: Real> {
+    Dense(Py<PyArray2<F>>),
+    Sparse(Csr<'static, F>),
+}
+
+impl<F: Real> StagedMatrix<F> {
+    fn matrix<'py>(&'py self, py: Python<'py>) -> Matrix<'py, F> {
+        match self {
+            StagedMatrix::Dense(x) => Matrix::Dense(CowArray::from(unsafe { x.as_ref(py).as_array() })),
+            StagedMatrix::Sparse(x) => Matrix::Sparse(x.view()),
+        }
+    }
+}
+
+// Input features of staged predictions with the buffer of their stage inputs
+struct StagedInput<F: Real> {
+    x: StagedMatrix<F>,
+    inputs: StageInputs<F>,
+}
+
+impl<F: Real> StagedInput<F> {
+    fn new(py: Python, x: StagedMatrix<F>, n_columns: Option<usize>, n_hidden_features: usize, direct_link: bool) -> Self {
+        let inputs = StageInputs::new(&x.matrix(py), n_columns, n_hidden_features, direct_link);
+        StagedInput { x, inputs }
+    }
+
+    // Add `weight` times the predictions of one stage to `accumulator` (see `add_stage_predictions`)
+    fn add_stage(
+        &mut self,
+        py: Python,
+        columns: Option<&[usize]>,
+        w: ArrayView2<f64>,
+        projection: &Projection,
+        base_learner: &BaseLearner,
+        weight: f64,
+        accumulator: &mut Array2<f64>,
+    ) -> PyResult<()> {
+        let (x, inputs) = (self.x.matrix(py), &mut self.inputs);
+        py.allow_threads(|| add_stage_predictions(&x, columns, w, projection, base_learner, weight, inputs, accumulator))
+    }
+}
+
+// Inputs of staged predictions in their own precision, which is the model's (as
+// in predict): the hidden features, and the splits of native trees fitted on
+// them, are then the same as in predict
+enum StagedInputs {
+    F32(StagedInput<f32>),
+    F64(StagedInput<f64>),
+}
+
+impl StagedInputs {
+    fn new(
+        py: Python,
+        x: &PyAny,
+        n_columns: Option<usize>,
+        n_hidden_features: usize,
+        direct_link: bool,
+    ) -> PyResult<Self> {
+        macro_rules! staged {
+            ($variant:ident, $x:expr) => {
+                StagedInputs::$variant(StagedInput::new(py, $x, n_columns, n_hidden_features, direct_link))
+            };
+        }
+        if sparse::is_sparse(x) {
+            // Sparse matrices are copied, and read as float64 unless they hold float32 values
+            if x.getattr("data")?.extract::<&PyArray1<f32>>().is_ok() {
+                return Ok(staged!(F32, StagedMatrix::Sparse(unsafe { Csr::from_scipy(x)? }.into_owned())));
+            }
+            let x = x.call_method1("astype", ("float64",))?;
+            return Ok(staged!(F64, StagedMatrix::Sparse(unsafe { Csr::from_scipy(x)? }.into_owned())));
+        }
+        match x.extract::<&PyArray2<f32>>() {
+            Ok(x) => Ok(staged!(F32, StagedMatrix::Dense(x.into()))),
+            Err(_) => Ok(staged!(F64, StagedMatrix::Dense(x.extract::<&PyArray2<f64>>()?.into()))),
+        }
+    }
+
+    fn n_samples(&self) -> usize {
+        match self {
+            StagedInputs::F32(input) => input.inputs.combined.nrows(),
+            StagedInputs::F64(input) => input.inputs.combined.nrows(),
+        }
+    }
+
+    fn add_stage(
+        &mut self,
+        py: Python,
+        columns: Option<&[usize]>,
+        w: ArrayView2<f64>,
+        projection: &Projection,
+        base_learner: &BaseLearner,
+        weight: f64,
+        accumulator: &mut Array2<f64>,
+    ) -> PyResult<()> {
+        match self {
+            StagedInputs::F32(input) => input.add_stage(py, columns, w, projection, base_learner, weight, accumulator),
+            StagedInputs::F64(input) => input.add_stage(py, columns, w, projection, base_learner, weight, accumulator),
+        }
+    }
+}
+
+impl LearnerSpec {
+    fn from_estimator(py: Python, base_estimator: PyObject) -> PyResult<Self> {
+        match base_estimator.extract::<String>(py).ok().as_deref() {
+            Some("rust_extratree") => Ok(LearnerSpec::ExtraTree(ExtraTreeParams::default())),
+            Some(name) => Err(PyValueError::new_err(format!("Unknown base estimator: {}", name))),
+            None => match linfa_model_name(py, &base_estimator) {
+                Some(model_name) => Ok(LearnerSpec::Linfa(model_name)),
+                None => Ok(LearnerSpec::Python(base_estimator)),
+            },
+        }
+    }
+
+    // Fit a fresh copy of the template (sklearn.base.clone for Python estimators)
+    // on (n_samples, n_outputs) targets. Sparse inputs are passed to Python
+    // learners as scipy CSR matrices, and densified for linfa models.
+    fn fit<F: Real>(
+        &self,
+        x: Matrix<F>,
+        y: ArrayView2<f64>,
+        sample_weight: Option<ArrayView1<f64>>,
+        seed: u64,
+        timer: &mut StageTimer,
+    ) -> PyResult<BaseLearner> {
+        match self {
+            LearnerSpec::Python(estimator) => Python::with_gil(|py| {
+                let start = timer.start();
+                let x = x.into_py(py)?;
+                timer.stop(Phase::Copy, start);
+                let learner = fit_python(py, estimator, x.as_ref(py), y, sample_weight, timer)?;
+                Ok(BaseLearner::Python(learner))
+            }),
+            LearnerSpec::ExtraTree(params) => {
+                let start = timer.start();
+                let learner = fit_extratree(params, &x, y, sample_weight, seed);
+                timer.stop(Phase::Fit, start);
+                Ok(learner)
+            }
+            LearnerSpec::Linfa(model_name) => {
+                if sample_weight.is_some() {
+                    return Err(PyValueError::new_err(format!("{} does not support sample weights", model_name)));
+                }
+                if y.ncols() != 1 {
+                    return Err(PyValueError::new_err(format!("{} does not support multi-output targets", model_name)));
+                }
+                let start = timer.start();
+                let (x, y) = (F::into_f64(x.into_dense()), y.column(0).to_owned());
+                timer.stop(Phase::Copy, start);
+                let start = timer.start();
+                let model = RegressionModelParams::from_name(model_name)?.fit(x, y)?;
+                timer.stop(Phase::Fit, start);
+                Ok(model.into_base_learner())
+            }
+        }
+    }
+
+    // Fit, then predict on the training inputs (boosting stages need both)
+    fn fit_predict<F: Real>(
+        &self,
+        x: Matrix<F>,
+        y: ArrayView2<f64>,
+        sample_weight: Option<ArrayView1<f64>>,
+        seed: u64,
+        timer: &mut StageTimer,
+    ) -> PyResult<(BaseLearner, StagePredictions)> {
+        match self {
+            LearnerSpec::Python(estimator) => Python::with_gil(|py| {
+                // Python takes ownership of the inputs (copied only if they are
+                // borrowed), and the learner predicts on the same array it was fitted on
+                let start = timer.start();
+                let x = x.into_py(py)?;
+                timer.stop(Phase::Copy, start);
+                let learner = fit_python(py, estimator, x.as_ref(py), y, sample_weight, timer)?;
+                let start = timer.start();
+                let pred_kwargs = PyDict::new(py);
+                pred_kwargs.set_item("X", x)?;
+                let pred = learner.call_method(py, "predict", (), Some(pred_kwargs))?;
+                timer.stop(Phase::Predict, start);
+                Ok((BaseLearner::Python(learner), StagePredictions::Python(pred)))
+            }),
+            LearnerSpec::ExtraTree(_) | LearnerSpec::Linfa(_) => {
+                // Native learners are fitted on a view (linfa takes ownership of a copy)
+                let learner = self.fit(x.view(), y, sample_weight, seed, timer)?;
+                let start = timer.start();
+                let pred = learner.predict(&x)?;
+                timer.stop(Phase::Predict, start);
+                Ok((learner, StagePredictions::Native(pred)))
+            }
+        }
+    }
+
+    // Fit on the given rows of the inputs only (all rows when None), then predict
+    // on all of them (boosting stages update the residuals of every sample)
+    fn fit_predict_rows<F: Real>(
+        &self,
+        x: Matrix<F>,
+        y: ArrayView2<f64>,
+        sample_weight: Option<ArrayView1<f64>>,
+        rows: Option<&[usize]>,
+        seed: u64,
+        timer: &mut StageTimer,
+    ) -> PyResult<(BaseLearner, StagePredictions)> {
+        let rows = match rows {
+            Some(rows) => rows,
+            None => return self.fit_predict(x, y, sample_weight, seed, timer),
+        };
+        let start = timer.start();
+        let sample_weight = sample_weight.map(|w| w.select(Axis(0), rows));
+        let (x_rows, y_rows) = (x.select_rows(rows), y.select(Axis(0), rows));
+        timer.stop(Phase::Copy, start);
+        let learner = self.fit(x_rows, y_rows.view(), sample_weight.as_ref().map(|w| w.view()), seed, timer)?;
+        let start = timer.start();
+        let pred = learner.predict(&x)?;
+        timer.stop(Phase::Predict, start);
+        Ok((learner, StagePredictions::Native(pred)))
+    }
+}
+
+fn fit_python(
+    py: Python,
+    estimator: &PyObject,
+    x: &PyAny,
+    y: ArrayView2<f64>,
+    sample_weight: Option<ArrayView1<f64>>,
+    timer: &mut StageTimer,
+) -> PyResult<PyObject> {
+    let start = timer.start();
+    let clone_fn = py.import("sklearn.base")?.getattr("clone")?;
+    let learner: PyObject = clone_fn.call1((estimator.clone_ref(py),))?.into();
+    timer.stop(Phase::Clone, start);
+    let start = timer.start();
+    let kwargs = PyDict::new(py);
+    kwargs.set_item("X", x)?;
+    // Targets and sample weights are copied: some learners keep a reference to
+    // them, and the residuals are updated in place after each stage.
+    // Single-output learners get 1D targets, as in sklearn
+    if y.ncols() == 1 {
+        kwargs.set_item("y", y.column(0).to_pyarray(py))?;
+    } else {
+        kwargs.set_item("y", y.to_pyarray(py))?;
+    }
+    if let Some(sample_weight) = sample_weight {
+        kwargs.set_item("sample_weight", sample_weight.to_pyarray(py))?;
+    }
+    timer.stop(Phase::Copy, start);
+    let start = timer.start();
+    learner.call_method(py, "fit", (), Some(kwargs))?;
+    timer.stop(Phase::Fit, start);
+    Ok(learner)
+}
+
+fn fit_extratree<F: Real>(
+    params: &ExtraTreeParams,
+    x: &Matrix<F>,
+    y: ArrayView2<f64>,
+    sample_weight: Option<ArrayView1<f64>>,
+    seed: u64,
+) -> BaseLearner {
+    let mut rng = create_stream_rng(seed, LEARNER_STREAM);
+    let y = y.as_standard_layout();
+    let sample_weight = sample_weight.as_ref().map(|w| w.as_standard_layout());
+    let (y, n_outputs) = (y.as_slice().unwrap(), y.ncols());
+    let sample_weight = sample_weight.as_ref().map(|w| w.as_slice().unwrap());
+    let tree = match x {
+        Matrix::Dense(x) => ExtraTreeRegressor::fit(params, &x.view(), y, n_outputs, sample_weight, &mut rng),
+        Matrix::Sparse(x) => ExtraTreeRegressor::fit(params, x, y, n_outputs, sample_weight, &mut rng),
+    };
+    BaseLearner::ExtraTree(tree)
+}
+
+impl BaseLearner {
+    // (n_samples, n_outputs) predictions
+    fn predict<F: Real>(&self, x: &Matrix<F>) -> PyResult<Array2<f64>> {
+        match self {
+            BaseLearner::Python(learner) => Python::with_gil(|py| {
+                let pred_kwargs = PyDict::new(py);
+                pred_kwargs.set_item("X", x.view().into_py(py)?)?;
+                let pred_result = learner.call_method(py, "predict", (), Some(pred_kwargs))?;
+                with_predictions_view(pred_result.as_ref(py), |pred| pred.to_owned())
+            }),
+            BaseLearner::ExtraTree(tree) => {
+                let pred = match x {
+                    Matrix::Dense(x) => tree.predict(&x.view()),
+                    Matrix::Sparse(x) => tree.predict(x),
+                };
+                Array2::from_shape_vec((x.dim().0, tree.n_outputs), pred)
+                    .map_err(|e| PyValueError::new_err(format!("Failed to reshape predictions: {}", e)))
+            }
+            BaseLearner::Linear { coefficients, intercept } => {
+                let mut pred = match x {
+                    Matrix::Dense(x) => F::into_f64(CowArray::from(x.view())).dot(coefficients),
+                    Matrix::Sparse(x) => x.dot_vector(coefficients),
+                };
+                pred += *intercept;
+                Ok(pred.insert_axis(Axis(1)))
+            }
+        }
+    }
+}
+
+impl BaseLearner {
+    // Plain arrays of a native learner (node arrays of an extra tree, coefficients
+    // of a linear model), or the Python learner itself
+    fn export(&self, py: Python) -> PyResult<PyObject> {
+        let arrays = PyDict::new(py);
+        match self {
+            BaseLearner::Python(learner) => return Ok(learner.clone_ref(py)),
+            BaseLearner::ExtraTree(tree) => {
+                let value = Array2::from_shape_vec((tree.left.len(), tree.n_outputs), tree.value.clone())
+                    .map_err(|e| PyValueError::new_err(format!("Failed to reshape tree values: {}", e)))?;
+                arrays.set_item("feature", tree.feature.to_pyarray(py))?;
+                arrays.set_item("threshold", tree.threshold.to_pyarray(py))?;
+                arrays.set_item("left", tree.left.to_pyarray(py))?;
+                arrays.set_item("right", tree.right.to_pyarray(py))?;
+                arrays.set_item("value", value.into_pyarray(py))?;
+            }
+            BaseLearner::Linear { coefficients, intercept } => {
+                arrays.set_item("coef", coefficients.to_pyarray(py))?;
+                arrays.set_item("intercept", *intercept)?;
+            }
+        }
+        Ok(arrays.into())
+    }
+
+    // Bytes held by the learner: node arrays of an extra tree, coefficients of a
+    // linear model, or the pickled size of a Python learner
+    fn nbytes(&self, py: Python) -> PyResult<usize> {
+        let vec_bytes = |len: usize| len * std::mem::size_of::<f64>();
+        match self {
+            BaseLearner::Python(learner) => {
+                let pickled = py.import("pickle")?.getattr("dumps")?.call1((learner.clone_ref(py),))?;
+                pickled.len()
+            }
+            BaseLearner::ExtraTree(tree) => Ok(vec_bytes(
+                tree.feature.len() + tree.threshold.len() + tree.left.len() + tree.right.len() + tree.value.len(),
+            )),
+            BaseLearner::Linear { coefficients, .. } => Ok(vec_bytes(coefficients.len() + 1)),
+        }
+    }
+}
+
+// Bytes held by a fitted model, as a dict: its stage weights, the input columns of
+// its stages, its alphas (AdaBoost), and each base learner (see `BaseLearner::nbytes`)
+fn memory_usage<'py>(
+    py: Python<'py>,
+    stacked_weights: &WeightStore,
+    columns: &[Vec<usize>],
+    base_learners: &[BaseLearner],
+    alphas: &[f64],
+) -> PyResult<&'py PyDict> {
+    let usage = PyDict::new(py);
+    usage.set_item("weights", stacked_weights.nbytes())?;
+    usage.set_item("columns", columns.iter().map(Vec::len).sum::<usize>() * std::mem::size_of::<usize>())?;
+    usage.set_item("alphas", alphas.len() * std::mem::size_of::<f64>())?;
+    let learners = base_learners.iter().map(|learner| Ok(learner.nbytes(py)? as i64)).collect::<PyResult<Vec<_>>>()?;
+    usage.set_item("learners", learners.into_pyarray(py))?;
+    Ok(usage)
+}
+
+// Fitted stages as a dict of plain values: the stacked hidden layer weights, and
+// the exported base learners (see `BaseLearner::export`)
+fn export_stages<'py>(
+    py: Python<'py>,
+    stacked_weights: &WeightStore,
+    columns: &[Vec<usize>],
+    base_learners: &[BaseLearner],
+    n_hidden_features: i32,
+    direct_link: bool,
+    learning_rate: f64,
+) -> PyResult<&'py PyDict> {
+    let stages = PyDict::new(py);
+    stages.set_item("weights", stacked_weights.stacked().to_pyarray(py))?;
+    // (n_stages, n_columns) input columns of each stage, None when they see all columns
+    let n_columns = columns.first().map_or(0, Vec::len);
+    let flat = columns.iter().flatten().map(|&c| c as i64).collect();
+    let columns = Array2::from_shape_vec((columns.len(), n_columns), flat)
+        .map_err(|e| PyValueError::new_err(format!("Failed to reshape columns: {}", e)))?;
+    if columns.is_empty() {
+        stages.set_item("columns", py.None())?;
+    } else {
+        stages.set_item("columns", columns.into_pyarray(py))?;
+    }
+    let learners = base_learners.iter().map(|learner| learner.export(py)).collect::<PyResult<Vec<_>>>()?;
+    stages.set_item("learners", learners)?;
+    stages.set_item("n_hidden_features", n_hidden_features)?;
+    stages.set_item("direct_link", direct_link)?;
+    stages.set_item("learning_rate", learning_rate)?;
+    Ok(stages)
+}
+
+// In-sample predictions of a stage. Python predictions stay in the NumPy array
+// returned by the learner and are read in place.
+enum StagePredictions {
+    Python(PyObject),
+    Native(Array2<f64>),
+}
+
+impl StagePredictions {
+    fn apply<T>(&self, f: impl FnOnce(ArrayView2<f64>) -> T) -> PyResult<T> {
+        match self {
+            StagePredictions::Python(pred) => Python::with_gil(|py| with_predictions_view(pred.as_ref(py), f)),
+            StagePredictions::Native(pred) => Ok(f(pred.view())),
+        }
+    }
+}
+
+// Calls `f` on 1D or 2D NumPy predictions viewed as (n_samples, n_outputs)
+fn with_predictions_view<T>(pred: &PyAny, f: impl FnOnce(ArrayView2<f64>) -> T) -> PyResult<T> {
+    // Other dtypes (e.g. float32 predictions of learners fitted on float32 inputs) are converted
+    let pred = match pred.extract::<&numpy::PyUntypedArray>() {
+        Ok(array) if !array.dtype().is_equiv_to(numpy::dtype::<f64>(pred.py())) => {
+            pred.py().import("numpy")?.call_method1("asarray", (pred, "float64"))?
+        }
+        _ => pred,
+    };
+    match pred.extract::<PyReadonlyArray1<f64>>() {
+        Ok(pred) => Ok(f(pred.as_array().insert_axis(Axis(1)))),
+        Err(_) => Ok(f(pred.extract::<PyReadonlyArray2<f64>>()?.as_array())),
+    }
 }
 
-// First, create a new enum to hold uninitialized models
-enum RegressionModelParams {
-    LinearRegression(LinearRegression),
-    ElasticNet { penalty: f64, l1_ratio: f64 },
+// View of 1D or 2D targets as an (n_samples, n_outputs) matrix, and whether they were 2D
+unsafe fn targets_as_array(y: &PyAny) -> PyResult<(ArrayView2<f64>, bool)> {
+    match y.extract::<&PyArray1<f64>>() {
+        Ok(y) => Ok((y.as_array().insert_axis(Axis(1)), false)),
+        Err(_) => Ok((y.extract::<&PyArray2<f64>>()?.as_array(), true)),
+    }
 }
 
-// Update RegressionModel enum for initialized models
-enum RegressionModel {
-    LinearRegression(FittedLinearRegression<f64>),  // Changed to FittedLinearRegression
-    ElasticNet(ElasticNet<f64>),
+// Predictions shaped like the targets seen in fit
+fn predictions_to_py(py: Python, predictions: Array2<f64>, multi_output: bool) -> PyObject {
+    if multi_output {
+        predictions.to_pyarray(py).to_object(py)
+    } else {
+        predictions.column(0).to_pyarray(py).to_object(py)
+    }
+}
+
+// Median of the values (reordered in place)
+fn median(values: &mut [f64]) -> f64 {
+    values.sort_by(|a, b| a.partial_cmp(b).unwrap());
+    let mid = values.len() / 2;
+    if values.len() % 2 == 0 {
+        (values[mid - 1] + values[mid]) / 2.0
+    } else {
+        values[mid]
+    }
+}
+
+enum StagedModel {
+    Boosting(Py<RustBooster>),
+    AdaBoost(Py<AdaBoostRegressor>),
+}
+
+// Iterator over the predictions after each boosting stage. The running sum is
+// updated in place with one stage per step, so iterating through all stages
+// costs about the same as a single predict.
+#[pyclass]
+struct StagedPredictions {
+    model: StagedModel,
+    input: StagedInputs,
+    accumulator: Array2<f64>,
+    sum_weights: f64,
+    stage: usize,
+    multi_output: bool,
+}
+
+impl StagedPredictions {
+    fn new(model: StagedModel, input: StagedInputs, n_outputs: usize, multi_output: bool) -> Self {
+        let accumulator = Array2::zeros((input.n_samples(), n_outputs));
+        StagedPredictions {
+            model,
+            input,
+            accumulator,
+            sum_weights: 0.0,
+            stage: 0,
+            multi_output,
+        }
+    }
+}
+
+#[pymethods]
+impl StagedPredictions {
+    fn __iter__(slf: PyRef<Self>) -> PyRef<Self> {
+        slf
+    }
+
+    fn __next__(mut slf: PyRefMut<Self>, py: Python) -> PyResult<Option<PyObject>> {
+        let this = &mut *slf;
+        let (stage, input, accumulator) = (this.stage, &mut this.input, &mut this.accumulator);
+        let normalize = match &this.model {
+            // Boosting sums the stages scaled by the learning rate
+            StagedModel::Boosting(booster) => {
+                let guard = booster.borrow(py);
+                let booster: &RustBooster = &guard;
+                if stage >= booster.base_learners.len() {
+                    return Ok(None);
+                }
+                input.add_stage(
+                    py,
+                    stage_columns(&booster.columns, stage),
+                    booster.stacked_weights.stage(stage, booster.n_hidden_features as usize).view(),
+                    &booster.projections()[stage],
+                    &booster.base_learners[stage],
+                    booster.learning_rate,
+                    accumulator,
+                )?;
+                false
+            }
+            // AdaBoost averages the stages weighted by their alphas
+            StagedModel::AdaBoost(booster) => {
+                let guard = booster.borrow(py);
+                let booster: &AdaBoostRegressor = &guard;
+                if stage >= booster.base_learners.len() {
+                    return Ok(None);
+                }
+                let alpha = booster.alphas[stage];
+                input.add_stage(
+                    py,
+                    stage_columns(&booster.columns, stage),
+                    booster.stacked_weights.stage(stage, booster.n_hidden_features as usize).view(),
+                    &booster.projections()[stage],
+                    &booster.base_learners[stage],
+                    alpha,
+                    accumulator,
+                )?;
+                this.sum_weights += alpha;
+                true
+            }
+        };
+        this.stage += 1;
+        let predictions = if normalize {
+            this.accumulator.mapv(|v| v / this.sum_weights)
+        } else {
+            this.accumulator.clone()
+        };
+        Ok(Some(predictions_to_py(py, predictions, this.multi_output)))
+    }
 }
 
 #[pymodule]
@@ -40,11 +1206,15 @@ fn rust_core(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<Regressor>()?;
     m.add_class::<RustBooster>()?;
     m.add_class::<AdaBoostRegressor>()?;
+    m.add_class::<StagedPredictions>()?;
+    m.add_function(wrap_pyfunction!(persistence::load_model, m)?)?;
+    m.add_function(wrap_pyfunction!(persistence::model_from_bytes, m)?)?;
     Ok(())
 }
 
 #[pyclass]
 struct Regressor {
+    model_name: String,
     model_params: Option<RegressionModelParams>,  // Store parameters until fit time
     model: Option<RegressionModel>,              // Store fitted model
 }
@@ -53,92 +1223,144 @@ struct Regressor {
 impl Regressor {
     #[new]
     fn new(model_name: &str) -> PyResult<Self> {
-        let model_params = match model_name {
-            "LinearRegression" => Ok(RegressionModelParams::LinearRegression(LinearRegression::default())),
-            "ElasticNet" => Ok(RegressionModelParams::ElasticNet {
-                penalty: 0.01,
-                l1_ratio: 0.5,
-            }),
-            _ => Err(PyValueError::new_err(format!("Unknown model: {}", model_name))),
-        }?;
         Ok(Regressor { 
-            model_params: Some(model_params),
+            model_name: model_name.to_string(),
+            model_params: Some(RegressionModelParams::from_name(model_name)?),
             model: None,
         })
     }
 
-    fn fit(&mut self, x: PyReadonlyArray2<f64>, y: PyReadonlyArray1<f64>) -> PyResult<()> {
+    fn fit(&mut self, py: Python, x: PyReadonlyArray2<f64>, y: PyReadonlyArray1<f64>) -> PyResult<()> {
         let x = x.as_array().to_owned();
         let y = y.as_array().to_owned();
-                
-        // Create appropriate Dataset based on model type
-        let model = match self.model_params.take().ok_or(PyValueError::new_err("Model not initialized"))? {
-            RegressionModelParams::LinearRegression(m) => {
-                // Use 1D targets for LinearRegression
-                let dataset = Dataset::new(x.clone(), y);
-                RegressionModel::LinearRegression(m.fit(&dataset)
-                    .map_err(|e| PyValueError::new_err(format!("LinearRegression fit error: {}", e)))?)
-            },
-            RegressionModelParams::ElasticNet { penalty, l1_ratio } => {
-                // Use 1D targets for ElasticNet
-                let dataset = Dataset::new(x.clone(), y);
-                RegressionModel::ElasticNet(
-                    ElasticNet::params()
-                        .penalty(penalty)
-                        .l1_ratio(l1_ratio)
-                        .fit(&dataset)
-                        .map_err(|e| PyValueError::new_err(format!("ElasticNet fit error: {}", e)))?
-                )
-            },
-        };
-
+        let model_params = self.model_params.take().ok_or(PyValueError::new_err("Model not initialized"))?;
+        let model = py.allow_threads(|| model_params.fit(x, y))?;
         self.model = Some(model);
         Ok(())
     }
 
-    fn predict(&self, x: PyReadonlyArray2<f64>) -> PyResult<Py<PyArray2<f64>>> {
+    fn predict(&self, py: Python, x: PyReadonlyArray2<f64>) -> PyResult<Py<PyArray2<f64>>> {
         let x = x.as_array();
         match &self.model {
             Some(model) => {
-                let predictions = match model {
-                    RegressionModel::LinearRegression(m) => {
-                        let pred = m.predict(x);
-                        // Convert 1D to 2D array
-                        Array2::from_shape_vec((pred.targets().len(), 1), pred.targets().to_vec())
-                            .map_err(|e| PyValueError::new_err(format!("Failed to reshape predictions: {}", e)))?
-                    },
-                    RegressionModel::ElasticNet(m) => {
-                        let pred = m.predict(x);
-                        // Convert 1D to 2D array
-                        Array2::from_shape_vec((pred.targets().len(), 1), pred.targets().to_vec())
-                            .map_err(|e| PyValueError::new_err(format!("Failed to reshape predictions: {}", e)))?
-                    },                    
-                };
-                Python::with_gil(|py| Ok(predictions.to_pyarray(py).to_owned()))
+                let pred = py.allow_threads(|| model.predict(x));
+                // Convert 1D to 2D array
+                let predictions = Array2::from_shape_vec((pred.len(), 1), pred.to_vec())
+                    .map_err(|e| PyValueError::new_err(format!("Failed to reshape predictions: {}", e)))?;
+                Ok(predictions.to_pyarray(py).to_owned())
             }
             None => Err(PyValueError::new_err("Model not initialized")),
         }
     }
 }
 
+impl RegressionModelParams {
+    fn from_name(model_name: &str) -> PyResult<Self> {
+        match model_name {
+            "LinearRegression" => Ok(RegressionModelParams::LinearRegression(LinearRegression::default())),
+            "ElasticNet" => Ok(RegressionModelParams::ElasticNet {
+                penalty: 0.01,
+                l1_ratio: 0.5,
+            }),
+            _ => Err(PyValueError::new_err(format!("Unknown model: {}", model_name))),
+        }
+    }
+
+    fn fit(&self, x: Array2<f64>, y: Array1<f64>) -> PyResult<RegressionModel> {
+        // Use 1D targets for both models
+        let dataset = Dataset::new(x, y);
+        match self {
+            RegressionModelParams::LinearRegression(m) => Ok(RegressionModel::LinearRegression(
+                m.fit(&dataset)
+                    .map_err(|e| PyValueError::new_err(format!("LinearRegression fit error: {}", e)))?
+            )),
+            RegressionModelParams::ElasticNet { penalty, l1_ratio } => Ok(RegressionModel::ElasticNet(
+                ElasticNet::params()
+                    .penalty(*penalty)
+                    .l1_ratio(*l1_ratio)
+                    .fit(&dataset)
+                    .map_err(|e| PyValueError::new_err(format!("ElasticNet fit error: {}", e)))?
+            )),
+        }
+    }
+}
+
+impl RegressionModel {
+    fn predict(&self, x: ArrayView2<f64>) -> Array1<f64> {
+        match self {
+            RegressionModel::LinearRegression(m) => m.predict(x).targets().to_owned(),
+            RegressionModel::ElasticNet(m) => m.predict(x).targets().to_owned(),
+        }
+    }
+
+    // Base learner with the fitted coefficients (same predictions, without the linfa model)
+    fn into_base_learner(self) -> BaseLearner {
+        let (coefficients, intercept) = match self {
+            RegressionModel::LinearRegression(m) => (m.params().to_owned(), m.intercept()),
+            RegressionModel::ElasticNet(m) => (m.hyperplane().to_owned(), m.intercept()),
+        };
+        BaseLearner::Linear { coefficients, intercept }
+    }
+}
+
+// Model name of a genbooster LinfaRegressor (whose `model` is a rust_core Regressor)
+fn linfa_model_name(py: Python, estimator: &PyObject) -> Option<String> {
+    let model = estimator.getattr(py, "model").ok()?;
+    let regressor: PyRef<Regressor> = model.extract(py).ok()?;
+    let model_name = regressor.model_name.clone();
+    Some(model_name)
+}
+
 #[pyclass]
 struct RustBooster {
-    base_learners: Vec<PyObject>,
-    weights: Vec<Array2<f64>>,
+    base_estimator: LearnerSpec,
+    base_learners: Vec<BaseLearner>,
+    stacked_weights: WeightStore,
+    // Kernels of the stages, for structured weights
+    projections: StageProjections,
+    // Sorted input columns seen by each stage (empty without column subsampling)
+    columns: Vec<Vec<usize>>,
+    // Number of columns of the inputs of fit
+    n_features_in: usize,
     learning_rate: f64,
     n_hidden_features: i32,
+    #[pyo3(get, set)]
     n_estimators: i32,
     direct_link: bool,
     weights_distribution: WeightsDistribution,
+    // Store one seed per stage instead of its weights, keeping up to
+    // `weights_cache_size` regenerated stages in memory
+    compact_weights: bool,
+    weights_cache_size: usize,
     dropout: f64,
+    subsample: f64,
+    colsample: f64,
     tolerance: f64,
+    relative_tolerance: bool,
+    n_iter_no_change: Option<usize>,
+    #[pyo3(get)]
+    validation_loss: Vec<f64>,
     seed: u64,
+    n_outputs: usize,
+    multi_output: bool,
+    // Boosting state after the last fitted stage, for warm starts
+    residuals: Array2<f64>,
+    rng: ChaCha20Rng,
+    previous_l2_norm: f64,
+    // Record the timings and training loss of each stage in `fit_profile`
+    profile: bool,
+    fit_profile: Option<FitProfile>,
+    // Record the peak bytes allocated by the Rust side of the last fit
+    track_memory: bool,
+    #[pyo3(get)]
+    peak_fit_memory: Option<usize>,
 }
 
 #[pymethods]
 impl RustBooster {
     #[new]
     fn new(
+        py: Python,
         base_estimator: PyObject,
         n_estimators: i32,
         learning_rate: f64,
@@ -146,294 +1368,651 @@ impl RustBooster {
         direct_link: bool,
         weights_distribution: Option<&str>,
         tolerance: Option<f64>,
-    ) -> Self {
-        let weights_dist = match weights_distribution.unwrap_or("uniform") {
-            "normal" => WeightsDistribution::Normal,
-            _ => WeightsDistribution::Uniform,
-        };
+        n_iter_no_change: Option<usize>,
+        relative_tolerance: Option<bool>,
+        subsample: Option<f64>,
+        colsample: Option<f64>,
+        compact_weights: Option<bool>,
+        weights_cache_size: Option<usize>,
+        profile: Option<bool>,
+        track_memory: Option<bool>,
+    ) -> PyResult<Self> {
+        let weights_dist = WeightsDistribution::from_name(weights_distribution.unwrap_or("uniform"));
 
-        RustBooster {
-            base_learners: vec![base_estimator; n_estimators as usize],
-            weights: Vec::new(),
+        Ok(RustBooster {
+            base_estimator: LearnerSpec::from_estimator(py, base_estimator)?,
+            base_learners: Vec::new(),
+            stacked_weights: WeightStore::empty(),
+            projections: StageProjections::default(),
+            columns: Vec::new(),
+            n_features_in: 0,
             learning_rate,
             n_hidden_features,
             n_estimators,
             direct_link,
             weights_distribution: weights_dist,
+            compact_weights: compact_weights.unwrap_or(false),
+            weights_cache_size: weights_cache_size.unwrap_or(0),
             dropout: 0.0,
+            subsample: check_fraction("subsample", subsample.unwrap_or(1.0))?,
+            colsample: check_fraction("colsample", colsample.unwrap_or(1.0))?,
             seed: 0,
-            tolerance: tolerance.unwrap_or(1e-4)
-        }
+            tolerance: tolerance.unwrap_or(1e-4),
+            relative_tolerance: relative_tolerance.unwrap_or(false),
+            n_iter_no_change,
+            validation_loss: Vec::new(),
+            n_outputs: 1,
+            multi_output: false,
+            residuals: Array2::zeros((0, 0)),
+            rng: create_rng(0),
+            previous_l2_norm: f64::INFINITY,
+            profile: profile.unwrap_or(false),
+            fit_profile: None,
+            track_memory: track_memory.unwrap_or(false),
+            peak_fit_memory: None,
+        })
+    }
+
+    // Per-stage timings (in nanoseconds) and training loss of the last fit, as a
+    // NumPy record array, or None when it was not profiled
+    #[getter]
+    fn fit_profile(&self, py: Python) -> PyResult<Option<PyObject>> {
+        self.fit_profile.as_ref().map(|profile| profile.to_numpy(py)).transpose()
     }
 
+    // Bytes held by the fitted model (see `memory_usage`)
+    fn memory_usage(&self, py: Python) -> PyResult<PyObject> {
+        Ok(memory_usage(py, &self.stacked_weights, &self.columns, &self.base_learners, &[])?.into())
+    }
+
+    // With `warm_start`, stages are added to the fitted ones (up to `n_estimators`),
+    // continuing from the stored residuals and RNG stream; `x` and `y` must be the
+    // training data of the previous fit, and `dropout` and `seed` are kept from it.
+    // `x` (and `x_val`) may be float32 or float64 arrays: the hidden features are
+    // computed in the same precision.
+    #[pyo3(signature = (x, y, dropout, seed, x_val=None, y_val=None, warm_start=false))]
     fn fit_boosting(
         &mut self,
         py: Python,
-        x: &PyArray2<f64>,
-        y: &PyArray1<f64>,
+        x: &PyAny,
+        y: &PyAny,
         dropout: f64,
         seed: u64,
+        x_val: Option<&PyAny>,
+        y_val: Option<&PyAny>,
+        warm_start: bool,
     ) -> PyResult<()> {
-        self.dropout = dropout;
-        self.seed = seed;
-        let x_array = unsafe { x.as_array() };
-        let y_array = unsafe { y.as_array() };        
-        let mut rng = create_rng(seed);
-        let n_samples = x_array.shape()[0];
-        let n_features = x_array.shape()[1];        
-        
-        // Initialize residuals
-        let y_mean = y_array.mean().unwrap();
-        let mut residuals = Array1::from_vec(vec![y_mean; n_samples]);  // Create array filled with y_mean
-        residuals = y_array.to_owned() - residuals;  // Convert y_array to owned array before subtraction
-        
-        // First, create proper deep copies of base estimators
-        let sklearn = py.import("sklearn.base")?;
-        let clone_fn = sklearn.getattr("clone")?;
-        
-        // Create deep copies for all base learners at the start
-        for i in 0..self.n_estimators {
-            self.base_learners[i as usize] = clone_fn.call1((self.base_learners[i as usize].clone_ref(py),))?.into();
-        }
-        
-        let mut previous_l2_norm = f64::INFINITY;
-        
-        for i in 0..self.n_estimators {
-            // Generate random weights for hidden layer
-            let mut w = Array2::zeros((n_features, self.n_hidden_features as usize));
-            for w_row in w.rows_mut() {
-                for w_val in w_row {
-                    *w_val = match self.weights_distribution {
-                        WeightsDistribution::Uniform => rng.gen::<f64>(),  // Changed to U(0,1)
-                        WeightsDistribution::Normal => rng.gen::<f64>(),   // Still N(0,1)
-                    };
-                }
+        let warm_start = warm_start && !self.base_learners.is_empty();
+        let (y_array, multi_output) = unsafe { targets_as_array(y)? };
+        if warm_start {
+            // Checked before anything changes, so that a rejected warm start leaves
+            // the model as it was
+            let n_fitted = self.base_learners.len();
+            if (self.n_estimators as usize) < n_fitted {
+                return Err(PyValueError::new_err(format!(
+                    "n_estimators={} must be at least the number of fitted stages ({}) with warm_start",
+                    self.n_estimators, n_fitted
+                )));
             }
-            self.weights.push(w.clone());            
-            // Forward pass with activation
-            let hidden = self.forward_pass(py, &x_array.to_owned(), &w, dropout, seed + i as u64)?;            
-            // No need to clone again, we already have independent copies
-            let base_learner = &self.base_learners[i as usize];            
-            // Fit the base learner
-            let kwargs = PyDict::new(py);
-            kwargs.set_item("X", hidden.to_pyarray(py))?;
-            kwargs.set_item("y", residuals.to_pyarray(py))?;
-            base_learner.call_method(py, "fit", (), Some(kwargs))?;            
-            // Predict and update residuals
-            let pred_kwargs = PyDict::new(py);
-            pred_kwargs.set_item("X", hidden.to_pyarray(py))?;
-            let pred_result = base_learner.call_method(py, "predict", (), 
-            Some(pred_kwargs))?;
-            let predictions: &PyArray1<f64> = pred_result.extract(py)?;
-            let pred_array = unsafe { predictions.as_array() };            
-            // Update residuals
-            residuals = residuals - self.learning_rate * pred_array.to_owned();            
-            // Store the fitted estimator back
-            self.base_learners[i as usize] = base_learner.clone_ref(py);            
-            // Calculate current L2 norm of residuals
-            let current_l2_norm = residuals.mapv(|x| x.powi(2)).sum();
-            
-            // Check if change in L2 norm is small enough for early stopping
-            if (current_l2_norm - previous_l2_norm).abs() <= self.tolerance {
-                // Update n_estimators to current iteration and break
-                self.n_estimators = i + 1;
-                break;
-            }            
-            previous_l2_norm = current_l2_norm;
+            if self.residuals.dim() != y_array.dim() {
+                return Err(PyValueError::new_err("warm_start requires the training data of the previous fit"));
+            }
+        } else {
+            self.dropout = dropout;
+            self.seed = seed;
         }
+        let tracker = self.track_memory.then(PeakTracker::start);
+        self.n_outputs = y_array.ncols();
+        self.multi_output = multi_output;
+        with_input_array!(x, |x_array| {
+            let validation = unsafe { validation_arrays(x_val, y_val)? };
+            // Python base learners reacquire the GIL for their own fit/predict calls
+            py.allow_threads(|| self.fit_boosting_array(&x_array, y_array, validation, warm_start))
+        })?;
+        self.peak_fit_memory = tracker.map(PeakTracker::finish);
         Ok(())
     }
 
-    fn predict_boosting(&self, py: Python, x: &PyArray2<f64>) -> PyResult<PyObject> {
-        let x_array = unsafe { x.as_array() };
-        let mut predictions: Array1<f64> = Array1::zeros(x_array.shape()[0]);
-        
-        for (i, (w, base_learner)) in self.weights.iter().zip(self.base_learners.iter()).enumerate() {
-            // Use stored weights directly
-            let hidden = x_array.dot(w);
-            let hidden = hidden.mapv(|v| if v > 0.0 { v } else { 0.0 });            
-            // Direct link if specified
-            let hidden = if self.direct_link {
-                ndarray::concatenate![Axis(1), x_array, hidden]
-            } else {
-                hidden
-            };
-            
-            let pred_kwargs = PyDict::new(py);
-            pred_kwargs.set_item("X", hidden.to_pyarray(py))?;
-            let pred_result = base_learner.call_method(py, "predict", (), Some(pred_kwargs))?;
-            let pred: &PyArray1<f64> = pred_result.extract(py)?;
-            let pred_array = unsafe { pred.as_array() };      
-            predictions = predictions + self.learning_rate * pred_array.to_owned();
-        }
-        
-        Ok(predictions.to_pyarray(py).to_object(py))
+    fn predict_boosting(&self, py: Python, x: &PyAny) -> PyResult<PyObject> {
+        let predictions = with_input_array!(x, |x_array| py.allow_threads(|| self.predict_boosting_array(&x_array))?);
+        Ok(predictions_to_py(py, predictions, self.multi_output))
+    }
+
+    // Predictions of the first stages that fit within `max_stages` and `time_budget`
+    // (in seconds), with the number of stages used
+    #[pyo3(signature = (x, max_stages=None, time_budget=None))]
+    fn predict_boosting_anytime(
+        &self,
+        py: Python,
+        x: &PyAny,
+        max_stages: Option<usize>,
+        time_budget: Option<f64>,
+    ) -> PyResult<(PyObject, usize)> {
+        let (predictions, n_stages) = with_input_array!(x, |x_array| {
+            py.allow_threads(|| self.predict_boosting_anytime_array(&x_array, max_stages, time_budget))?
+        });
+        Ok((predictions_to_py(py, predictions, self.multi_output), n_stages))
+    }
+
+    // Staged predictions are computed in the precision of the inputs, as in predict
+    fn staged_predict_boosting(slf: PyRef<Self>, x: &PyAny) -> PyResult<StagedPredictions> {
+        let py = slf.py();
+        let (n_hidden_features, direct_link) = (slf.n_hidden_features as usize, slf.direct_link);
+        let n_columns = slf.columns.first().map(Vec::len);
+        let input = StagedInputs::new(py, x, n_columns, n_hidden_features, direct_link)?;
+        let (n_outputs, multi_output) = (slf.n_outputs, slf.multi_output);
+        Ok(StagedPredictions::new(StagedModel::Boosting(slf.into()), input, n_outputs, multi_output))
     }
 
-    fn fit_bagging(&mut self, py: Python, x: &PyArray2<f64>, y: &PyArray1<f64>, dropout: f64, seed: u64) -> PyResult<()> {
+    #[pyo3(signature = (x, y, dropout, seed, n_jobs=None))]
+    fn fit_bagging(
+        &mut self,
+        py: Python,
+        x: &PyAny,
+        y: &PyAny,
+        dropout: f64,
+        seed: u64,
+        n_jobs: Option<i64>,
+    ) -> PyResult<()> {
         self.dropout = dropout;
         self.seed = seed;
-        let x_array = unsafe { x.as_array() };
-        let y_array = unsafe { y.as_array() };        
-        let mut rng = create_rng(seed);
-        let n_features = x_array.shape()[1];
+        let (y_array, multi_output) = unsafe { targets_as_array(y)? };
+        self.n_outputs = y_array.ncols();
+        self.multi_output = multi_output;
+        let n_jobs = resolve_n_jobs(n_jobs);
+        let tracker = self.track_memory.then(PeakTracker::start);
+        with_input_array!(x, |x_array| {
+            py.allow_threads(|| self.fit_bagging_array(&x_array, y_array, dropout, seed, n_jobs))
+        })?;
+        self.peak_fit_memory = tracker.map(PeakTracker::finish);
+        Ok(())
+    }
+
+    fn predict_bagging(&self, py: Python, x: &PyAny) -> PyResult<PyObject> {
+        let predictions = with_input_array!(x, |x_array| py.allow_threads(|| self.predict_bagging_array(&x_array))?);
+        Ok(predictions_to_py(py, predictions, self.multi_output))
+    }
+
+    fn export(&self, py: Python) -> PyResult<PyObject> {
+        let stages = export_stages(
+            py,
+            &self.stacked_weights,
+            &self.columns,
+            &self.base_learners,
+            self.n_hidden_features,
+            self.direct_link,
+            self.learning_rate,
+        )?;
+        stages.set_item("n_outputs", self.n_outputs)?;
+        stages.set_item("multi_output", self.multi_output)?;
+        Ok(stages.into())
+    }
+
+    // Binary model (see `persistence`), with optional user `metadata` stored alongside
+    #[pyo3(signature = (metadata=None))]
+    fn to_bytes(&self, py: Python, metadata: Option<&[u8]>) -> PyResult<PyObject> {
+        let data = persistence::booster_to_bytes(py, self, metadata.unwrap_or_default())?;
+        Ok(PyBytes::new(py, &data).into())
+    }
+
+    #[pyo3(signature = (path, metadata=None))]
+    fn save(&self, py: Python, path: &str, metadata: Option<&[u8]>) -> PyResult<()> {
+        let data = persistence::booster_to_bytes(py, self, metadata.unwrap_or_default())?;
+        Ok(std::fs::write(path, data)?)
+    }
+
+    fn __reduce__(&self, py: Python) -> PyResult<(PyObject, (PyObject,))> {
+        let from_bytes = py.import("genbooster.persistence")?.getattr("_model_from_bytes")?;
+        Ok((from_bytes.into(), (self.to_bytes(py, None)?,)))
+    }
+}
+
+impl RustBooster {
+    fn projections(&self) -> &[Projection] {
+        let (n_stages, n_hidden) = (self.base_learners.len(), self.n_hidden_features as usize);
+        self.projections.get(&self.stacked_weights, n_stages, n_hidden, self.weights_distribution)
+    }
+
+    fn fit_boosting_array<F: Real>(
+        &mut self,
+        x_array: &Matrix<F>,
+        y_array: ArrayView2<f64>,
+        validation: Option<(Matrix<F>, ArrayView2<f64>)>,
+        warm_start: bool,
+    ) -> PyResult<()> {
+        let (dropout, seed) = (self.dropout, self.seed);
+        let (n_samples, n_features) = x_array.dim();
+        let n_hidden = self.n_hidden_features as usize;
         
-        // First, create proper deep copies of base estimators
-        let sklearn = py.import("sklearn.base")?;
-        let clone_fn = sklearn.getattr("clone")?;
+        let start = if warm_start { self.base_learners.len() } else { 0 };
+        if start == 0 {
+            // Initialize residuals (one column per output) and the weights' RNG stream
+            let y_mean = y_array.mean_axis(Axis(0)).unwrap();
+            self.residuals = &y_array - &y_mean;
+            self.rng = create_rng(seed);
+            self.previous_l2_norm = f64::INFINITY;
+            self.base_learners.clear();
+            let n_rows = sample_size(n_features, self.colsample).unwrap_or(n_features);
+            self.stacked_weights = empty_weights(
+                self.compact_weights,
+                self.weights_distribution,
+                n_rows,
+                n_hidden,
+                self.weights_cache_size,
+            );
+            self.projections = StageProjections::default();
+            self.columns.clear();
+            self.n_features_in = n_features;
+            self.validation_loss.clear();
+            self.fit_profile = None;
+        }
         
-        // Create deep copies for all base learners at the start
-        for i in 0..self.n_estimators {
-            self.base_learners[i as usize] = clone_fn.call1((self.base_learners[i as usize].clone_ref(py),))?.into();
+        // Stages see `n_columns` columns of x each with column subsampling
+        let n_columns = sample_size(n_features, self.colsample);
+        let distribution = self.weights_distribution;
+        let mut inputs = StageInputs::new(x_array, n_columns, n_hidden, self.direct_link);
+        let mut validation =
+            validation.map(|(x_val, y_val)| Validation::new(x_val, y_val, n_columns, n_hidden, self.direct_link));
+        if let Some(validation) = validation.as_mut() {
+            // Warm start: bring the held-out predictions up to date with the fitted stages
+            for (i, base_learner) in self.base_learners.iter().enumerate() {
+                let (columns, w) = (stage_columns(&self.columns, i), self.stacked_weights.stage(i, n_hidden));
+                validation.add_stage(base_learner, columns, w.view(), &self.projections()[i], self.learning_rate)?;
+            }
         }
+        let mut early_stopping =
+            EarlyStopping::new(self.n_iter_no_change.unwrap_or(1), self.tolerance, self.relative_tolerance);
         
-        for i in 0..self.n_estimators {
-            // Generate random weights for hidden layer
-            let mut w = Array2::zeros((n_features, self.n_hidden_features as usize));
-            for w_row in w.rows_mut() {
-                for w_val in w_row {
-                    *w_val = match self.weights_distribution {
-                        WeightsDistribution::Uniform => rng.gen::<f64>(),
-                        WeightsDistribution::Normal => rng.gen::<f64>(),
-                    };
+        // New stages are added to the model once they are all fitted, so that a
+        // failed fit leaves the weights and base learners consistent
+        let mut new_weights = NewWeights::new(&self.stacked_weights);
+        let mut new_seeds = Vec::new();
+        let mut new_columns = Vec::new();
+        let mut new_learners = Vec::new();
+        // Warm starts extend the profile of the previous fit
+        let mut fit_profile = self.profile.then(|| self.fit_profile.clone().unwrap_or_default());
+        // Boosting state after the fitted stages: if a new stage fails, it is
+        // restored, so that a later warm start continues from the stages the model has
+        let (residuals, rng, previous_l2_norm) = (self.residuals.clone(), self.rng.clone(), self.previous_l2_norm);
+        let n_validation_losses = self.validation_loss.len();
+        let mut fit_stages = || -> PyResult<()> {
+            for i in start as i32..self.n_estimators {
+                let mut timer = StageTimer::new(self.profile);
+                // Columns seen by the stage, and rows of its fit, from the weights' stream
+                // (nothing is drawn without subsampling)
+                let phase_start = timer.start();
+                let columns = sample_indices(&mut self.rng, n_features, self.colsample);
+                // Generate random weights for hidden layer
+                let w = draw_weights(
+                    &mut self.rng,
+                    self.weights_distribution,
+                    n_columns.unwrap_or(n_features),
+                    n_hidden,
+                    self.compact_weights.then_some(&mut new_seeds),
+                );
+                let rows = sample_indices(&mut self.rng, n_samples, self.subsample);
+                timer.stop(Phase::Sampling, phase_start);
+                // Forward pass with activation
+                let phase_start = timer.start();
+                let projection = Projection::new(w.view(), distribution);
+                let w_stage = F::weights(w.view());
+                let hidden = inputs.forward_columns(
+                    x_array,
+                    columns.as_deref(),
+                    w_stage.view(),
+                    &projection,
+                    dropout,
+                    seed + i as u64,
+                );
+                timer.stop(Phase::Forward, phase_start);
+                // Fit a fresh base learner on the current residuals, and predict on all inputs
+                let (base_learner, pred_array) = self.base_estimator.fit_predict_rows(
+                    hidden,
+                    self.residuals.view(),
+                    None,
+                    rows.as_deref(),
+                    seed + i as u64,
+                    &mut timer,
+                )?;
+                // Update residuals in place
+                let phase_start = timer.start();
+                pred_array.apply(|pred| self.residuals.scaled_add(-self.learning_rate, &pred))?;
+                timer.stop(Phase::Update, phase_start);
+            
+                let phase_start = timer.start();
+                let stop = match validation.as_mut() {
+                    // Stop when the validation loss plateaus
+                    Some(validation) => {
+                        validation.add_stage(&base_learner, columns.as_deref(), w.view(), &projection, self.learning_rate)?;
+                        let loss = validation.loss(1.0);
+                        self.validation_loss.push(loss);
+                        early_stopping.update(loss)
+                    }
+                    // Otherwise, stop when the change in L2 norm of the residuals is small enough
+                    None => {
+                        let current_l2_norm: f64 = self.residuals.iter().map(|x| x.powi(2)).sum();
+                        let change = (current_l2_norm - self.previous_l2_norm).abs();
+                        let threshold = if self.relative_tolerance {
+                            self.tolerance * self.previous_l2_norm
+                        } else {
+                            self.tolerance
+                        };
+                        let stop = self.previous_l2_norm.is_finite() && change <= threshold;
+                        self.previous_l2_norm = current_l2_norm;
+                        stop
+                    }
+                };
+                timer.stop(Phase::Validation, phase_start);
+                if let Some(fit_profile) = fit_profile.as_mut() {
+                    // Training mean squared error after the stage
+                    fit_profile.push(&timer, self.residuals.mapv(|r| r * r).mean().unwrap_or(f64::NAN));
+                }
+                new_weights.push(w);
+                new_columns.extend(columns);
+                new_learners.push(base_learner);
+                if stop {
+                    // Update n_estimators to current iteration and break
+                    self.n_estimators = i + 1;
+                    break;
                 }
             }
-            self.weights.push(w.clone());
-            
-            // Forward pass with activation
-            let hidden = self.forward_pass(py, &x_array.to_owned(), &w, dropout, seed + i as u64)?;
-            
-            let base_learner = &self.base_learners[i as usize];
-            
-            // Fit the base learner directly on y (no residuals)
-            let kwargs = PyDict::new(py);
-            kwargs.set_item("X", hidden.to_pyarray(py))?;
-            kwargs.set_item("y", y)?;  // Use original y instead of residuals
-            base_learner.call_method(py, "fit", (), Some(kwargs))?;
-            
-            // Store the fitted estimator back
-            self.base_learners[i as usize] = base_learner.clone_ref(py);
+            Ok(())
+        };
+        if let Err(e) = fit_stages() {
+            self.residuals = residuals;
+            self.rng = rng;
+            self.previous_l2_norm = previous_l2_norm;
+            self.validation_loss.truncate(n_validation_losses);
+            return Err(e);
         }
+        self.stacked_weights = stack_weights(&self.stacked_weights, new_weights, &new_seeds);
+        self.projections = StageProjections::default();
+        self.columns.extend(new_columns);
+        self.base_learners.extend(new_learners);
+        self.fit_profile = fit_profile;
         Ok(())
     }
 
-    fn predict_bagging(&self, py: Python, x: &PyArray2<f64>) -> PyResult<PyObject> {
-        let x_array = unsafe { x.as_array() };
-        let n_samples = x_array.shape()[0];
-        
-        // Create a matrix to store all predictions (n_samples x n_estimators)
-        let mut all_predictions = Array2::zeros((n_samples, self.n_estimators as usize));
-        
-        // Get predictions from each base learner
-        for (i, (w, base_learner)) in self.weights.iter().zip(self.base_learners.iter()).enumerate() {
-            // Forward pass with stored weights
-            let hidden = x_array.dot(w);
-            let hidden = hidden.mapv(|v| if v > 0.0 { v } else { 0.0 });
-            
-            // Direct link if specified
-            let hidden = if self.direct_link {
-                ndarray::concatenate![Axis(1), x_array, hidden]
-            } else {
-                hidden
-            };
-            
-            // Get predictions from current base learner
-            let pred_kwargs = PyDict::new(py);
-            pred_kwargs.set_item("X", hidden.to_pyarray(py))?;
-            let pred_result = base_learner.call_method(py, "predict", (), Some(pred_kwargs))?;
-            let pred: &PyArray1<f64> = pred_result.extract(py)?;
-            let pred_array = unsafe { pred.as_array() };
-            
-            // Store predictions in the corresponding column
-            all_predictions.column_mut(i).assign(&pred_array);
-        }
+    fn predict_boosting_anytime_array<F: Real>(
+        &self,
+        x_array: &Matrix<F>,
+        max_stages: Option<usize>,
+        time_budget: Option<f64>,
+    ) -> PyResult<(Array2<f64>, usize)> {
+        let start = Instant::now();
+        // Infinite budgets (or too large for a Duration) do not limit the stages
+        let budget = match time_budget {
+            Some(seconds) if seconds.is_nan() || seconds < 0.0 => {
+                return Err(PyValueError::new_err(format!(
+                    "time_budget must be a nonnegative number of seconds, got {}",
+                    seconds
+                )));
+            }
+            Some(seconds) => Duration::try_from_secs_f64(seconds).ok(),
+            None => None,
+        };
+        let n_stages = max_stages.map_or(self.base_learners.len(), |m| m.min(self.base_learners.len()));
+        let mut predictions: Array2<f64> = Array2::zeros((x_array.dim().0, self.n_outputs));
+        let n_columns = self.columns.first().map(Vec::len);
+        let n_hidden = self.n_hidden_features as usize;
+        let mut inputs = StageInputs::new(x_array, n_columns, n_hidden, self.direct_link);
         
-        // Calculate median along axis 1 (across estimators)
-        let final_predictions = all_predictions
-            .rows()
-            .into_iter()
-            .map(|row| {
-                let mut row_vec: Vec<f64> = row.to_vec();
-                row_vec.sort_by(|a, b| a.partial_cmp(b).unwrap());
-                let mid = row_vec.len() / 2;
-                if row_vec.len() % 2 == 0 {
-                    (row_vec[mid - 1] + row_vec[mid]) / 2.0
-                } else {
-                    row_vec[mid]
+        // Stages are additive: evaluate them in order, one at a time, and stop
+        // before a stage that would likely end at or past the deadline (so that a
+        // zero budget evaluates no stage)
+        for i in 0..n_stages {
+            if let Some(budget) = budget {
+                let elapsed = start.elapsed();
+                let mean_stage_time = if i > 0 { elapsed / i as u32 } else { Duration::ZERO };
+                if elapsed + mean_stage_time >= budget {
+                    return Ok((predictions, i));
                 }
-            })
-            .collect::<Vec<f64>>();
-        
-        // Convert to Array1 and return
-        Ok(Array1::from_vec(final_predictions).to_pyarray(py).to_object(py))
+            }
+            add_stage_predictions(
+                x_array,
+                stage_columns(&self.columns, i),
+                self.stacked_weights.stage(i, n_hidden).view(),
+                &self.projections()[i],
+                &self.base_learners[i],
+                self.learning_rate,
+                &mut inputs,
+                &mut predictions,
+            )?;
+        }
+        Ok((predictions, n_stages))
     }
-}
 
-impl RustBooster {
-    fn forward_pass(
-        &self,
-        py: Python,
-        x: &Array2<f64>,
-        w: &Array2<f64>,
+    fn predict_boosting_array<F: Real>(&self, x_array: &Matrix<F>) -> PyResult<Array2<f64>> {
+        let mut predictions: Array2<f64> = Array2::zeros((x_array.dim().0, self.n_outputs));
+        for_each_stage_prediction(
+            x_array,
+            &self.stacked_weights,
+            self.projections(),
+            &self.columns,
+            &self.base_learners,
+            self.n_hidden_features as usize,
+            self.direct_link,
+            self.weights_distribution,
+            |_, rows, pred_array| predictions.slice_mut(s![rows, ..]).scaled_add(self.learning_rate, &pred_array),
+        )?;
+        Ok(predictions)
+    }
+
+    fn fit_bagging_array<F: Real>(
+        &mut self,
+        x_array: &Matrix<F>,
+        y_array: ArrayView2<f64>,
         dropout: f64,
         seed: u64,
-    ) -> PyResult<Array2<f64>> {
+        n_jobs: usize,
+    ) -> PyResult<()> {
         let mut rng = create_rng(seed);
+        let n_features = x_array.dim().1;
+        let n_estimators = self.n_estimators as usize;
+        let (weights_distribution, n_hidden_features) = (self.weights_distribution, self.n_hidden_features as usize);
+        let n_columns = sample_size(n_features, self.colsample);
         
-        // Compute hidden layer
-        let mut hidden = x.dot(w);
-        
-        // Apply ReLU activation
-        hidden.mapv_inplace(|v| if v > 0.0 { v } else { 0.0 });
-        
-        // Apply dropout if specified
-        if dropout > 0.0 {
-            for val in hidden.iter_mut() {
-                if rng.gen::<f64>() < dropout {
-                    *val = 0.0;
-                } else {
-                    *val /= 1.0 - dropout;
-                }
-            }
+        // Draw every stage's columns and weights up front from the sequential stream,
+        // so that the fitted model does not depend on the number of workers. The
+        // weights go straight to their store, and stages read theirs from it.
+        let empty = empty_weights(
+            self.compact_weights,
+            weights_distribution,
+            n_columns.unwrap_or(n_features),
+            n_hidden_features,
+            self.weights_cache_size,
+        );
+        let mut columns = Vec::new();
+        let mut weights = NewWeights::new(&empty);
+        let mut seeds = Vec::new();
+        let mut timers = Vec::with_capacity(n_estimators);
+        for _ in 0..n_estimators {
+            let mut timer = StageTimer::new(self.profile);
+            let start = timer.start();
+            columns.extend(sample_indices(&mut rng, n_features, self.colsample));
+            weights.push(draw_weights(
+                &mut rng,
+                weights_distribution,
+                n_columns.unwrap_or(n_features),
+                n_hidden_features,
+                self.compact_weights.then_some(&mut seeds),
+            ));
+            timer.stop(Phase::Sampling, start);
+            timers.push(timer);
         }
+        let weights = stack_weights(&empty, weights, &seeds);
         
-        // If direct_link is true, concatenate x and hidden horizontally
-        // This will create a matrix with:
-        // - Same number of rows as input
-        // - Columns = original features + hidden features
-        if self.direct_link {
-            let mut combined = Array2::zeros((
-                x.shape()[0],                    // number of samples (rows)
-                x.shape()[1] + hidden.shape()[1] // original features + hidden features (columns)
-            ));
-            combined.slice_mut(s![.., ..x.shape()[1]]).assign(x);        // First part: original features
-            combined.slice_mut(s![.., x.shape()[1]..]).assign(&hidden); // Second part: hidden features
-            Ok(combined)
+        // Stages are independent: split them in contiguous chunks, one per worker
+        let (this, weights_ref, columns_ref) = (&*self, &weights, &columns[..]);
+        let n_jobs = n_jobs.clamp(1, n_estimators.max(1));
+        let stage_results: Vec<PyResult<BaseLearner>> = if n_jobs == 1 {
+            let stages = 0..n_estimators;
+            this.fit_bagging_stages(x_array, y_array, columns_ref, weights_ref, dropout, seed, stages, &mut timers)
         } else {
-            Ok(hidden)
+            let chunk_size = (n_estimators + n_jobs - 1) / n_jobs;
+            std::thread::scope(|scope| {
+                let workers: Vec<_> = (0..n_estimators)
+                    .step_by(chunk_size)
+                    .zip(timers.chunks_mut(chunk_size))
+                    .map(|(start, timers)| {
+                        let stages = start..(start + chunk_size).min(n_estimators);
+                        scope.spawn(move || {
+                            this.fit_bagging_stages(x_array, y_array, columns_ref, weights_ref, dropout, seed, stages, timers)
+                        })
+                    })
+                    .collect();
+                workers
+                    .into_iter()
+                    .flat_map(|worker| worker.join().unwrap_or_else(|e| std::panic::resume_unwind(e)))
+                    .collect()
+            })
+        };
+        self.base_learners = stage_results.into_iter().collect::<PyResult<Vec<_>>>()?;
+        // Bagging stages are not predicted on the training data: no training loss
+        self.fit_profile = self.profile.then(|| {
+            let mut fit_profile = FitProfile::default();
+            timers.iter().for_each(|timer| fit_profile.push(timer, f64::NAN));
+            fit_profile
+        });
+        self.stacked_weights = weights;
+        self.projections = StageProjections::default();
+        self.columns = columns;
+        self.n_features_in = n_features;
+        Ok(())
+    }
+
+    // Fit a range of bagging stages, sharing one input buffer, with one timer per stage
+    fn fit_bagging_stages<F: Real>(
+        &self,
+        x_array: &Matrix<F>,
+        y_array: ArrayView2<f64>,
+        columns: &[Vec<usize>],
+        weights: &WeightStore,
+        dropout: f64,
+        seed: u64,
+        stages: std::ops::Range<usize>,
+        timers: &mut [StageTimer],
+    ) -> Vec<PyResult<BaseLearner>> {
+        let n_columns = columns.first().map(Vec::len);
+        let n_hidden = self.n_hidden_features as usize;
+        let mut inputs = StageInputs::new(x_array, n_columns, n_hidden, self.direct_link);
+        stages
+            .zip(timers.iter_mut())
+            .map(|(i, timer)| {
+                // Forward pass with activation
+                let start = timer.start();
+                let w = weights.stage(i, n_hidden);
+                let projection = Projection::new(w.view(), self.weights_distribution);
+                let w = F::weights(w.view());
+                let hidden = inputs.forward_columns(
+                    x_array,
+                    stage_columns(columns, i),
+                    w.view(),
+                    &projection,
+                    dropout,
+                    seed + i as u64,
+                );
+                timer.stop(Phase::Forward, start);
+                // Fit the base learner directly on y (no residuals)
+                self.base_estimator.fit(hidden, y_array, None, seed + i as u64, timer)
+            })
+            .collect()
+    }
+
+    fn predict_bagging_array<F: Real>(&self, x_array: &Matrix<F>) -> PyResult<Array2<f64>> {
+        // Get predictions from each base learner
+        let shape = (x_array.dim().0, self.n_outputs);
+        let mut stage_predictions = vec![Array2::zeros(shape); self.base_learners.len()];
+        for_each_stage_prediction(
+            x_array,
+            &self.stacked_weights,
+            self.projections(),
+            &self.columns,
+            &self.base_learners,
+            self.n_hidden_features as usize,
+            self.direct_link,
+            self.weights_distribution,
+            |i, rows, pred| stage_predictions[i].slice_mut(s![rows, ..]).assign(&pred),
+        )?;
+        
+        // Median across estimators, for each sample and output
+        let mut final_predictions = Array2::zeros(shape);
+        let mut values = Vec::with_capacity(stage_predictions.len());
+        for ((i, j), prediction) in final_predictions.indexed_iter_mut() {
+            values.clear();
+            values.extend(stage_predictions.iter().map(|p| p[[i, j]]));
+            *prediction = median(&mut values);
         }
+        Ok(final_predictions)
     }
 }
 
 #[pyclass]
 pub struct AdaBoostRegressor {
-    base_learners: Vec<PyObject>,
+    base_estimator: LearnerSpec,
+    base_learners: Vec<BaseLearner>,
     alphas: Vec<f64>,
-    weights: Vec<Array2<f64>>,
+    stacked_weights: WeightStore,
+    // Kernels of the stages, for structured weights
+    projections: StageProjections,
+    // Sorted input columns seen by each stage (empty without column subsampling)
+    columns: Vec<Vec<usize>>,
+    // Number of columns of the inputs of fit
+    n_features_in: usize,
     learning_rate: f64,
+    #[pyo3(get)]
     n_estimators: i32,
     n_hidden_features: i32,
     direct_link: bool,
     weights_distribution: WeightsDistribution,
+    // Store one seed per stage instead of its weights, keeping up to
+    // `weights_cache_size` regenerated stages in memory
+    compact_weights: bool,
+    weights_cache_size: usize,
     tolerance: f64,
+    relative_tolerance: bool,
+    n_iter_no_change: Option<usize>,
+    #[pyo3(get)]
+    validation_loss: Vec<f64>,
     dropout: f64,
+    subsample: f64,
+    colsample: f64,
     seed: u64,
+    n_outputs: usize,
+    multi_output: bool,
+    // Record the timings and training loss of each stage in `fit_profile`
+    profile: bool,
+    fit_profile: Option<FitProfile>,
+    // Record the peak bytes allocated by the Rust side of the last fit
+    track_memory: bool,
+    #[pyo3(get)]
+    peak_fit_memory: Option<usize>,
 }
 
 #[pymethods]
 impl AdaBoostRegressor {
     #[new]
+    #[pyo3(signature = (
+        base_estimator,
+        n_estimators,
+        learning_rate,
+        n_hidden_features,
+        direct_link,
+        weights_distribution,
+        dropout,
+        tolerance,
+        random_state=None,
+        n_iter_no_change=None,
+        relative_tolerance=false,
+        subsample=1.0,
+        colsample=1.0,
+        compact_weights=false,
+        weights_cache_size=0,
+        profile=false,
+        track_memory=false
+    ))]
     fn new(
+        py: Python,
         base_estimator: PyObject,
         n_estimators: i32,
         learning_rate: f64,
@@ -443,33 +2022,148 @@ impl AdaBoostRegressor {
         dropout: f64,
         tolerance: f64,
         random_state: Option<i64>,
-    ) -> Self {
+        n_iter_no_change: Option<usize>,
+        relative_tolerance: bool,
+        subsample: f64,
+        colsample: f64,
+        compact_weights: bool,
+        weights_cache_size: usize,
+        profile: bool,
+        track_memory: bool,
+    ) -> PyResult<Self> {
         let seed = random_state.unwrap_or(42) as u64;
-        let weights_dist = match weights_distribution.as_str() {
-            "normal" => WeightsDistribution::Normal,
-            _ => WeightsDistribution::Uniform,
-        };
+        let weights_dist = WeightsDistribution::from_name(&weights_distribution);
         
-        AdaBoostRegressor {
-            base_learners: vec![base_estimator; n_estimators as usize],
+        Ok(AdaBoostRegressor {
+            base_estimator: LearnerSpec::from_estimator(py, base_estimator)?,
+            base_learners: Vec::new(),
             alphas: Vec::new(),
-            weights: Vec::new(),
+            stacked_weights: WeightStore::empty(),
+            projections: StageProjections::default(),
+            columns: Vec::new(),
+            n_features_in: 0,
             learning_rate,
             n_estimators,
             n_hidden_features,
             direct_link,
             weights_distribution: weights_dist,
+            compact_weights,
+            weights_cache_size,
             tolerance,
+            relative_tolerance,
+            n_iter_no_change,
+            validation_loss: Vec::new(),
             dropout,
+            subsample: check_fraction("subsample", subsample)?,
+            colsample: check_fraction("colsample", colsample)?,
             seed,
-        }
+            n_outputs: 1,
+            multi_output: false,
+            profile,
+            fit_profile: None,
+            track_memory,
+            peak_fit_memory: None,
+        })
+    }
+
+    // Per-stage timings (in nanoseconds) and weighted training loss of the last
+    // fit, as a NumPy record array, or None when it was not profiled
+    #[getter]
+    fn fit_profile(&self, py: Python) -> PyResult<Option<PyObject>> {
+        self.fit_profile.as_ref().map(|profile| profile.to_numpy(py)).transpose()
+    }
+
+    // Bytes held by the fitted model (see `memory_usage`)
+    fn memory_usage(&self, py: Python) -> PyResult<PyObject> {
+        Ok(memory_usage(py, &self.stacked_weights, &self.columns, &self.base_learners, &self.alphas)?.into())
+    }
+
+    #[pyo3(signature = (x, y, x_val=None, y_val=None))]
+    fn fit(
+        &mut self,
+        py: Python,
+        x: &PyAny,
+        y: &PyAny,
+        x_val: Option<&PyAny>,
+        y_val: Option<&PyAny>,
+    ) -> PyResult<()> {
+        let tracker = self.track_memory.then(PeakTracker::start);
+        let (y_array, multi_output) = unsafe { targets_as_array(y)? };
+        self.n_outputs = y_array.ncols();
+        self.multi_output = multi_output;
+        with_input_array!(x, |x_array| {
+            let validation = unsafe { validation_arrays(x_val, y_val)? };
+            // Python base learners reacquire the GIL for their own fit/predict calls
+            py.allow_threads(|| self.fit_array(&x_array, y_array, validation))
+        })?;
+        self.peak_fit_memory = tracker.map(PeakTracker::finish);
+        Ok(())
+    }
+
+    fn predict(&self, py: Python, x: &PyAny) -> PyResult<PyObject> {
+        let predictions = with_input_array!(x, |x_array| py.allow_threads(|| self.predict_array(&x_array))?);
+        Ok(predictions_to_py(py, predictions, self.multi_output))
+    }
+
+    // Staged predictions are computed in the precision of the inputs, as in predict
+    fn staged_predict(slf: PyRef<Self>, x: &PyAny) -> PyResult<StagedPredictions> {
+        let py = slf.py();
+        let (n_hidden_features, direct_link) = (slf.n_hidden_features as usize, slf.direct_link);
+        let n_columns = slf.columns.first().map(Vec::len);
+        let input = StagedInputs::new(py, x, n_columns, n_hidden_features, direct_link)?;
+        let (n_outputs, multi_output) = (slf.n_outputs, slf.multi_output);
+        Ok(StagedPredictions::new(StagedModel::AdaBoost(slf.into()), input, n_outputs, multi_output))
+    }
+
+    fn export(&self, py: Python) -> PyResult<PyObject> {
+        let stages = export_stages(
+            py,
+            &self.stacked_weights,
+            &self.columns,
+            &self.base_learners,
+            self.n_hidden_features,
+            self.direct_link,
+            self.learning_rate,
+        )?;
+        stages.set_item("alphas", self.alphas.to_pyarray(py))?;
+        stages.set_item("n_outputs", self.n_outputs)?;
+        stages.set_item("multi_output", self.multi_output)?;
+        Ok(stages.into())
+    }
+
+    // Binary model (see `persistence`), with optional user `metadata` stored alongside
+    #[pyo3(signature = (metadata=None))]
+    fn to_bytes(&self, py: Python, metadata: Option<&[u8]>) -> PyResult<PyObject> {
+        let data = persistence::adaboost_to_bytes(py, self, metadata.unwrap_or_default())?;
+        Ok(PyBytes::new(py, &data).into())
+    }
+
+    #[pyo3(signature = (path, metadata=None))]
+    fn save(&self, py: Python, path: &str, metadata: Option<&[u8]>) -> PyResult<()> {
+        let data = persistence::adaboost_to_bytes(py, self, metadata.unwrap_or_default())?;
+        Ok(std::fs::write(path, data)?)
+    }
+
+    fn __reduce__(&self, py: Python) -> PyResult<(PyObject, (PyObject,))> {
+        let from_bytes = py.import("genbooster.persistence")?.getattr("_model_from_bytes")?;
+        Ok((from_bytes.into(), (self.to_bytes(py, None)?,)))
+    }
+}
+
+impl AdaBoostRegressor {
+    fn projections(&self) -> &[Projection] {
+        let (n_stages, n_hidden) = (self.base_learners.len(), self.n_hidden_features as usize);
+        self.projections.get(&self.stacked_weights, n_stages, n_hidden, self.weights_distribution)
     }
 
-    fn fit(&mut self, py: Python, x: &PyArray2<f64>, y: &PyArray1<f64>) -> PyResult<()> {
-        let x_array = unsafe { x.as_array() };
-        let y_array = unsafe { y.as_array() };
-        let n_samples = x_array.shape()[0];
-        let n_features = x_array.shape()[1];
+    fn fit_array<F: Real>(
+        &mut self,
+        x_array: &Matrix<F>,
+        y_array: ArrayView2<f64>,
+        validation: Option<(Matrix<F>, ArrayView2<f64>)>,
+    ) -> PyResult<()> {
+        let n_samples = x_array.dim().0;
+        let n_features = x_array.dim().1;
         
         // Initialize RNG with seed
         let mut rng = create_rng(self.seed);
@@ -477,56 +2171,87 @@ impl AdaBoostRegressor {
         // Initialize sample weights
         let mut sample_weights = Array1::ones(n_samples) / (n_samples as f64);
         
-        // Get sklearn's clone function
-        let sklearn = py.import("sklearn.base")?;
-        let clone_fn = sklearn.getattr("clone")?;
-        
-        // Create deep copies for all base learners
-        for i in 0..self.n_estimators {
-            self.base_learners[i as usize] = clone_fn.call1((self.base_learners[i as usize].clone_ref(py),))?.into();
-        }
+        self.base_learners.clear();
+        self.alphas.clear();
+        self.stacked_weights = WeightStore::empty();
+        self.projections = StageProjections::default();
+        self.columns.clear();
+        self.n_features_in = n_features;
+        self.validation_loss.clear();
         
-        // Calculate the range of target values for loss normalization
-        let y_max = y_array.iter().fold(f64::NEG_INFINITY, |a, &b| f64::max(a, b));
-        let y_min = y_array.iter().fold(f64::INFINITY, |a, &b| f64::min(a, b));
+        // Calculate the range of each output for loss normalization
+        let y_max = y_array.fold_axis(Axis(0), f64::NEG_INFINITY, |&a, &b| f64::max(a, b));
+        let y_min = y_array.fold_axis(Axis(0), f64::INFINITY, |&a, &b| f64::min(a, b));
         let y_range = y_max - y_min;
+        let n_hidden = self.n_hidden_features as usize;
+        let n_columns = sample_size(n_features, self.colsample);
+        let distribution = self.weights_distribution;
+        let mut inputs = StageInputs::new(x_array, n_columns, n_hidden, self.direct_link);
+        let mut validation =
+            validation.map(|(x_val, y_val)| Validation::new(x_val, y_val, n_columns, n_hidden, self.direct_link));
+        let mut early_stopping =
+            EarlyStopping::new(self.n_iter_no_change.unwrap_or(1), self.tolerance, self.relative_tolerance);
         
+        // Stages are added to the model once they are all fitted
+        let empty = empty_weights(
+            self.compact_weights,
+            self.weights_distribution,
+            n_columns.unwrap_or(n_features),
+            n_hidden,
+            self.weights_cache_size,
+        );
+        let mut weights = NewWeights::new(&empty);
+        let mut seeds = Vec::new();
+        let mut columns = Vec::new();
+        let mut base_learners = Vec::new();
+        let mut alphas: Vec<f64> = Vec::new();
+        let mut fit_profile = self.profile.then(FitProfile::default);
         for i in 0..self.n_estimators {
-            // Generate random weights for hidden layer
-            let mut w = Array2::zeros((n_features, self.n_hidden_features as usize));
-            for w_row in w.rows_mut() {
-                for w_val in w_row {
-                    *w_val = match self.weights_distribution {
-                        WeightsDistribution::Uniform => rng.gen::<f64>(),
-                        WeightsDistribution::Normal => rng.gen::<f64>(),
-                    };
-                }
-            }
-            self.weights.push(w.clone());
+            let mut timer = StageTimer::new(self.profile);
+            // Columns seen by the stage, random weights for hidden layer, and rows of the fit
+            let phase_start = timer.start();
+            let sampled_columns = sample_indices(&mut rng, n_features, self.colsample);
+            let w = draw_weights(
+                &mut rng,
+                self.weights_distribution,
+                n_columns.unwrap_or(n_features),
+                n_hidden,
+                self.compact_weights.then_some(&mut seeds),
+            );
+            let rows = sample_indices(&mut rng, n_samples, self.subsample);
+            timer.stop(Phase::Sampling, phase_start);
             
             // Forward pass with activation
-            let hidden = self.forward_pass(py, &x_array.to_owned(), &w, self.dropout, self.seed + i as u64)?;
+            let phase_start = timer.start();
+            let projection = Projection::new(w.view(), distribution);
+            let w_stage = F::weights(w.view());
+            let hidden = inputs.forward_columns(
+                x_array,
+                sampled_columns.as_deref(),
+                w_stage.view(),
+                &projection,
+                self.dropout,
+                self.seed + i as u64,
+            );
+            timer.stop(Phase::Forward, phase_start);
             
-            // Get current base learner
-            let base_learner = &self.base_learners[i as usize];
+            // Fit the base learner with sample weights (on a subsample of the rows
+            // if requested), and predict on all inputs
+            let (base_learner, pred_array) = self.base_estimator.fit_predict_rows(
+                hidden,
+                y_array,
+                Some(sample_weights.view()),
+                rows.as_deref(),
+                self.seed + i as u64,
+                &mut timer,
+            )?;
             
-            // Fit the base learner with sample weights
-            let kwargs = PyDict::new(py);
-            kwargs.set_item("X", hidden.to_pyarray(py))?;
-            kwargs.set_item("y", y)?;
-            kwargs.set_item("sample_weight", sample_weights.to_pyarray(py))?;
-            base_learner.call_method(py, "fit", (), Some(kwargs))?;
-            
-            // Get predictions using transformed features
-            let pred_kwargs = PyDict::new(py);
-            pred_kwargs.set_item("X", hidden.to_pyarray(py))?;
-            let pred_result = base_learner.call_method(py, "predict", (), Some(pred_kwargs))?;
-            let predictions: &PyArray1<f64> = pred_result.extract(py)?;
-            let pred_array = unsafe { predictions.as_array() };
-            
-            // Calculate normalized errors (AdaBoost.R2)
-            let diff = &y_array.to_owned() - &pred_array.to_owned();
-            let loss = diff.mapv(|x| x.abs() / y_range);
+            // Calculate normalized errors (AdaBoost.R2), taking the worst output per sample
+            let phase_start = timer.start();
+            let loss = pred_array.apply(|pred| {
+                let diff = &y_array - &pred;
+                (diff.mapv(f64::abs) / &y_range).fold_axis(Axis(1), 0.0, |&a, &b| f64::max(a, b))
+            })?;
             let max_loss = loss.iter().fold(0.0f64, |a, &b| f64::max(a, b));
             let normalized_loss = loss.mapv(|x| x / max_loss);
             
@@ -540,90 +2265,72 @@ impl AdaBoostRegressor {
             // Calculate beta (different from classification AdaBoost)
             let beta = error / (1.0 - error);
             let alpha = self.learning_rate * beta.ln();
-            self.alphas.push(-alpha); // Note the negative sign
+            alphas.push(-alpha); // Note the negative sign
             
             // Update sample weights
             let new_weights = normalized_loss.mapv(|l| beta.powf(1.0 - l));
             sample_weights = &sample_weights * &new_weights;
             let sum_weights: f64 = sample_weights.sum();
             sample_weights = sample_weights.mapv(|w| w / sum_weights);
+            timer.stop(Phase::Update, phase_start);
+            
+            // Early stopping if error is too small, or if the validation loss
+            // of the weighted ensemble plateaus
+            let phase_start = timer.start();
+            let mut stop = error < self.tolerance;
+            if let Some(validation) = validation.as_mut() {
+                validation.add_stage(&base_learner, sampled_columns.as_deref(), w.view(), &projection, -alpha)?;
+                let loss = validation.loss(1.0 / alphas.iter().sum::<f64>());
+                self.validation_loss.push(loss);
+                stop |= early_stopping.update(loss);
+            }
+            timer.stop(Phase::Validation, phase_start);
+            if let Some(fit_profile) = fit_profile.as_mut() {
+                fit_profile.push(&timer, error);
+            }
             
             // Store the fitted estimator
-            self.base_learners[i as usize] = base_learner.clone_ref(py);
+            weights.push(w);
+            columns.extend(sampled_columns);
+            base_learners.push(base_learner);
             
-            // Early stopping if error is too small
-            if error < self.tolerance {
+            if stop {
                 self.n_estimators = i + 1;
                 break;
             }
         }
+        self.stacked_weights = stack_weights(&empty, weights, &seeds);
+        self.projections = StageProjections::default();
+        self.columns = columns;
+        self.base_learners = base_learners;
+        self.alphas = alphas;
+        self.fit_profile = fit_profile;
         Ok(())
     }
 
-    fn predict(&self, py: Python, x: &PyArray2<f64>) -> PyResult<Py<PyArray1<f64>>> {
-        let x_array = unsafe { x.as_array() };
-        let n_samples = x_array.shape()[0];
-        let mut predictions = Array1::zeros(n_samples);
+    fn predict_array<F: Real>(&self, x_array: &Matrix<F>) -> PyResult<Array2<f64>> {
+        let n_samples = x_array.dim().0;
+        let mut predictions = Array2::zeros((n_samples, self.n_outputs));
+        if self.base_learners.is_empty() {
+            return Ok(predictions);
+        }
         let sum_alphas: f64 = self.alphas.iter().sum();
         
-        for ((base_learner, &alpha), w) in self.base_learners.iter()
-            .zip(self.alphas.iter())
-            .zip(self.weights.iter()) {
-            
-            let hidden = self.forward_pass(py, &x_array.to_owned(), w, 0.0, self.seed)?;
-            
-            let pred_kwargs = PyDict::new(py);
-            pred_kwargs.set_item("X", hidden.to_pyarray(py))?;
-            let pred_result = base_learner.call_method(py, "predict", (), Some(pred_kwargs))?;
-            let pred: &PyArray1<f64> = pred_result.extract(py)?;
-            let pred_array = unsafe { pred.as_array() };
-            
-            // Convert view to owned array and perform operations
-            let pred_owned = pred_array.to_owned();
-            predictions = predictions + (alpha * pred_owned);
-        }
+        for_each_stage_prediction(
+            x_array,
+            &self.stacked_weights,
+            self.projections(),
+            &self.columns,
+            &self.base_learners,
+            self.n_hidden_features as usize,
+            self.direct_link,
+            self.weights_distribution,
+            |i, rows, pred_owned| predictions.slice_mut(s![rows, ..]).scaled_add(self.alphas[i], &pred_owned),
+        )?;
         
         // Normalize by sum of alphas
         predictions = predictions.mapv(|x| x / sum_alphas);
         
-        Ok(predictions.to_pyarray(py).to_owned())
-    }
-}
-
-impl AdaBoostRegressor {
-    fn forward_pass(
-        &self,
-        py: Python,
-        x: &Array2<f64>,
-        w: &Array2<f64>,
-        dropout: f64,
-        seed: u64,
-    ) -> PyResult<Array2<f64>> {
-        let mut rng = create_rng(seed);
-        
-        // Compute hidden layer
-        let mut hidden = x.dot(w);
-        
-        // Apply ReLU activation
-        hidden.mapv_inplace(|v| if v > 0.0 { v } else { 0.0 });
-        
-        // Apply dropout if specified
-        if dropout > 0.0 {
-            for val in hidden.iter_mut() {
-                if rng.gen::<f64>() < dropout {
-                    *val = 0.0;
-                } else {
-                    *val /= 1.0 - dropout;
-                }
-            }
-        }
-        
-        // If direct_link is true, concatenate x and hidden horizontally
-        if self.direct_link {
-            let combined = ndarray::concatenate![Axis(1), x.to_owned(), hidden];
-            Ok(combined)
-        } else {
-            Ok(hidden)
-        }
+        Ok(predictions)
     }
 }
\ No newline at end of file
@@ -0,0 +1,88 @@
+// Memory accounting: the bytes held by a fitted model, and the peak bytes
+// allocated by the Rust side during a fit.
+//
+// The peak is measured by the global allocator of the extension, which counts
+// allocations only while a `PeakTracker` is alive (otherwise each allocation
+// costs one relaxed atomic load). It covers the Rust workspace of the fit:
+// input and target copies, hidden feature buffers, residuals, native base
+// learners and the arrays handed to Python learners, but not the memory that
+// Python learners allocate themselves. Fits tracked at the same time (from
+// several threads) share the counters.
+
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::sync::atomic::{AtomicIsize, AtomicUsize, Ordering};
+
+struct TrackingAllocator;
+
+// Number of live trackers, bytes allocated (net of frees) since the first of
+// them started, and the maximum of that count
+static TRACKERS: AtomicUsize = AtomicUsize::new(0);
+static CURRENT: AtomicIsize = AtomicIsize::new(0);
+static PEAK: AtomicIsize = AtomicIsize::new(0);
+
+#[inline]
+fn record(delta: isize) {
+    if TRACKERS.load(Ordering::Relaxed) > 0 {
+        let current = CURRENT.fetch_add(delta, Ordering::Relaxed) + delta;
+        PEAK.fetch_max(current, Ordering::Relaxed);
+    }
+}
+
+unsafe impl GlobalAlloc for TrackingAllocator {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        let ptr = System.alloc(layout);
+        if !ptr.is_null() {
+            record(layout.size() as isize);
+        }
+        ptr
+    }
+
+    unsafe fn alloc_zeroed(&self, layout: Layout) -> *mut u8 {
+        let ptr = System.alloc_zeroed(layout);
+        if !ptr.is_null() {
+            record(layout.size() as isize);
+        }
+        ptr
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        System.dealloc(ptr, layout);
+        record(-(layout.size() as isize));
+    }
+
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        let new_ptr = System.realloc(ptr, layout, new_size);
+        if !new_ptr.is_null() {
+            record(new_size as isize - layout.size() as isize);
+        }
+        new_ptr
+    }
+}
+
+#[global_allocator]
+static ALLOCATOR: TrackingAllocator = TrackingAllocator;
+
+// Peak bytes allocated while the tracker is alive, above the bytes allocated
+// when it started (memory allocated before and freed during the fit lowers the
+// count, so the peak is the largest growth of the Rust heap)
+pub struct PeakTracker;
+
+impl PeakTracker {
+    pub fn start() -> Self {
+        if TRACKERS.fetch_add(1, Ordering::SeqCst) == 0 {
+            CURRENT.store(0, Ordering::SeqCst);
+            PEAK.store(0, Ordering::SeqCst);
+        }
+        PeakTracker
+    }
+
+    pub fn finish(self) -> usize {
+        PEAK.load(Ordering::SeqCst).max(0) as usize
+    }
+}
+
+impl Drop for PeakTracker {
+    fn drop(&mut self) {
+        TRACKERS.fetch_sub(1, Ordering::SeqCst);
+    }
+}
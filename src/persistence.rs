@@ -0,0 +1,699 @@
+// Binary model format: a header, the model settings and user metadata, the stacked
+// hidden layer weights (or the seeds they are regenerated from, for compact
+// models, or their packed bits or bytes for sign and int8 weights) and the input columns of each stage, then the base learners.
+// Fields are fixed-width little-endian, and the weight block is aligned so that a
+// loaded model can map it in place instead of copying it (weights dominate the
+// size of most models).
+//
+// Python base learners (and Python base estimator templates) are pickled, so files
+// must come from a trusted source.
+
+use crate::extratree::{ExtraTreeParams, ExtraTreeRegressor, TREE_LEAF};
+use crate::rust_utils::create_rng;
+use crate::weights::{PackedWeights, SeededWeights, WeightStore};
+use crate::{AdaBoostRegressor, BaseLearner, LearnerSpec, RustBooster, StageProjections, WeightsDistribution};
+use memmap2::Mmap;
+use ndarray::{Array1, Array2};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use pyo3::types::PyBytes;
+use std::sync::Arc;
+
+const MAGIC: &[u8; 8] = b"GENBOOST";
+const VERSION: u64 = 1;
+const ALIGNMENT: usize = 64;
+
+// Model kinds
+const BOOSTER: u64 = 0;
+const ADABOOST: u64 = 1;
+
+// Base learner (and base estimator template) tags
+const PYTHON: u8 = 0;
+const EXTRA_TREE: u8 = 1;
+const LINEAR: u8 = 2;
+
+struct Writer {
+    buf: Vec<u8>,
+}
+
+impl Writer {
+    fn new(kind: u64) -> Self {
+        let mut writer = Writer { buf: MAGIC.to_vec() };
+        writer.u64(VERSION);
+        writer.u64(kind);
+        writer
+    }
+
+    fn u8(&mut self, value: u8) {
+        self.buf.push(value);
+    }
+
+    fn u64(&mut self, value: u64) {
+        self.buf.extend_from_slice(&value.to_le_bytes());
+    }
+
+    fn f64(&mut self, value: f64) {
+        self.buf.extend_from_slice(&value.to_le_bytes());
+    }
+
+    fn bytes(&mut self, value: &[u8]) {
+        self.u64(value.len() as u64);
+        self.buf.extend_from_slice(value);
+    }
+
+    fn f64s(&mut self, values: &[f64]) {
+        self.u64(values.len() as u64);
+        for value in values {
+            self.f64(*value);
+        }
+    }
+
+    fn i64s(&mut self, values: &[i64]) {
+        self.u64(values.len() as u64);
+        for value in values {
+            self.buf.extend_from_slice(&value.to_le_bytes());
+        }
+    }
+
+    fn align(&mut self) {
+        while self.buf.len() % ALIGNMENT != 0 {
+            self.buf.push(0);
+        }
+    }
+}
+
+struct Reader<'a> {
+    data: &'a [u8],
+    pos: usize,
+}
+
+fn invalid(message: &str) -> PyErr {
+    PyValueError::new_err(format!("Invalid model data: {}", message))
+}
+
+impl<'a> Reader<'a> {
+    fn take(&mut self, n: usize) -> PyResult<&'a [u8]> {
+        let end = self.pos.checked_add(n).filter(|&end| end <= self.data.len());
+        let end = end.ok_or_else(|| invalid("unexpected end of data"))?;
+        let bytes = &self.data[self.pos..end];
+        self.pos = end;
+        Ok(bytes)
+    }
+
+    fn u8(&mut self) -> PyResult<u8> {
+        Ok(self.take(1)?[0])
+    }
+
+    fn u64(&mut self) -> PyResult<u64> {
+        Ok(u64::from_le_bytes(self.take(8)?.try_into().unwrap()))
+    }
+
+    fn usize(&mut self) -> PyResult<usize> {
+        usize::try_from(self.u64()?).map_err(|_| invalid("length out of range"))
+    }
+
+    fn bool(&mut self) -> PyResult<bool> {
+        Ok(self.u8()? != 0)
+    }
+
+    fn f64(&mut self) -> PyResult<f64> {
+        Ok(f64::from_le_bytes(self.take(8)?.try_into().unwrap()))
+    }
+
+    fn bytes(&mut self) -> PyResult<&'a [u8]> {
+        let n = self.usize()?;
+        self.take(n)
+    }
+
+    // `n` values of 8 bytes
+    fn words(&mut self, n: usize) -> PyResult<impl Iterator<Item = [u8; 8]> + 'a> {
+        let bytes = self.take(n.checked_mul(8).ok_or_else(|| invalid("length out of range"))?)?;
+        Ok(bytes.chunks_exact(8).map(|b| b.try_into().unwrap()))
+    }
+
+    fn f64s(&mut self) -> PyResult<Vec<f64>> {
+        let n = self.usize()?;
+        Ok(self.words(n)?.map(f64::from_le_bytes).collect())
+    }
+
+    fn i64s(&mut self) -> PyResult<Vec<i64>> {
+        let n = self.usize()?;
+        Ok(self.words(n)?.map(i64::from_le_bytes).collect())
+    }
+
+    fn align(&mut self) -> PyResult<()> {
+        let padding = (ALIGNMENT - self.pos % ALIGNMENT) % ALIGNMENT;
+        self.take(padding).map(|_| ())
+    }
+}
+
+// Settings shared by both model kinds
+struct Settings {
+    learning_rate: f64,
+    n_hidden_features: i32,
+    n_estimators: i32,
+    direct_link: bool,
+    weights_distribution: WeightsDistribution,
+    compact_weights: bool,
+    weights_cache_size: usize,
+    dropout: f64,
+    subsample: f64,
+    colsample: f64,
+    tolerance: f64,
+    relative_tolerance: bool,
+    n_iter_no_change: Option<usize>,
+    validation_loss: Vec<f64>,
+    seed: u64,
+    n_outputs: usize,
+    multi_output: bool,
+    n_features_in: usize,
+}
+
+impl Settings {
+    fn write(&self, writer: &mut Writer) {
+        writer.f64(self.learning_rate);
+        writer.u64(self.n_hidden_features as u64);
+        writer.u64(self.n_estimators as u64);
+        writer.u8(self.direct_link as u8);
+        writer.u8(match self.weights_distribution {
+            WeightsDistribution::Uniform => 0,
+            WeightsDistribution::Normal => 1,
+            WeightsDistribution::Achlioptas => 2,
+            WeightsDistribution::VerySparse => 3,
+            WeightsDistribution::Srht => 4,
+            WeightsDistribution::Sign => 5,
+            WeightsDistribution::Int8 => 6,
+        });
+        writer.u8(self.compact_weights as u8);
+        writer.u64(self.weights_cache_size as u64);
+        writer.f64(self.dropout);
+        writer.f64(self.subsample);
+        writer.f64(self.colsample);
+        writer.f64(self.tolerance);
+        writer.u8(self.relative_tolerance as u8);
+        writer.u64(write_optional(self.n_iter_no_change));
+        writer.f64s(&self.validation_loss);
+        writer.u64(self.seed);
+        writer.u64(self.n_outputs as u64);
+        writer.u8(self.multi_output as u8);
+        writer.u64(self.n_features_in as u64);
+    }
+
+    fn read(reader: &mut Reader) -> PyResult<Self> {
+        Ok(Settings {
+            learning_rate: reader.f64()?,
+            n_hidden_features: reader.u64()? as i32,
+            n_estimators: reader.u64()? as i32,
+            direct_link: reader.bool()?,
+            weights_distribution: match reader.u8()? {
+                0 => WeightsDistribution::Uniform,
+                1 => WeightsDistribution::Normal,
+                2 => WeightsDistribution::Achlioptas,
+                3 => WeightsDistribution::VerySparse,
+                4 => WeightsDistribution::Srht,
+                5 => WeightsDistribution::Sign,
+                6 => WeightsDistribution::Int8,
+                _ => return Err(invalid("unknown weights distribution")),
+            },
+            compact_weights: reader.bool()?,
+            weights_cache_size: reader.usize()?,
+            dropout: reader.f64()?,
+            subsample: reader.f64()?,
+            colsample: reader.f64()?,
+            tolerance: reader.f64()?,
+            relative_tolerance: reader.bool()?,
+            n_iter_no_change: read_optional(reader)?,
+            validation_loss: reader.f64s()?,
+            seed: reader.u64()?,
+            n_outputs: reader.usize()?,
+            multi_output: reader.bool()?,
+            n_features_in: reader.usize()?,
+        })
+    }
+}
+
+// Optional counts are stored shifted by one, with 0 for None
+fn write_optional(value: Option<usize>) -> u64 {
+    value.map_or(0, |v| v as u64 + 1)
+}
+
+fn read_optional(reader: &mut Reader) -> PyResult<Option<usize>> {
+    Ok(reader.usize()?.checked_sub(1))
+}
+
+fn write_pickle(py: Python, writer: &mut Writer, obj: &PyObject) -> PyResult<()> {
+    let pickled = py.import("pickle")?.call_method1("dumps", (obj.clone_ref(py),))?;
+    writer.bytes(pickled.downcast::<PyBytes>()?.as_bytes());
+    Ok(())
+}
+
+fn read_pickle(py: Python, reader: &mut Reader) -> PyResult<PyObject> {
+    let pickled = PyBytes::new(py, reader.bytes()?);
+    Ok(py.import("pickle")?.call_method1("loads", (pickled,))?.into())
+}
+
+fn write_spec(py: Python, writer: &mut Writer, spec: &LearnerSpec) -> PyResult<()> {
+    match spec {
+        LearnerSpec::Python(estimator) => {
+            writer.u8(PYTHON);
+            write_pickle(py, writer, estimator)?;
+        }
+        LearnerSpec::ExtraTree(params) => {
+            writer.u8(EXTRA_TREE);
+            writer.u64(write_optional(params.max_depth));
+            writer.u64(params.min_samples_split as u64);
+            writer.u64(params.min_samples_leaf as u64);
+            writer.u64(write_optional(params.max_features));
+        }
+        LearnerSpec::Linfa(model_name) => {
+            writer.u8(LINEAR);
+            writer.bytes(model_name.as_bytes());
+        }
+    }
+    Ok(())
+}
+
+fn read_spec(py: Python, reader: &mut Reader) -> PyResult<LearnerSpec> {
+    match reader.u8()? {
+        PYTHON => Ok(LearnerSpec::Python(read_pickle(py, reader)?)),
+        EXTRA_TREE => Ok(LearnerSpec::ExtraTree(ExtraTreeParams {
+            max_depth: read_optional(reader)?,
+            min_samples_split: reader.usize()?,
+            min_samples_leaf: reader.usize()?,
+            max_features: read_optional(reader)?,
+        })),
+        LINEAR => {
+            let model_name = std::str::from_utf8(reader.bytes()?).map_err(|_| invalid("model name"))?;
+            Ok(LearnerSpec::Linfa(model_name.to_string()))
+        }
+        _ => Err(invalid("unknown base estimator")),
+    }
+}
+
+fn write_learners(py: Python, writer: &mut Writer, base_learners: &[BaseLearner]) -> PyResult<()> {
+    writer.u64(base_learners.len() as u64);
+    for base_learner in base_learners {
+        match base_learner {
+            BaseLearner::Python(learner) => {
+                writer.u8(PYTHON);
+                write_pickle(py, writer, learner)?;
+            }
+            BaseLearner::ExtraTree(tree) => {
+                writer.u8(EXTRA_TREE);
+                writer.u64(tree.n_outputs as u64);
+                writer.i64s(&tree.feature);
+                writer.f64s(&tree.threshold);
+                writer.i64s(&tree.left);
+                writer.i64s(&tree.right);
+                writer.f64s(&tree.value);
+            }
+            BaseLearner::Linear { coefficients, intercept } => {
+                writer.u8(LINEAR);
+                writer.f64s(&coefficients.to_vec());
+                writer.f64(*intercept);
+            }
+        }
+    }
+    Ok(())
+}
+
+// Base learners taking `n_inputs` features and predicting `n_outputs` values
+fn read_learners(py: Python, reader: &mut Reader, n_inputs: usize, n_outputs: usize) -> PyResult<Vec<BaseLearner>> {
+    let n_learners = reader.usize()?;
+    let mut base_learners = Vec::new();
+    for _ in 0..n_learners {
+        let base_learner = match reader.u8()? {
+            PYTHON => BaseLearner::Python(read_pickle(py, reader)?),
+            EXTRA_TREE => {
+                let tree = ExtraTreeRegressor {
+                    n_outputs: reader.usize()?,
+                    feature: reader.i64s()?,
+                    threshold: reader.f64s()?,
+                    left: reader.i64s()?,
+                    right: reader.i64s()?,
+                    value: reader.f64s()?,
+                };
+                check_tree(&tree, n_inputs, n_outputs)?;
+                BaseLearner::ExtraTree(tree)
+            }
+            LINEAR => {
+                let coefficients = Array1::from(reader.f64s()?);
+                if coefficients.len() != n_inputs || n_outputs != 1 {
+                    return Err(invalid("linear base learner shape"));
+                }
+                BaseLearner::Linear { coefficients, intercept: reader.f64()? }
+            }
+            _ => return Err(invalid("unknown base learner")),
+        };
+        base_learners.push(base_learner);
+    }
+    Ok(base_learners)
+}
+
+// Prediction only follows valid node indices. Children are always stored after
+// their parent, which also rules out cycles.
+fn check_tree(tree: &ExtraTreeRegressor, n_inputs: usize, n_outputs: usize) -> PyResult<()> {
+    let n_nodes = tree.left.len();
+    let shapes_match = tree.n_outputs == n_outputs
+        && tree.feature.len() == n_nodes
+        && tree.threshold.len() == n_nodes
+        && tree.right.len() == n_nodes
+        && tree.value.len() == n_nodes * n_outputs;
+    let nodes_valid = (0..n_nodes).all(|node| {
+        let child_valid = |child: i64| child > node as i64 && child < n_nodes as i64;
+        if tree.left[node] == TREE_LEAF {
+            tree.right[node] == TREE_LEAF
+        } else {
+            child_valid(tree.left[node])
+                && child_valid(tree.right[node])
+                && tree.feature[node] >= 0
+                && (tree.feature[node] as usize) < n_inputs
+        }
+    });
+    if shapes_match && nodes_valid {
+        Ok(())
+    } else {
+        Err(invalid("extra tree nodes"))
+    }
+}
+
+// Weight block tags
+const STORED: u8 = 0;
+const SEEDED: u8 = 1;
+const PACKED: u8 = 2;
+
+fn write_weights(writer: &mut Writer, weights: &WeightStore) {
+    let weights = match weights {
+        WeightStore::Seeded(seeded) => {
+            writer.u8(SEEDED);
+            writer.u64(seeded.n_features as u64);
+            writer.u64(seeded.n_hidden_features as u64);
+            writer.u64(seeded.seeds.len() as u64);
+            for &seed in &seeded.seeds {
+                writer.u64(seed);
+            }
+            return;
+        }
+        WeightStore::Packed(packed) => {
+            writer.u8(PACKED);
+            writer.u64(packed.n_features as u64);
+            writer.u64(packed.n_hidden_features as u64);
+            writer.u64(packed.n_stages as u64);
+            writer.bytes(&packed.data);
+            return;
+        }
+        _ => weights.view().unwrap(),
+    };
+    writer.u8(STORED);
+    writer.u64(weights.nrows() as u64);
+    writer.u64(weights.ncols() as u64);
+    writer.align();
+    // Row-major, whatever the memory layout
+    for value in weights.iter() {
+        writer.f64(*value);
+    }
+}
+
+// Weights mapped from `map` when given (which must hold the data being read), or
+// seeds regenerating them with the settings' distribution and cache size, or
+// packed weights of the settings' distribution
+fn read_weights(reader: &mut Reader, map: Option<&Arc<Mmap>>, settings: &Settings) -> PyResult<WeightStore> {
+    match reader.u8()? {
+        STORED => {}
+        SEEDED => {
+            let (n_features, n_hidden_features, n_stages) = (reader.usize()?, reader.usize()?, reader.usize()?);
+            let seeds = reader.words(n_stages)?.map(u64::from_le_bytes).collect();
+            let seeded = SeededWeights::new(
+                seeds,
+                settings.weights_distribution,
+                n_features,
+                n_hidden_features,
+                settings.weights_cache_size,
+            );
+            return Ok(WeightStore::Seeded(seeded));
+        }
+        PACKED if settings.weights_distribution.is_packed() => {
+            let (n_features, n_hidden_features, n_stages) = (reader.usize()?, reader.usize()?, reader.usize()?);
+            let packed = PackedWeights::new(settings.weights_distribution, n_features, n_hidden_features);
+            let data = reader.bytes()?;
+            if n_stages.checked_mul(packed.block_len()) != Some(data.len()) {
+                return Err(invalid("packed weights length"));
+            }
+            return Ok(WeightStore::Packed(PackedWeights { n_stages, data: data.to_vec(), ..packed }));
+        }
+        _ => return Err(invalid("unknown weights block")),
+    }
+    let shape = (reader.usize()?, reader.usize()?);
+    let n_values = shape.0.checked_mul(shape.1).ok_or_else(|| invalid("weights shape"))?;
+    reader.align()?;
+    match map {
+        Some(map) => {
+            let offset = reader.pos;
+            reader.take(n_values.checked_mul(8).ok_or_else(|| invalid("weights shape"))?)?;
+            WeightStore::mapped(Arc::clone(map), offset, shape)
+        }
+        None => {
+            let values = reader.words(n_values)?.map(f64::from_le_bytes).collect();
+            Ok(WeightStore::Owned(Array2::from_shape_vec(shape, values).unwrap()))
+        }
+    }
+}
+
+// Input columns of each stage, concatenated (empty without column subsampling)
+fn write_columns(writer: &mut Writer, columns: &[Vec<usize>]) {
+    let flat: Vec<i64> = columns.iter().flatten().map(|&c| c as i64).collect();
+    writer.i64s(&flat);
+}
+
+// Columns of stages seeing `n_columns` of the `n_features` input columns each
+fn read_columns(reader: &mut Reader, n_columns: usize, n_features: usize) -> PyResult<Vec<Vec<usize>>> {
+    let flat = reader.i64s()?;
+    if flat.is_empty() {
+        return Ok(Vec::new());
+    }
+    let out_of_range = |&c: &i64| c < 0 || c as u64 >= n_features as u64;
+    if n_columns == 0 || flat.len() % n_columns != 0 || flat.iter().any(out_of_range) {
+        return Err(invalid("stage columns"));
+    }
+    Ok(flat.chunks(n_columns).map(|chunk| chunk.iter().map(|&c| c as usize).collect()).collect())
+}
+
+fn write_model(
+    py: Python,
+    kind: u64,
+    base_estimator: &LearnerSpec,
+    settings: Settings,
+    alphas: &[f64],
+    metadata: &[u8],
+    weights: &WeightStore,
+    columns: &[Vec<usize>],
+    base_learners: &[BaseLearner],
+) -> PyResult<Vec<u8>> {
+    let mut writer = Writer::new(kind);
+    write_spec(py, &mut writer, base_estimator)?;
+    settings.write(&mut writer);
+    if kind == ADABOOST {
+        writer.f64s(alphas);
+    }
+    writer.bytes(metadata);
+    write_weights(&mut writer, weights);
+    write_columns(&mut writer, columns);
+    write_learners(py, &mut writer, base_learners)?;
+    Ok(writer.buf)
+}
+
+pub(crate) fn booster_to_bytes(py: Python, booster: &RustBooster, metadata: &[u8]) -> PyResult<Vec<u8>> {
+    let settings = Settings {
+        learning_rate: booster.learning_rate,
+        n_hidden_features: booster.n_hidden_features,
+        n_estimators: booster.n_estimators,
+        direct_link: booster.direct_link,
+        weights_distribution: booster.weights_distribution,
+        compact_weights: booster.compact_weights,
+        weights_cache_size: booster.weights_cache_size,
+        dropout: booster.dropout,
+        subsample: booster.subsample,
+        colsample: booster.colsample,
+        tolerance: booster.tolerance,
+        relative_tolerance: booster.relative_tolerance,
+        n_iter_no_change: booster.n_iter_no_change,
+        validation_loss: booster.validation_loss.clone(),
+        seed: booster.seed,
+        n_outputs: booster.n_outputs,
+        multi_output: booster.multi_output,
+        n_features_in: booster.n_features_in,
+    };
+    write_model(
+        py,
+        BOOSTER,
+        &booster.base_estimator,
+        settings,
+        &[],
+        metadata,
+        &booster.stacked_weights,
+        &booster.columns,
+        &booster.base_learners,
+    )
+}
+
+pub(crate) fn adaboost_to_bytes(py: Python, booster: &AdaBoostRegressor, metadata: &[u8]) -> PyResult<Vec<u8>> {
+    let settings = Settings {
+        learning_rate: booster.learning_rate,
+        n_hidden_features: booster.n_hidden_features,
+        n_estimators: booster.n_estimators,
+        direct_link: booster.direct_link,
+        weights_distribution: booster.weights_distribution,
+        compact_weights: booster.compact_weights,
+        weights_cache_size: booster.weights_cache_size,
+        dropout: booster.dropout,
+        subsample: booster.subsample,
+        colsample: booster.colsample,
+        tolerance: booster.tolerance,
+        relative_tolerance: booster.relative_tolerance,
+        n_iter_no_change: booster.n_iter_no_change,
+        validation_loss: booster.validation_loss.clone(),
+        seed: booster.seed,
+        n_outputs: booster.n_outputs,
+        multi_output: booster.multi_output,
+        n_features_in: booster.n_features_in,
+    };
+    write_model(
+        py,
+        ADABOOST,
+        &booster.base_estimator,
+        settings,
+        &booster.alphas,
+        metadata,
+        &booster.stacked_weights,
+        &booster.columns,
+        &booster.base_learners,
+    )
+}
+
+// Model (RustBooster or AdaBoostRegressor) and metadata stored in `data`
+fn read_model(py: Python, data: &[u8], map: Option<&Arc<Mmap>>) -> PyResult<(PyObject, PyObject)> {
+    let mut reader = Reader { data, pos: 0 };
+    if reader.take(MAGIC.len()).ok() != Some(&MAGIC[..]) {
+        return Err(PyValueError::new_err("Not a genbooster model"));
+    }
+    let version = reader.u64()?;
+    if version != VERSION {
+        return Err(PyValueError::new_err(format!("Unsupported model format version: {}", version)));
+    }
+    let kind = reader.u64()?;
+    if kind != BOOSTER && kind != ADABOOST {
+        return Err(invalid("unknown model kind"));
+    }
+    let base_estimator = read_spec(py, &mut reader)?;
+    let settings = Settings::read(&mut reader)?;
+    let alphas = if kind == ADABOOST { reader.f64s()? } else { Vec::new() };
+    let metadata: PyObject = PyBytes::new(py, reader.bytes()?).into();
+    let stacked_weights = read_weights(&mut reader, map, &settings)?;
+
+    // The weights have one row per input column seen by each stage
+    let (n_rows, n_cols) = stacked_weights.shape();
+    let n_hidden = settings.n_hidden_features.max(0) as usize;
+    let columns = read_columns(&mut reader, n_rows, settings.n_features_in)?;
+    let n_inputs = n_hidden + if settings.direct_link { n_rows } else { 0 };
+    let base_learners = read_learners(py, &mut reader, n_inputs, settings.n_outputs)?;
+    if n_cols != base_learners.len() * n_hidden
+        || (!columns.is_empty() && columns.len() != base_learners.len())
+        || (kind == ADABOOST && alphas.len() != base_learners.len())
+    {
+        return Err(invalid("number of stages"));
+    }
+
+    let model = if kind == BOOSTER {
+        // Loaded models predict, and can be refitted, but not warm started (nor
+        // profiled: fit profiles are not saved)
+        let booster = RustBooster {
+            base_estimator,
+            base_learners,
+            stacked_weights,
+            projections: StageProjections::default(),
+            columns,
+            n_features_in: settings.n_features_in,
+            learning_rate: settings.learning_rate,
+            n_hidden_features: settings.n_hidden_features,
+            n_estimators: settings.n_estimators,
+            direct_link: settings.direct_link,
+            weights_distribution: settings.weights_distribution,
+            compact_weights: settings.compact_weights,
+            weights_cache_size: settings.weights_cache_size,
+            dropout: settings.dropout,
+            subsample: settings.subsample,
+            colsample: settings.colsample,
+            tolerance: settings.tolerance,
+            relative_tolerance: settings.relative_tolerance,
+            n_iter_no_change: settings.n_iter_no_change,
+            validation_loss: settings.validation_loss,
+            seed: settings.seed,
+            n_outputs: settings.n_outputs,
+            multi_output: settings.multi_output,
+            residuals: Array2::zeros((0, 0)),
+            rng: create_rng(settings.seed),
+            previous_l2_norm: f64::INFINITY,
+            profile: false,
+            fit_profile: None,
+            track_memory: false,
+            peak_fit_memory: None,
+        };
+        Py::new(py, booster)?.into_py(py)
+    } else {
+        let booster = AdaBoostRegressor {
+            base_estimator,
+            base_learners,
+            alphas,
+            stacked_weights,
+            projections: StageProjections::default(),
+            columns,
+            n_features_in: settings.n_features_in,
+            learning_rate: settings.learning_rate,
+            n_estimators: settings.n_estimators,
+            n_hidden_features: settings.n_hidden_features,
+            direct_link: settings.direct_link,
+            weights_distribution: settings.weights_distribution,
+            compact_weights: settings.compact_weights,
+            weights_cache_size: settings.weights_cache_size,
+            tolerance: settings.tolerance,
+            relative_tolerance: settings.relative_tolerance,
+            n_iter_no_change: settings.n_iter_no_change,
+            validation_loss: settings.validation_loss,
+            dropout: settings.dropout,
+            subsample: settings.subsample,
+            colsample: settings.colsample,
+            seed: settings.seed,
+            n_outputs: settings.n_outputs,
+            multi_output: settings.multi_output,
+            profile: false,
+            fit_profile: None,
+            track_memory: false,
+            peak_fit_memory: None,
+        };
+        Py::new(py, booster)?.into_py(py)
+    };
+    Ok((model, metadata))
+}
+
+/// Load a model saved with `save`, returning the model and its metadata bytes.
+/// With `mmap`, the weights are read in place from the memory-mapped file (shared
+/// between processes loading the same file), which must not be modified while the
+/// model is in use.
+#[pyfunction]
+#[pyo3(signature = (path, mmap=true))]
+pub fn load_model(py: Python, path: &str, mmap: bool) -> PyResult<(PyObject, PyObject)> {
+    // The stored weights are little-endian
+    if mmap && cfg!(target_endian = "little") {
+        let file = std::fs::File::open(path)?;
+        let map = Arc::new(unsafe { Mmap::map(&file)? });
+        read_model(py, &map[..], Some(&map))
+    } else {
+        read_model(py, &std::fs::read(path)?, None)
+    }
+}
+
+/// Model and metadata from the output of `to_bytes` (the weights are copied)
+#[pyfunction]
+pub fn model_from_bytes(py: Python, data: &[u8]) -> PyResult<(PyObject, PyObject)> {
+    read_model(py, data, None)
+}
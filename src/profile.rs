@@ -0,0 +1,84 @@
+// Per-stage fit profile: where the time of each stage goes, and the training loss
+// after it. Timers are only read when profiling is enabled, so that disabled
+// profiles cost a branch per phase.
+
+use numpy::IntoPyArray;
+use pyo3::prelude::*;
+use std::time::Instant;
+
+#[derive(Clone, Copy)]
+pub enum Phase {
+    // Columns, weights and rows of the stage drawn from the RNG
+    Sampling,
+    // Hidden features (and direct link) of the stage's inputs
+    Forward,
+    // Copy of the base estimator template (sklearn.base.clone)
+    Clone,
+    // Inputs, targets and sample weights converted for the base learner
+    Copy,
+    Fit,
+    Predict,
+    // Residuals (or AdaBoost sample weights) updated from the predictions
+    Update,
+    // Held-out predictions and loss for early stopping
+    Validation,
+}
+
+const N_PHASES: usize = 8;
+const PHASE_NAMES: [&str; N_PHASES] =
+    ["sampling", "forward", "clone", "copy", "fit", "predict", "update", "validation"];
+
+// Nanoseconds spent in each phase of one stage
+pub struct StageTimer {
+    enabled: bool,
+    nanos: [u64; N_PHASES],
+}
+
+impl StageTimer {
+    pub fn new(enabled: bool) -> Self {
+        StageTimer { enabled, nanos: [0; N_PHASES] }
+    }
+
+    // Start of a phase (None when disabled)
+    #[inline]
+    pub fn start(&self) -> Option<Instant> {
+        self.enabled.then(Instant::now)
+    }
+
+    // Add the time since `start` to `phase`
+    #[inline]
+    pub fn stop(&mut self, phase: Phase, start: Option<Instant>) {
+        if let Some(start) = start {
+            self.nanos[phase as usize] += start.elapsed().as_nanos() as u64;
+        }
+    }
+}
+
+// Timings and training loss of each fitted stage
+#[derive(Clone, Default)]
+pub struct FitProfile {
+    nanos: Vec<[u64; N_PHASES]>,
+    loss: Vec<f64>,
+}
+
+impl FitProfile {
+    pub fn push(&mut self, timer: &StageTimer, loss: f64) {
+        self.nanos.push(timer.nanos);
+        self.loss.push(loss);
+    }
+
+    // NumPy record array with one record per stage: an int64 field per phase
+    // (in nanoseconds) and a float64 "loss" field
+    pub fn to_numpy(&self, py: Python) -> PyResult<PyObject> {
+        let mut fields: Vec<PyObject> = (0..N_PHASES)
+            .map(|k| self.nanos.iter().map(|stage| stage[k] as i64).collect::<Vec<_>>().into_pyarray(py).into())
+            .collect();
+        fields.push(self.loss.clone().into_pyarray(py).into());
+        let mut names = PHASE_NAMES.to_vec();
+        names.push("loss");
+        let kwargs = pyo3::types::PyDict::new(py);
+        kwargs.set_item("names", names)?;
+        let fromarrays = py.import("numpy")?.getattr("rec")?.getattr("fromarrays")?;
+        Ok(fromarrays.call((fields,), Some(kwargs))?.into())
+    }
+}
@@ -0,0 +1,222 @@
+// Random projections of the hidden layer, and the kernels computing x . w for
+// their structured kinds. The weights of every stage are stored as a dense
+// (n_features, n_hidden_features) matrix whatever the distribution (so that
+// persistence, export and the Python side see plain arrays); the structure of
+// sparse and Hadamard weights is read back from it into the kernel of each
+// stage, which models build once and keep (sign and int8 weights are only
+// packed in memory and in saved models, see weights.rs).
+
+use crate::real::Real;
+use crate::Matrix;
+use ndarray::{Array2, ArrayView2, ArrayViewMut2};
+use rand::seq::index::sample;
+use rand::Rng;
+
+#[derive(Clone, Copy, PartialEq)]
+pub enum WeightsDistribution {
+    Uniform,
+    Normal,
+    // sqrt(3) * {+1, 0, -1} with probabilities {1/6, 2/3, 1/6} (Achlioptas, 2003)
+    Achlioptas,
+    // sqrt(s) * {+1, 0, -1} with probabilities {1/2s, 1 - 1/s, 1/2s}, s = sqrt(n_features)
+    // (Li, Hastie and Church, 2006)
+    VerySparse,
+    // Subsampled randomized Hadamard transform: the hidden features are selected
+    // entries of H D x, with D random signs and H the Walsh-Hadamard matrix
+    Srht,
+    // {+1, -1} with equal probabilities, stored as one bit each
+    Sign,
+    // k / INT8_SCALE for k uniform in [-127, 127], stored in one byte
+    Int8,
+}
+
+// Scale of the integer weights of `WeightsDistribution::Int8`
+pub const INT8_SCALE: f64 = 127.0;
+
+impl WeightsDistribution {
+    pub fn from_name(name: &str) -> Self {
+        match name {
+            "normal" => WeightsDistribution::Normal,
+            "achlioptas" => WeightsDistribution::Achlioptas,
+            "very_sparse" => WeightsDistribution::VerySparse,
+            "srht" => WeightsDistribution::Srht,
+            "sign" => WeightsDistribution::Sign,
+            "int8" => WeightsDistribution::Int8,
+            _ => WeightsDistribution::Uniform,
+        }
+    }
+
+    // Whether the weights of stages seeing `n_features` columns are applied with a
+    // structured kernel rather than a dense product: decided from the shape (and the
+    // expected density of sparse weights), so once for all the stages of a model
+    pub fn uses_kernel(self, n_features: usize, n_hidden_features: usize) -> bool {
+        match self {
+            // Dense products are faster per operation: sparse weights must be at most
+            // half nonzero
+            WeightsDistribution::Achlioptas => true,
+            WeightsDistribution::VerySparse => n_features >= 4,
+            WeightsDistribution::Srht if n_features > 0 && n_hidden_features > 0 => {
+                let n_padded = n_features.next_power_of_two();
+                let log2 = n_padded.trailing_zeros() as usize;
+                n_padded * log2.max(1) < n_features * n_hidden_features
+            }
+            // Sign weights are dense: a matrix product with them is faster than
+            // adding and subtracting features
+            _ => false,
+        }
+    }
+
+    // Whether the weights are stored packed rather than as f64
+    pub fn is_packed(self) -> bool {
+        matches!(self, WeightsDistribution::Sign | WeightsDistribution::Int8)
+    }
+}
+
+// Random weights of one stage's hidden layer, drawn row by row from `rng`
+pub fn random_weights<R: Rng>(
+    rng: &mut R,
+    weights_distribution: WeightsDistribution,
+    n_features: usize,
+    n_hidden_features: usize,
+) -> Array2<f64> {
+    let shape = (n_features, n_hidden_features);
+    match weights_distribution {
+        // U(0,1)
+        WeightsDistribution::Uniform | WeightsDistribution::Normal => Array2::from_shape_fn(shape, |_| rng.gen::<f64>()),
+        WeightsDistribution::Achlioptas => {
+            let value = 3f64.sqrt();
+            Array2::from_shape_fn(shape, |_| sparse_sign(rng.gen::<f64>(), 1.0 / 6.0, value))
+        }
+        WeightsDistribution::VerySparse => {
+            let s = (n_features as f64).sqrt().max(1.0);
+            Array2::from_shape_fn(shape, |_| sparse_sign(rng.gen::<f64>(), 0.5 / s, s.sqrt()))
+        }
+        WeightsDistribution::Srht => {
+            // w[j, c] = d[j] * H[j, selected[c]], with distinct Hadamard columns
+            // while there are enough of them
+            let n_padded = n_features.next_power_of_two();
+            let signs: Vec<f64> = (0..n_features).map(|_| if rng.gen::<bool>() { 1.0 } else { -1.0 }).collect();
+            let selected: Vec<usize> = if n_hidden_features <= n_padded {
+                sample(rng, n_padded, n_hidden_features).into_vec()
+            } else {
+                (0..n_hidden_features).map(|_| rng.gen_range(0..n_padded)).collect()
+            };
+            Array2::from_shape_fn(shape, |(j, c)| signs[j] * hadamard_sign(j, selected[c]))
+        }
+        WeightsDistribution::Sign => Array2::from_shape_fn(shape, |_| if rng.gen::<bool>() { 1.0 } else { -1.0 }),
+        WeightsDistribution::Int8 => Array2::from_shape_fn(shape, |_| rng.gen_range(-127..=127) as f64 / INT8_SCALE),
+    }
+}
+
+// +value with probability p, -value with probability p, and 0 otherwise, from u ~ U(0,1)
+fn sparse_sign(u: f64, p: f64, value: f64) -> f64 {
+    if u < p {
+        value
+    } else if u < 2.0 * p {
+        -value
+    } else {
+        0.0
+    }
+}
+
+// Entry (j, k) of the (unnormalized) Walsh-Hadamard matrix
+fn hadamard_sign(j: usize, k: usize) -> f64 {
+    if (j & k).count_ones() % 2 == 0 {
+        1.0
+    } else {
+        -1.0
+    }
+}
+
+// In-place (unnormalized) fast Walsh-Hadamard transform, for a power of two length
+fn fwht<F: Real>(values: &mut [F]) {
+    let mut half = 1;
+    while half < values.len() {
+        for block in values.chunks_mut(2 * half) {
+            let (left, right) = block.split_at_mut(half);
+            for (a, b) in left.iter_mut().zip(right.iter_mut()) {
+                let (sum, diff) = (*a + *b, *a - *b);
+                *a = sum;
+                *b = diff;
+            }
+        }
+        half *= 2;
+    }
+}
+
+// Kernel computing x . w for one stage's weights, built once from them (see
+// `uses_kernel`) and applied to the weights in the precision of the inputs
+pub(crate) enum Projection {
+    // Product with the weights themselves
+    Dense,
+    // Nonzero (column, value) pairs of each row of w
+    Sparse(Vec<Vec<(usize, f64)>>),
+    // w[j, c] = signs[j] * H[j, selected[c]]: column c of x . w is entry selected[c]
+    // of the Walsh-Hadamard transform of x * signs (zero-padded to `n_padded`)
+    Hadamard { signs: Vec<f64>, selected: Vec<usize>, n_padded: usize },
+}
+
+impl Projection {
+    pub(crate) fn new(w: ArrayView2<f64>, weights_distribution: WeightsDistribution) -> Self {
+        let (n_features, n_hidden_features) = w.dim();
+        if !weights_distribution.uses_kernel(n_features, n_hidden_features) {
+            return Projection::Dense;
+        }
+        match weights_distribution {
+            WeightsDistribution::Achlioptas | WeightsDistribution::VerySparse => Projection::Sparse(
+                w.outer_iter()
+                    .map(|row| {
+                        let nonzero = row.iter().enumerate().filter(|&(_, &v)| v != 0.0);
+                        nonzero.map(|(c, &v)| (c, v)).collect()
+                    })
+                    .collect(),
+            ),
+            WeightsDistribution::Srht => {
+                let n_padded = n_features.next_power_of_two();
+                let log2 = n_padded.trailing_zeros() as usize;
+                // Row 0 of H is all ones, so column 0 of w holds signs * H[:, selected[0]],
+                // which replaces the signs (H[j, a] * H[j, b] = H[j, a ^ b]); the bits of
+                // the other selected columns, relative to it, are read on rows 2^b
+                let signs = w.column(0).to_vec();
+                let selected = (0..n_hidden_features)
+                    .map(|c| {
+                        (0..log2)
+                            .filter(|&b| w[[1 << b, c]] != w[[1 << b, 0]])
+                            .fold(0, |k, b| k | (1 << b))
+                    })
+                    .collect();
+                Projection::Hadamard { signs, selected, n_padded }
+            }
+            _ => Projection::Dense,
+        }
+    }
+
+    // `out = x . w`, for the weights `w` the kernel was built from
+    pub(crate) fn apply<F: Real>(&self, x: &Matrix<F>, w: ArrayView2<F>, mut out: ArrayViewMut2<F>) {
+        match self {
+            Projection::Dense => x.dot_into(w, out),
+            Projection::Sparse(rows) => {
+                out.fill(F::zero());
+                for (i, mut out_row) in out.outer_iter_mut().enumerate() {
+                    x.for_each_in_row(i, |j, x_value| {
+                        for &(c, w_value) in &rows[j] {
+                            out_row[c] = out_row[c] + x_value * F::from_f64(w_value);
+                        }
+                    });
+                }
+            }
+            Projection::Hadamard { signs, selected, n_padded } => {
+                let signs: Vec<F> = signs.iter().map(|&v| F::from_f64(v)).collect();
+                let mut buffer = vec![F::zero(); *n_padded];
+                for (i, mut out_row) in out.outer_iter_mut().enumerate() {
+                    buffer.iter_mut().for_each(|v| *v = F::zero());
+                    x.for_each_in_row(i, |j, x_value| buffer[j] = x_value * signs[j]);
+                    fwht(&mut buffer);
+                    for (value, &k) in out_row.iter_mut().zip(selected) {
+                        *value = buffer[k];
+                    }
+                }
+            }
+        }
+    }
+}
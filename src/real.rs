@@ -0,0 +1,53 @@
+use ndarray::{Array2, ArrayView2, CowArray, Ix2, LinalgScalar};
+use numpy::Element;
+use std::fmt::Debug;
+
+/// Precision of the input features and hidden features (f32 halves their memory).
+/// Weights are stored, and targets, residuals and predictions accumulated, in f64.
+pub trait Real: LinalgScalar + Element + PartialOrd + Debug + Send + Sync {
+    fn from_f64(value: f64) -> Self;
+
+    fn to_f64(self) -> f64;
+
+    /// Weights in this precision (borrowed for f64)
+    fn weights(w: ArrayView2<f64>) -> CowArray<Self, Ix2>;
+
+    /// Features in f64 (moved for f64), for learners that only work in f64
+    fn into_f64(x: CowArray<Self, Ix2>) -> Array2<f64>;
+}
+
+impl Real for f64 {
+    fn from_f64(value: f64) -> Self {
+        value
+    }
+
+    fn to_f64(self) -> f64 {
+        self
+    }
+
+    fn weights(w: ArrayView2<f64>) -> CowArray<f64, Ix2> {
+        CowArray::from(w)
+    }
+
+    fn into_f64(x: CowArray<f64, Ix2>) -> Array2<f64> {
+        x.into_owned()
+    }
+}
+
+impl Real for f32 {
+    fn from_f64(value: f64) -> Self {
+        value as f32
+    }
+
+    fn to_f64(self) -> f64 {
+        self as f64
+    }
+
+    fn weights(w: ArrayView2<f64>) -> CowArray<f32, Ix2> {
+        CowArray::from(w.mapv(|v| v as f32))
+    }
+
+    fn into_f64(x: CowArray<f32, Ix2>) -> Array2<f64> {
+        x.mapv(|v| v as f64)
+    }
+}
@@ -3,4 +3,10 @@ use rand::SeedableRng;
 
 pub fn create_rng(seed: u64) -> ChaCha20Rng {
     ChaCha20Rng::seed_from_u64(seed)
-} 
\ No newline at end of file
+}
+
+pub fn create_stream_rng(seed: u64, stream: u64) -> ChaCha20Rng {
+    let mut rng = ChaCha20Rng::seed_from_u64(seed);
+    rng.set_stream(stream);
+    rng
+}
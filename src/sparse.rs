@@ -0,0 +1,245 @@
+use crate::extratree::Features;
+use crate::real::Real;
+use ndarray::{Array1, Array2, ArrayView2, ArrayViewMut2};
+use numpy::{IntoPyArray, PyArray1};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use std::borrow::Cow;
+
+/// Compressed sparse row matrix, in the layout of `scipy.sparse.csr_matrix`, with
+/// the column indices of each row sorted. Values read from scipy are borrowed;
+/// the indices are converted to `usize`.
+#[derive(Clone)]
+pub struct Csr<'a, F> {
+    pub data: Cow<'a, [F]>,
+    pub indices: Cow<'a, [usize]>,
+    pub indptr: Cow<'a, [usize]>,
+    pub n_cols: usize,
+}
+
+// Index array of a scipy matrix (int32 or int64) as usize
+fn index_vec(array: &PyAny) -> PyResult<Vec<usize>> {
+    let to_usize = |values: Vec<i64>| -> PyResult<Vec<usize>> {
+        values
+            .into_iter()
+            .map(|v| usize::try_from(v).map_err(|_| PyValueError::new_err("Negative index in sparse matrix")))
+            .collect()
+    };
+    match array.extract::<&PyArray1<i32>>() {
+        Ok(values) => to_usize(values.readonly().as_array().iter().map(|&v| v as i64).collect()),
+        Err(_) => to_usize(array.extract::<&PyArray1<i64>>()?.readonly().as_array().to_vec()),
+    }
+}
+
+/// Whether `x` is a scipy sparse matrix (or array)
+pub fn is_sparse(x: &PyAny) -> bool {
+    x.hasattr("indptr").unwrap_or(false) && x.hasattr("indices").unwrap_or(false)
+}
+
+impl<'py, F: Real> Csr<'py, F> {
+    /// View of a scipy CSR matrix whose values have type F (its values must not be
+    /// modified while the view is alive)
+    pub unsafe fn from_scipy(x: &'py PyAny) -> PyResult<Self> {
+        if x.getattr("format")?.extract::<&str>()? != "csr" {
+            return Err(PyValueError::new_err("Sparse inputs must be CSR matrices"));
+        }
+        let data = x.getattr("data")?.extract::<&PyArray1<F>>()?.as_slice()?;
+        let (n_rows, n_cols): (usize, usize) = x.getattr("shape")?.extract()?;
+        let csr = Csr {
+            data: Cow::Borrowed(data),
+            indices: Cow::Owned(index_vec(x.getattr("indices")?)?),
+            indptr: Cow::Owned(index_vec(x.getattr("indptr")?)?),
+            n_cols,
+        };
+        csr.check(n_rows)?;
+        Ok(csr)
+    }
+}
+
+impl<'a, F: Real> Csr<'a, F> {
+    // Row pointers that delimit the values, and sorted column indices within range
+    fn check(&self, n_rows: usize) -> PyResult<()> {
+        let nnz = self.data.len();
+        let pointers_valid = self.indptr.len() == n_rows + 1
+            && self.indptr.first() == Some(&0)
+            && self.indptr.last() == Some(&nnz)
+            && self.indptr.windows(2).all(|w| w[0] <= w[1])
+            && self.indices.len() == nnz;
+        if !pointers_valid {
+            return Err(PyValueError::new_err("Invalid CSR matrix"));
+        }
+        for i in 0..n_rows {
+            let columns = self.row(i).0;
+            if columns.windows(2).any(|w| w[0] >= w[1]) || columns.last().map_or(false, |&c| c >= self.n_cols) {
+                return Err(PyValueError::new_err(
+                    "CSR column indices must be sorted and within range (see sort_indices)",
+                ));
+            }
+        }
+        Ok(())
+    }
+
+    pub fn nrows(&self) -> usize {
+        self.indptr.len() - 1
+    }
+
+    /// Column indices and values of row `i`
+    pub fn row(&self, i: usize) -> (&[usize], &[F]) {
+        let (start, end) = (self.indptr[i], self.indptr[i + 1]);
+        (&self.indices[start..end], &self.data[start..end])
+    }
+
+    pub fn view(&self) -> Csr<'_, F> {
+        Csr {
+            data: Cow::Borrowed(&self.data),
+            indices: Cow::Borrowed(&self.indices),
+            indptr: Cow::Borrowed(&self.indptr),
+            n_cols: self.n_cols,
+        }
+    }
+
+    pub fn into_owned(self) -> Csr<'static, F> {
+        Csr {
+            data: Cow::Owned(self.data.into_owned()),
+            indices: Cow::Owned(self.indices.into_owned()),
+            indptr: Cow::Owned(self.indptr.into_owned()),
+            n_cols: self.n_cols,
+        }
+    }
+
+    // Matrix built row by row from `(columns, values)` iterators
+    fn from_rows<I>(n_cols: usize, rows: impl Iterator<Item = I>) -> Csr<'static, F>
+    where
+        I: Iterator<Item = (usize, F)>,
+    {
+        let (mut data, mut indices, mut indptr) = (Vec::new(), Vec::new(), vec![0]);
+        for row in rows {
+            for (column, value) in row {
+                indices.push(column);
+                data.push(value);
+            }
+            indptr.push(data.len());
+        }
+        Csr {
+            data: Cow::Owned(data),
+            indices: Cow::Owned(indices),
+            indptr: Cow::Owned(indptr),
+            n_cols,
+        }
+    }
+
+    /// `out = self . w`, in O(nnz * w.ncols())
+    pub fn dot_into(&self, w: ArrayView2<F>, mut out: ArrayViewMut2<F>) {
+        out.fill(F::zero());
+        for (i, mut out_row) in out.outer_iter_mut().enumerate() {
+            let (columns, values) = self.row(i);
+            for (&j, &v) in columns.iter().zip(values) {
+                out_row.scaled_add(v, &w.row(j));
+            }
+        }
+    }
+
+    pub fn dot(&self, w: ArrayView2<F>) -> Array2<F> {
+        let mut out = Array2::zeros((self.nrows(), w.ncols()));
+        self.dot_into(w, out.view_mut());
+        out
+    }
+
+    /// `self . coefficients` in f64
+    pub fn dot_vector(&self, coefficients: &Array1<f64>) -> Array1<f64> {
+        Array1::from_shape_fn(self.nrows(), |i| {
+            let (columns, values) = self.row(i);
+            columns.iter().zip(values).map(|(&j, &v)| v.to_f64() * coefficients[j]).sum()
+        })
+    }
+
+    /// Matrix of the given (sorted) columns
+    pub fn select_columns(&self, columns: &[usize]) -> Csr<'static, F> {
+        let mut position = vec![usize::MAX; self.n_cols];
+        for (k, &j) in columns.iter().enumerate() {
+            position[j] = k;
+        }
+        let position = &position;
+        Csr::from_rows(
+            columns.len(),
+            (0..self.nrows()).map(|i| {
+                let (row_columns, values) = self.row(i);
+                row_columns
+                    .iter()
+                    .zip(values)
+                    .filter(move |&(&j, _)| position[j] != usize::MAX)
+                    .map(move |(&j, &v)| (position[j], v))
+            }),
+        )
+    }
+
+    pub fn select_rows(&self, rows: &[usize]) -> Csr<'static, F> {
+        Csr::from_rows(
+            self.n_cols,
+            rows.iter().map(|&i| {
+                let (columns, values) = self.row(i);
+                columns.iter().copied().zip(values.iter().copied())
+            }),
+        )
+    }
+
+    /// `[self, dense]`, keeping only the nonzero values of `dense`
+    pub fn hstack(&self, dense: ArrayView2<F>) -> Csr<'static, F> {
+        let n_cols = self.n_cols;
+        Csr::from_rows(
+            n_cols + dense.ncols(),
+            (0..self.nrows()).map(|i| {
+                let (columns, values) = self.row(i);
+                let dense_row = dense.row(i);
+                let dense_values = dense_row
+                    .into_iter()
+                    .enumerate()
+                    .filter(|&(_, &v)| v != F::zero())
+                    .map(move |(j, &v)| (n_cols + j, v));
+                columns.iter().copied().zip(values.iter().copied()).chain(dense_values)
+            }),
+        )
+    }
+
+    pub fn to_dense(&self) -> Array2<F> {
+        let mut dense = Array2::zeros((self.nrows(), self.n_cols));
+        for (i, mut dense_row) in dense.outer_iter_mut().enumerate() {
+            let (columns, values) = self.row(i);
+            for (&j, &v) in columns.iter().zip(values) {
+                dense_row[j] = v;
+            }
+        }
+        dense
+    }
+
+    /// Copy as a `scipy.sparse.csr_matrix`
+    pub fn to_scipy(&self, py: Python) -> PyResult<PyObject> {
+        let to_i64 = |values: &[usize]| values.iter().map(|&v| v as i64).collect::<Vec<_>>().into_pyarray(py);
+        let data = self.data.to_vec().into_pyarray(py);
+        let parts = (data, to_i64(&self.indices), to_i64(&self.indptr));
+        let csr_matrix = py.import("scipy.sparse")?.getattr("csr_matrix")?;
+        let kwargs = pyo3::types::PyDict::new(py);
+        kwargs.set_item("shape", (self.nrows(), self.n_cols))?;
+        Ok(csr_matrix.call((parts,), Some(kwargs))?.into())
+    }
+}
+
+impl<'a, F: Real> Features for Csr<'a, F> {
+    fn n_rows(&self) -> usize {
+        self.nrows()
+    }
+
+    fn n_cols(&self) -> usize {
+        self.n_cols
+    }
+
+    // Binary search in the sorted columns of the row
+    #[inline]
+    fn get(&self, row: usize, col: usize) -> f64 {
+        let (columns, values) = self.row(row);
+        match columns.binary_search(&col) {
+            Ok(k) => values[k].to_f64(),
+            Err(_) => 0.0,
+        }
+    }
+}
@@ -0,0 +1,257 @@
+use crate::projection::INT8_SCALE;
+use crate::{random_weights, WeightsDistribution};
+use memmap2::Mmap;
+use ndarray::{s, Array2, ArrayView2, CowArray, Ix2};
+use pyo3::exceptions::PyValueError;
+use pyo3::PyResult;
+use rand::SeedableRng;
+use rand_chacha::ChaCha8Rng;
+use std::collections::VecDeque;
+use std::sync::{Arc, Mutex};
+
+/// Hidden layer weights of all stages side by side, `(n_features, n_stages * n_hidden_features)`.
+pub enum WeightStore {
+    Owned(Array2<f64>),
+    /// Row-major block of a memory-mapped model file: processes loading the same
+    /// file share one copy in the page cache
+    Mapped {
+        map: Arc<Mmap>,
+        offset: usize,
+        shape: (usize, usize),
+    },
+    /// One seed per stage, from which its weights are regenerated when needed
+    /// (compact models, whose size is then mostly the base learners)
+    Seeded(SeededWeights),
+    /// Sign or int8 weights packed in bits or bytes
+    Packed(PackedWeights),
+}
+
+/// Weights of a stage regenerated from its seed, with a counter-based generator
+/// (ChaCha with 8 rounds, faster than the ChaCha20 stream the seeds come from)
+pub fn seeded_weights(
+    seed: u64,
+    weights_distribution: WeightsDistribution,
+    n_features: usize,
+    n_hidden_features: usize,
+) -> Array2<f64> {
+    random_weights(&mut ChaCha8Rng::seed_from_u64(seed), weights_distribution, n_features, n_hidden_features)
+}
+
+pub struct SeededWeights {
+    pub seeds: Vec<u64>,
+    pub weights_distribution: WeightsDistribution,
+    pub n_features: usize,
+    pub n_hidden_features: usize,
+    /// Capacity of the cache of regenerated stages (0 disables it)
+    pub cache_size: usize,
+    // Most recently used stages first
+    cache: Mutex<VecDeque<(usize, Array2<f64>)>>,
+}
+
+impl SeededWeights {
+    pub fn new(
+        seeds: Vec<u64>,
+        weights_distribution: WeightsDistribution,
+        n_features: usize,
+        n_hidden_features: usize,
+        cache_size: usize,
+    ) -> Self {
+        SeededWeights {
+            seeds,
+            weights_distribution,
+            n_features,
+            n_hidden_features,
+            cache_size,
+            cache: Mutex::new(VecDeque::new()),
+        }
+    }
+
+    /// Weights of stage `i`, from the cache or regenerated (and then cached, evicting
+    /// the least recently used stage when the cache is full)
+    pub fn stage(&self, i: usize) -> Array2<f64> {
+        if self.cache_size == 0 {
+            return self.regenerate(i);
+        }
+        let mut cache = self.cache.lock().unwrap_or_else(|e| e.into_inner());
+        if let Some(position) = cache.iter().position(|(stage, _)| *stage == i) {
+            let entry = cache.remove(position).unwrap();
+            cache.push_front(entry);
+            return cache[0].1.clone();
+        }
+        let weights = self.regenerate(i);
+        cache.truncate(self.cache_size - 1);
+        cache.push_front((i, weights.clone()));
+        weights
+    }
+
+    fn regenerate(&self, i: usize) -> Array2<f64> {
+        seeded_weights(self.seeds[i], self.weights_distribution, self.n_features, self.n_hidden_features)
+    }
+
+    /// Same stages followed by the stages of `seeds` (with an empty cache)
+    pub fn extend(&self, seeds: &[u64]) -> Self {
+        let all_seeds = self.seeds.iter().chain(seeds).copied().collect();
+        SeededWeights::new(
+            all_seeds,
+            self.weights_distribution,
+            self.n_features,
+            self.n_hidden_features,
+            self.cache_size,
+        )
+    }
+}
+
+/// Weights of `weights_distribution` "sign" (+1 or -1, one bit each, set for +1)
+/// or "int8" (k / INT8_SCALE for an integer k in [-127, 127], one byte each). The
+/// (n_features, n_hidden_features) blocks of the stages follow each other, in
+/// row-major order, each starting on a byte.
+pub struct PackedWeights {
+    pub weights_distribution: WeightsDistribution,
+    pub n_features: usize,
+    pub n_hidden_features: usize,
+    pub n_stages: usize,
+    pub data: Vec<u8>,
+}
+
+impl PackedWeights {
+    pub fn new(weights_distribution: WeightsDistribution, n_features: usize, n_hidden_features: usize) -> Self {
+        PackedWeights { weights_distribution, n_features, n_hidden_features, n_stages: 0, data: Vec::new() }
+    }
+
+    /// Bytes of the weights of one stage
+    pub fn block_len(&self) -> usize {
+        let n_weights = self.n_features * self.n_hidden_features;
+        match self.weights_distribution {
+            WeightsDistribution::Sign => (n_weights + 7) / 8,
+            _ => n_weights,
+        }
+    }
+
+    /// Packs the weights of one more stage
+    pub fn push(&mut self, w: ArrayView2<f64>) {
+        let mut block = vec![0u8; self.block_len()];
+        for (k, &value) in w.iter().enumerate() {
+            match self.weights_distribution {
+                WeightsDistribution::Sign => block[k / 8] |= ((value > 0.0) as u8) << (k % 8),
+                _ => block[k] = (value * INT8_SCALE).round() as i8 as u8,
+            }
+        }
+        self.data.extend(block);
+        self.n_stages += 1;
+    }
+
+    /// Same stages followed by the stages of `other`
+    pub fn append(&self, other: &PackedWeights) -> Self {
+        let data = self.data.iter().chain(&other.data).copied().collect();
+        PackedWeights { data, n_stages: self.n_stages + other.n_stages, ..*self }
+    }
+
+    /// Unpacked weights of stage `i`
+    pub fn stage(&self, i: usize) -> Array2<f64> {
+        let block = &self.data[i * self.block_len()..(i + 1) * self.block_len()];
+        let n_hidden_features = self.n_hidden_features;
+        Array2::from_shape_fn((self.n_features, n_hidden_features), |(j, c)| {
+            let k = j * n_hidden_features + c;
+            match self.weights_distribution {
+                WeightsDistribution::Sign if block[k / 8] >> (k % 8) & 1 == 1 => 1.0,
+                WeightsDistribution::Sign => -1.0,
+                _ => (block[k] as i8) as f64 / INT8_SCALE,
+            }
+        })
+    }
+}
+
+impl WeightStore {
+    pub fn empty() -> Self {
+        WeightStore::Owned(Array2::zeros((0, 0)))
+    }
+
+    /// `shape.0 * shape.1` values starting at byte `offset` of `map`, which must be
+    /// aligned for f64 (and stored in the native byte order)
+    pub fn mapped(map: Arc<Mmap>, offset: usize, shape: (usize, usize)) -> PyResult<Self> {
+        let n_bytes = shape
+            .0
+            .checked_mul(shape.1)
+            .and_then(|n| n.checked_mul(std::mem::size_of::<f64>()))
+            .and_then(|n| n.checked_add(offset));
+        if n_bytes.map_or(true, |end| end > map.len()) {
+            return Err(PyValueError::new_err("Weight block out of bounds"));
+        }
+        if (map.as_ptr() as usize + offset) % std::mem::align_of::<f64>() != 0 {
+            return Err(PyValueError::new_err("Misaligned weight block"));
+        }
+        Ok(WeightStore::Mapped { map, offset, shape })
+    }
+
+    /// View of the stored weights (None for seeded or packed weights, see `stacked`)
+    pub fn view(&self) -> Option<ArrayView2<f64>> {
+        match self {
+            WeightStore::Owned(weights) => Some(weights.view()),
+            // Bounds and alignment are checked in `mapped`
+            WeightStore::Mapped { map, offset, shape } => unsafe {
+                Some(ArrayView2::from_shape_ptr(*shape, map.as_ptr().add(*offset) as *const f64))
+            },
+            WeightStore::Seeded(_) | WeightStore::Packed(_) => None,
+        }
+    }
+
+    /// Weights of all stages side by side for a stacked product: stored or mapped
+    /// values, or packed weights unpacked (None for seeded weights, which are only
+    /// regenerated one stage at a time)
+    pub fn dense_stacked(&self) -> Option<CowArray<f64, Ix2>> {
+        match self {
+            WeightStore::Seeded(_) => None,
+            WeightStore::Packed(_) => Some(self.stacked()),
+            _ => self.view().map(CowArray::from),
+        }
+    }
+
+    /// `(n_features, n_stages * n_hidden_features)`
+    pub fn shape(&self) -> (usize, usize) {
+        match self {
+            WeightStore::Seeded(seeded) => (seeded.n_features, seeded.seeds.len() * seeded.n_hidden_features),
+            WeightStore::Packed(packed) => (packed.n_features, packed.n_stages * packed.n_hidden_features),
+            _ => self.view().unwrap().dim(),
+        }
+    }
+
+    /// Weights of all stages side by side (regenerated or unpacked)
+    pub fn stacked(&self) -> CowArray<f64, Ix2> {
+        let stages: Vec<Array2<f64>> = match self {
+            WeightStore::Seeded(seeded) => (0..seeded.seeds.len()).map(|i| seeded.regenerate(i)).collect(),
+            WeightStore::Packed(packed) => (0..packed.n_stages).map(|i| packed.stage(i)).collect(),
+            _ => return CowArray::from(self.view().unwrap()),
+        };
+        let views: Vec<_> = stages.iter().map(|w| w.view()).collect();
+        let stacked = ndarray::concatenate(ndarray::Axis(1), &views);
+        CowArray::from(stacked.unwrap_or_else(|_| Array2::zeros((self.shape().0, 0))))
+    }
+
+    /// Bytes held by the weights: stored or mapped values, packed data, or seeds
+    /// and the regenerated stages currently cached
+    pub fn nbytes(&self) -> usize {
+        let f64_size = std::mem::size_of::<f64>();
+        match self {
+            WeightStore::Seeded(seeded) => {
+                let cache = seeded.cache.lock().unwrap_or_else(|e| e.into_inner());
+                let cached: usize = cache.iter().map(|(_, w)| w.len() * f64_size).sum();
+                seeded.seeds.len() * std::mem::size_of::<u64>() + cached
+            }
+            WeightStore::Packed(packed) => packed.data.len(),
+            _ => self.view().unwrap().len() * f64_size,
+        }
+    }
+
+    /// Weights of stage `i`
+    pub fn stage(&self, i: usize, n_hidden_features: usize) -> CowArray<f64, Ix2> {
+        match self {
+            WeightStore::Seeded(seeded) => CowArray::from(seeded.stage(i)),
+            WeightStore::Packed(packed) => CowArray::from(packed.stage(i)),
+            _ => CowArray::from(
+                self.view()
+                    .unwrap()
+                    .slice_move(s![.., i * n_hidden_features..(i + 1) * n_hidden_features]),
+            ),
+        }
+    }
+}
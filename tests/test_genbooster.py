@@ -1,12 +1,61 @@
+import os
+import pickle
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import scipy.sparse as sp
 from genbooster import BoosterRegressor, BoosterClassifier
+from genbooster.adaboostregressor import AdaBoostRegressor
+from genbooster.regressionmodels import LinfaRegressor
+from genbooster.randombagregressor import RandomBagRegressor
+from genbooster.randombagclassifier import RandomBagClassifier
+from genbooster.export import export_model
+from genbooster.inference import predict as predict_bundle
+from sklearn.tree import ExtraTreeRegressor
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.linear_model import Ridge
 from sklearn.datasets import make_regression, make_classification
 
+
+def regression_data(n_samples=100, n_features=5, **kwargs):
+    """Synthetic regression data set shared by the tests"""
+    return make_regression(n_samples=n_samples, n_features=n_features, random_state=42, **kwargs)
+
+
+def classification_data(n_samples=100, n_features=5, **kwargs):
+    """Synthetic 3-class data set shared by the tests"""
+    params = dict(n_informative=4, n_redundant=1, n_classes=3, n_clusters_per_class=1)
+    params.update(kwargs)
+    return make_classification(n_samples=n_samples, n_features=n_features, random_state=42, **params)
+
+
+def sparse_data(X, threshold=1.0):
+    """CSR copy of X with its small entries set to zero"""
+    X = X.copy()
+    X[np.abs(X) < threshold] = 0.0
+    return sp.csr_matrix(X)
+
+
+class FailingRidge(Ridge):
+    """Ridge whose fits fail once `max_fits` fits (counted over all clones) are done"""
+    n_fits = 0
+    max_fits = None
+
+    def fit(self, X, y, sample_weight=None):
+        FailingRidge.n_fits += 1
+        if FailingRidge.max_fits is not None and FailingRidge.n_fits > FailingRidge.max_fits:
+            raise RuntimeError("fit failed")
+        return super().fit(X, y, sample_weight)
+
+
 class TestBoosterRegressor(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Create a simple regression dataset
-        self.X, self.y = make_regression(n_samples=100, n_features=5, random_state=42)
+        cls.X, cls.y = regression_data()
+
+    def setUp(self):
         self.model = BoosterRegressor(n_estimators=10, learning_rate=0.1, random_state=42)
 
     def test_regressor_fit(self):
@@ -22,23 +71,393 @@ class TestBoosterRegressor(unittest.TestCase):
         """Test if the regressor can make predictions"""
         self.model.fit(self.X, self.y)
         predictions = self.model.predict(self.X)
-        self.assertEqual(len(predictions), len(self.y), 
+        self.assertEqual(len(predictions), len(self.y),
                         "Predictions length should match input length")
-        self.assertTrue(isinstance(predictions, np.ndarray), 
+        self.assertTrue(isinstance(predictions, np.ndarray),
                        "Predictions should be numpy array")
 
+    def test_rust_extratree(self):
+        """Test if the native extra tree can be used as boosting base learner"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10, random_state=42)
+        predictions = model.fit(self.X, self.y).predict(self.X)
+        self.assertEqual(predictions.shape, self.y.shape)
+        self.assertLess(np.mean((predictions - self.y)**2), np.var(self.y),
+                        "Boosting should improve on the mean")
+
+    def test_unknown_base_estimator(self):
+        """Test if an unknown native learner name is rejected"""
+        model = BoosterRegressor(base_estimator="rust_unknown", n_estimators=10)
+        with self.assertRaises(ValueError):
+            model.fit(self.X, self.y)
+
+    def test_linfa_base_learner(self):
+        """Test if LinfaRegressor can be used as native base learner"""
+        model = BoosterRegressor(base_estimator=LinfaRegressor("LinearRegression"), n_estimators=10,
+                                 random_state=42)
+        predictions = model.fit(self.X, self.y).predict(self.X)
+        self.assertEqual(predictions.shape, self.y.shape)
+        self.assertLess(np.mean((predictions - self.y)**2), np.var(self.y))
+
+    def test_threads_match_sequential(self):
+        """Test if native models fitted from several threads match sequential fits"""
+        def fit_predict(_):
+            model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10, random_state=42)
+            return model.fit(self.X, self.y).predict(self.X)
+        expected = fit_predict(None)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(fit_predict, range(4)))
+        for predictions in results:
+            np.testing.assert_allclose(predictions, expected)
+
+    def test_2d_targets(self):
+        """Test if the booster fits all outputs with one base learner per stage"""
+        Y = np.column_stack([self.X[:, 0], 2 * self.X[:, 1]])
+        for base_estimator in ["rust_extratree", ExtraTreeRegressor(random_state=42)]:
+            model = BoosterRegressor(base_estimator=base_estimator, n_estimators=10,
+                                     random_state=42)
+            predictions = model.fit(self.X, Y).predict(self.X)
+            self.assertEqual(predictions.shape, Y.shape)
+            self.assertLess(np.mean((predictions - Y)**2), np.mean(np.var(Y, axis=0)))
+
+    def test_stacked_matches_per_stage(self):
+        """Test if predictions from the stacked hidden layer match the stage-by-stage ones"""
+        # More rows than a block of the stacked hidden layer
+        X_large, _ = regression_data(n_samples=20000)
+        for direct_link in [True, False]:
+            model = BoosterRegressor(base_estimator=Ridge(), n_estimators=10, tolerance=0.0,
+                                     direct_link=direct_link).fit(self.X, self.y)
+            for X in [self.X, X_large]:
+                preds = model.predict(X)
+                # Staged and anytime predictions compute the hidden features one stage at a time
+                np.testing.assert_allclose(list(model.staged_predict(X))[-1], preds, rtol=1e-10)
+                np.testing.assert_allclose(model.predict_anytime(X)[0], preds, rtol=1e-10)
+                np.testing.assert_allclose(np.concatenate([model.predict(X[:30]),
+                                                           model.predict(X[30:])]), preds)
+
+    def test_learner_keeps_targets(self):
+        """Test if learners that keep their training data are not affected by residual updates"""
+        model = BoosterRegressor(base_estimator=KNeighborsRegressor(n_neighbors=1),
+                                 n_estimators=10, learning_rate=0.1, random_state=42)
+        predictions = model.fit(self.X, self.y).predict(self.X)
+        # Each 1-NN stage reproduces its residuals exactly on the training data
+        expected = model.y_mean_ + (1 - 0.9**10) * (self.y - model.y_mean_)
+        np.testing.assert_allclose(predictions, expected, rtol=1e-8, atol=1e-8)
+
+    def test_validation_early_stopping(self):
+        """Test if boosting stops once the validation loss plateaus"""
+        X, y = regression_data(n_samples=200, noise=20.0)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=500,
+                                 learning_rate=0.3, n_iter_no_change=5, random_state=42)
+        model.fit(X, y)
+        self.assertLess(model.n_estimators_, 500)
+        self.assertEqual(len(model.validation_loss_), model.n_estimators_)
+        # Stopped after 5 stages without improving on the best loss by more than tolerance
+        losses = model.validation_loss_
+        self.assertGreaterEqual(min(losses[-5:]), min(losses[:-5]) - model.tolerance)
+
+    def test_relative_tolerance(self):
+        """Test if a relative tolerance stops on the training residuals regardless of scale"""
+        X, y = regression_data(n_samples=200, noise=20.0)
+        n_stages = [BoosterRegressor(base_estimator="rust_extratree", n_estimators=500,
+                                     tolerance=1e-2, relative_tolerance=True, random_state=42)
+                    .fit(X, scale * y).n_estimators_ for scale in [1.0, 1000.0]]
+        self.assertLess(n_stages[0], 500)
+        self.assertEqual(n_stages[0], n_stages[1])
+
+    def test_staged_predict(self):
+        """Test if staged predictions add one stage at a time up to predict"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                 tolerance=0.0).fit(self.X, self.y)
+        staged = list(model.staged_predict(self.X))
+        self.assertEqual(len(staged), model.n_estimators_)
+        np.testing.assert_allclose(staged[-1], model.predict(self.X))
+        # Each step adds the learning rate times one stage's predictions
+        self.assertFalse(np.allclose(staged[0], staged[-1]))
+
+    def test_warm_start(self):
+        """Test if adding stages with warm_start gives the model fitted in one go"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                 tolerance=0.0, warm_start=True)
+        model.fit(self.X, self.y)
+        model.set_params(n_estimators=20).fit(self.X, self.y)
+        full_model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                      tolerance=0.0).fit(self.X, self.y)
+        self.assertEqual(model.n_estimators_, 20)
+        np.testing.assert_allclose(model.predict(self.X), full_model.predict(self.X))
+
+    def test_warm_start_fewer_stages(self):
+        """Test if warm starting with fewer stages than fitted is rejected without changing the model"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                 tolerance=0.0, warm_start=True).fit(self.X, self.y)
+        preds = model.predict(self.X)
+        with self.assertRaises(ValueError):
+            model.set_params(n_estimators=5).fit(self.X, self.y)
+        self.assertEqual(model.booster_.n_estimators, 10)
+        self.assertEqual(model.n_estimators_, 10)
+        np.testing.assert_array_equal(model.predict(self.X), preds)
+        # Data other than the training data is rejected by the booster, which is left as it was
+        with self.assertRaises(ValueError):
+            model.set_params(n_estimators=20).fit(self.X[:50], self.y[:50])
+        self.assertEqual(model.booster_.n_estimators, 10)
+        np.testing.assert_array_equal(model.predict(self.X), preds)
+
+    def test_warm_start_failure(self):
+        """Test if a stage failing during a warm start leaves the model and its boosting state as they were"""
+        model = BoosterRegressor(base_estimator=FailingRidge(), n_estimators=5, tolerance=0.0,
+                                 warm_start=True, profile=True).fit(self.X, self.y)
+        preds = model.predict(self.X)
+        try:
+            # The third new stage fails
+            FailingRidge.max_fits = FailingRidge.n_fits + 2
+            with self.assertRaises(RuntimeError):
+                model.set_params(n_estimators=10).fit(self.X, self.y)
+        finally:
+            FailingRidge.max_fits = None
+        self.assertEqual(model.n_estimators_, 5)
+        self.assertEqual(model.booster_.n_estimators, 5)
+        self.assertEqual(len(model.booster_.fit_profile), 5)
+        np.testing.assert_array_equal(model.predict(self.X), preds)
+        # Warm starting again continues from the residuals and random stream of the 5 stages
+        model.fit(self.X, self.y)
+        full_model = BoosterRegressor(base_estimator=Ridge(), n_estimators=10,
+                                      tolerance=0.0).fit(self.X, self.y)
+        self.assertEqual(model.n_estimators_, 10)
+        np.testing.assert_allclose(model.predict(self.X), full_model.predict(self.X), rtol=1e-10)
+
+    def test_predict_anytime(self):
+        """Test if stage budgets give the matching staged predictions"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                 tolerance=0.0).fit(self.X, self.y)
+        staged = list(model.staged_predict(self.X))
+        predictions, n_stages = model.predict_anytime(self.X, max_stages=4)
+        self.assertEqual(n_stages, 4)
+        np.testing.assert_allclose(predictions, staged[3])
+        predictions, n_stages = model.predict_anytime(self.X)
+        self.assertEqual(n_stages, 10)
+        np.testing.assert_allclose(predictions, model.predict(self.X))
+
+    def test_predict_anytime_time_budget(self):
+        """Test if a zero budget evaluates no stage, an infinite one all of them, and invalid ones raise"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                 tolerance=0.0).fit(self.X, self.y)
+        predictions, n_stages = model.predict_anytime(self.X, time_budget=0.0)
+        self.assertEqual(n_stages, 0)
+        np.testing.assert_allclose(predictions, np.full(len(self.X), model.y_mean_))
+        for time_budget in [float("inf"), 1e300]:
+            predictions, n_stages = model.predict_anytime(self.X, time_budget=time_budget)
+            self.assertEqual(n_stages, 10)
+            np.testing.assert_allclose(predictions, model.predict(self.X))
+        for time_budget in [-1.0, float("nan")]:
+            with self.assertRaises(ValueError):
+                model.predict_anytime(self.X, time_budget=time_budget)
+
+    def test_compile(self):
+        """Test if compiled linear ensembles predict like the stage-by-stage models"""
+        for base_estimator, n_estimators in [(Ridge(), 10), (LinfaRegressor("LinearRegression"), 5)]:
+            model = BoosterRegressor(base_estimator=base_estimator, n_estimators=n_estimators)
+            expected = model.fit(self.X, self.y).predict(self.X)
+            np.testing.assert_allclose(model.compile().predict(self.X), expected, rtol=1e-8, atol=1e-8)
+            # Refitting discards the fused model
+            self.assertIsNone(model.fit(self.X, self.y).fused_)
+
+    def test_compile_nonlinear_learner(self):
+        """Test if compiling tree ensembles is rejected"""
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=5).fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            model.compile()
+
+    def test_float32(self):
+        """Test if float32 models predict like float64 ones with linear base learners"""
+        preds64 = BoosterRegressor(base_estimator=Ridge(), n_estimators=5).fit(self.X, self.y).predict(self.X)
+        model32 = BoosterRegressor(base_estimator=Ridge(), n_estimators=5, dtype=np.float32).fit(self.X, self.y)
+        preds32 = model32.predict(self.X)
+        self.assertEqual(preds32.dtype, np.float64)
+        np.testing.assert_allclose(preds32, preds64, rtol=1e-3, atol=1e-2)
+        native = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                  dtype=np.float32).fit(self.X, self.y)
+        self.assertGreater(native.score(self.X, self.y), 0.5)
+
+    def test_float32_staged_predict(self):
+        """Test if float32 staged predictions end at predict, in the model's precision"""
+        X, y = regression_data(n_samples=2000)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                 dtype=np.float32, random_state=42).fit(X, y)
+        staged = list(model.staged_predict(X))
+        eps = np.finfo(np.float32).eps
+        np.testing.assert_allclose(staged[-1], model.predict(X), rtol=eps, atol=eps * np.abs(y).max())
+
+    def test_subsample(self):
+        """Test if stages fitted on row subsamples differ from full fits and still fit"""
+        full = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                random_state=42).fit(self.X, self.y)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20, subsample=0.5,
+                                 random_state=42).fit(self.X, self.y)
+        self.assertGreater(model.score(self.X, self.y), 0.5)
+        self.assertFalse(np.allclose(model.predict(self.X), full.predict(self.X)))
+        # Same seed, same subsamples
+        again = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20, subsample=0.5,
+                                 random_state=42).fit(self.X, self.y)
+        np.testing.assert_array_equal(again.predict(self.X), model.predict(self.X))
+
+    def test_invalid_fractions(self):
+        """Test if subsample and colsample outside (0, 1] are rejected"""
+        for params in [{"subsample": 0.0}, {"subsample": 1.5}, {"colsample": 0.0}]:
+            with self.assertRaises(ValueError):
+                BoosterRegressor(n_estimators=5, **params).fit(self.X, self.y)
+
+    def test_colsample(self):
+        """Test if stages fitted on column subsets store their columns and use them everywhere"""
+        X, y = regression_data(n_features=10, n_informative=8)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20, colsample=0.5).fit(X, y)
+        self.assertGreater(model.score(X, y), 0.5)
+        self.assertEqual(model.booster_.export()["columns"].shape[1], 5)
+        self.assertEqual(model.booster_.export()["weights"].shape[0], 5)
+        # Staged, exported, compiled and reloaded predictions read the stage columns
+        model = BoosterRegressor(base_estimator=Ridge(), n_estimators=10, colsample=0.3).fit(X, y)
+        preds = model.predict(X)
+        np.testing.assert_allclose(list(model.staged_predict(X))[-1], preds, rtol=1e-10)
+        np.testing.assert_allclose(predict_bundle(export_model(model), X), preds, rtol=1e-8, atol=1e-8)
+        np.testing.assert_allclose(model.compile().predict(X), preds, rtol=1e-8, atol=1e-8)
+        model.fused_ = None
+        restored = pickle.loads(pickle.dumps(model))
+        np.testing.assert_array_equal(restored.predict(X), preds)
+
+    def test_sparse_input(self):
+        """Test if sparse inputs stay sparse and match their dense predictions"""
+        X, y = regression_data(n_features=20)
+        X_sparse = sparse_data(X)
+        for model in [BoosterRegressor(base_estimator="rust_extratree", n_estimators=10),
+                      BoosterRegressor(base_estimator=Ridge(), n_estimators=10, colsample=0.5)]:
+            model.fit(X_sparse, y)
+            self.assertFalse(model.scaler_.with_mean)
+            preds = model.predict(X_sparse)
+            np.testing.assert_allclose(model.predict(X_sparse.toarray()), preds, rtol=1e-8, atol=1e-8)
+            self.assertGreater(model.score(X_sparse, y), 0.5)
+        # Staged and exported predictions accept sparse inputs
+        model = BoosterRegressor(base_estimator=Ridge(), n_estimators=10).fit(X_sparse, y)
+        preds = model.predict(X_sparse)
+        np.testing.assert_allclose(list(model.staged_predict(X_sparse))[-1], preds, rtol=1e-10)
+        np.testing.assert_allclose(predict_bundle(export_model(model), X_sparse), preds, rtol=1e-8, atol=1e-8)
+
+    def test_compact_weights(self):
+        """Test if compact models are smaller and predict consistently"""
+        X, y = regression_data(n_features=50)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                 n_hidden_features=20).fit(X, y)
+        compact = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                   n_hidden_features=20, compact_weights=True).fit(X, y)
+        self.assertLess(len(compact.booster_.to_bytes()), len(model.booster_.to_bytes()) / 2)
+        preds = compact.predict(X)
+        self.assertGreater(compact.score(X, y), 0.5)
+        np.testing.assert_allclose(list(compact.staged_predict(X))[-1], preds, rtol=1e-10)
+        np.testing.assert_array_equal(pickle.loads(pickle.dumps(compact)).predict(X), preds)
+        cached = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20, n_hidden_features=20,
+                                  compact_weights=True, weights_cache_size=4).fit(X, y)
+        for _ in range(2):
+            np.testing.assert_array_equal(cached.predict(X), preds)
+
+    def test_structured_projections(self):
+        """Test if sparse and Hadamard kernels, or the dense product they fall back to, compute the
+        product with the stored weights"""
+        for n_features in [3, 40]:
+            X, y = regression_data(n_features=n_features)
+            for distribution in ["achlioptas", "very_sparse", "srht"]:
+                model = BoosterRegressor(base_estimator=Ridge(), n_estimators=10, n_hidden_features=32,
+                                         weights_distribution=distribution).fit(X, y)
+                preds = model.predict(X)
+                self.assertGreater(model.score(X, y), 0.5)
+                np.testing.assert_allclose(predict_bundle(export_model(model), X), preds, rtol=1e-8, atol=1e-8)
+                # Kernels are built on the first predict and reused
+                np.testing.assert_array_equal(model.predict(X), preds)
+                np.testing.assert_allclose(list(model.staged_predict(X))[-1], preds, rtol=1e-10, atol=1e-10)
+
+    def test_packed_weights(self):
+        """Test if sign and int8 weights are packed, keep their values and predict like exported ones"""
+        X, y = regression_data(n_features=50)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                 n_hidden_features=20).fit(X, y)
+        for distribution, ratio in [("sign", 16), ("int8", 4)]:
+            packed = BoosterRegressor(base_estimator="rust_extratree", n_estimators=20, n_hidden_features=20,
+                                      weights_distribution=distribution).fit(X, y)
+            self.assertLess(len(packed.booster_.to_bytes()), len(model.booster_.to_bytes()) / ratio * 2)
+            weights = packed.booster_.export()["weights"]
+            levels = weights if distribution == "sign" else weights * 127
+            np.testing.assert_array_equal(np.abs(levels) <= 127, True)
+            np.testing.assert_allclose(levels, np.round(levels), atol=1e-12)
+            if distribution == "sign":
+                np.testing.assert_array_equal(np.abs(weights), 1.0)
+            linear = BoosterRegressor(base_estimator=Ridge(), n_estimators=10,
+                                      weights_distribution=distribution).fit(X, y)
+            preds = linear.predict(X)
+            np.testing.assert_allclose(predict_bundle(export_model(linear), X), preds, rtol=1e-8, atol=1e-8)
+            np.testing.assert_array_equal(pickle.loads(pickle.dumps(linear)).predict(X), preds)
+            # predict unpacks all stages for one product, staged predictions one stage at a time
+            np.testing.assert_allclose(list(linear.staged_predict(X))[-1], preds, rtol=1e-10, atol=1e-10)
+
+    def test_packed_warm_start(self):
+        """Test if stages packed during a warm start extend the packed weights of the fitted ones"""
+        X, y = regression_data(n_features=20)
+        for distribution in ["sign", "int8"]:
+            for compact_weights in [False, True]:
+                params = {"base_estimator": Ridge(), "tolerance": 0.0, "weights_distribution": distribution,
+                          "compact_weights": compact_weights}
+                model = BoosterRegressor(n_estimators=5, warm_start=True, **params).fit(X, y)
+                model.set_params(n_estimators=10).fit(X, y)
+                full_model = BoosterRegressor(n_estimators=10, **params).fit(X, y)
+                np.testing.assert_array_equal(model.booster_.export()["weights"],
+                                              full_model.booster_.export()["weights"])
+                np.testing.assert_allclose(model.predict(X), full_model.predict(X))
+
+    def test_fit_profile(self):
+        """Test if the fit profile has one record per stage, with the training loss"""
+        X, y = regression_data(n_features=10)
+        for base_estimator in [Ridge(), "rust_extratree"]:
+            model = BoosterRegressor(base_estimator=base_estimator, n_estimators=10, tolerance=0.0,
+                                     profile=True).fit(X, y)
+            profile = model.fit_profile_
+            self.assertEqual(len(profile), model.n_estimators_)
+            self.assertTrue(np.all(profile["fit"] > 0))
+            self.assertTrue(np.all(profile["forward"] > 0))
+            self.assertTrue(np.all(np.diff(profile["loss"]) <= 1e-8))
+            # The last loss is the training error of the model
+            np.testing.assert_allclose(profile["loss"][-1], np.mean((model.predict(X) - y)**2), rtol=1e-6)
+            if base_estimator == "rust_extratree":
+                np.testing.assert_array_equal(profile["clone"], 0)
+        unprofiled = BoosterRegressor(base_estimator=Ridge(), n_estimators=10).fit(X, y)
+        self.assertIsNone(unprofiled.fit_profile_)
+
+    def test_memory_usage(self):
+        """Test if the byte breakdown matches the size of the fitted stages"""
+        X, y = regression_data(n_samples=200, n_features=10)
+        for kwargs, weights_bytes in [({}, 10 * 5 * 8), ({"compact_weights": True}, 8),
+                                      ({"weights_distribution": "sign"}, 7)]:
+            model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10, tolerance=0.0,
+                                     **kwargs).fit(X, y)
+            usage = model.memory_usage()
+            self.assertEqual(usage["weights"], 10 * weights_bytes)
+            self.assertEqual(usage["alphas"], 0)
+            self.assertEqual(usage["scaler"], 3 * 10 * 8)
+            self.assertEqual(len(usage["learners"]), 10)
+            self.assertTrue(np.all(usage["learners"] > 0))
+            self.assertEqual(usage["total"], usage["weights"] + usage["columns"] + usage["scaler"]
+                             + usage["learners"].sum())
+
+    def test_peak_fit_memory(self):
+        """Test if the peak fit memory covers the hidden features"""
+        X, y = regression_data(n_samples=200, n_features=10)
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=5, n_hidden_features=50,
+                                 track_memory=True).fit(X, y)
+        self.assertGreater(model.peak_fit_memory_, 200 * 50 * 8)
+        untracked = BoosterRegressor(base_estimator="rust_extratree", n_estimators=5).fit(X, y)
+        self.assertIsNone(untracked.peak_fit_memory_)
+
 class TestBoosterClassifier(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Create a simple classification dataset with compatible parameters
-        self.X, self.y = make_classification(
-            n_samples=100,
-            n_features=5,
-            n_informative=4,  # Increased informative features
-            n_redundant=1,
-            n_classes=3,
-            n_clusters_per_class=1,  # Reduced clusters per class
-            random_state=42
-        )
+        cls.X, cls.y = classification_data()
+
+    def setUp(self):
         self.model = BoosterClassifier(n_estimators=10, learning_rate=0.1, random_state=42)
 
     def test_classifier_fit(self):
@@ -54,19 +473,373 @@ class TestBoosterClassifier(unittest.TestCase):
         """Test if the classifier can make predictions"""
         self.model.fit(self.X, self.y)
         predictions = self.model.predict(self.X)
-        self.assertEqual(len(predictions), len(self.y), 
+        self.assertEqual(len(predictions), len(self.y),
                         "Predictions length should match input length")
-        self.assertTrue(isinstance(predictions, np.ndarray), 
+        self.assertTrue(isinstance(predictions, np.ndarray),
                        "Predictions should be numpy array")
 
+    def test_classifier_n_jobs(self):
+        """Test if fitting the class boosters in parallel gives the same model"""
+        parallel_model = BoosterClassifier(n_estimators=10, learning_rate=0.1,
+                                           random_state=42, n_jobs=2)
+        np.testing.assert_allclose(parallel_model.fit(self.X, self.y).predict_proba(self.X),
+                                   self.model.fit(self.X, self.y).predict_proba(self.X))
+
+    def test_classifier_n_jobs_global_seed(self):
+        """Test if parallel fits without random_state only depend on the global seed"""
+        probas = []
+        for n_jobs in [1, 2]:
+            np.random.seed(0)
+            model = BoosterClassifier(n_estimators=10, learning_rate=0.1,
+                                      random_state=None, n_jobs=n_jobs)
+            probas.append(model.fit(self.X, self.y).predict_proba(self.X))
+        np.testing.assert_allclose(probas[1], probas[0])
+
     def test_classifier_predict_proba(self):
         """Test if the classifier can make probability predictions"""
         self.model.fit(self.X, self.y)
         proba = self.model.predict_proba(self.X)
-        self.assertEqual(proba.shape[0], len(np.unique(self.y)), 
+        self.assertEqual(proba.shape[0], len(np.unique(self.y)),
                         "Probability predictions should match number of classes")
-        self.assertTrue(np.allclose(np.sum(proba, axis=0), 1.0), 
+        self.assertTrue(np.allclose(np.sum(proba, axis=0), 1.0),
                        "Probabilities should sum to 1")
 
+    def test_multi_output(self):
+        """Test if a single multi-output booster gives valid class probabilities"""
+        model = BoosterClassifier(base_estimator="rust_extratree", n_estimators=10,
+                                  random_state=42, multi_output=True)
+        proba = model.fit(self.X, self.y).predict_proba(self.X)
+        self.assertEqual(len(model.boosters_), 1)
+        self.assertEqual(proba.shape, (3, len(self.y)))
+        self.assertTrue(np.allclose(np.sum(proba, axis=0), 1.0))
+        self.assertGreater(np.mean(model.predict(self.X) == self.y), 0.5)
+
+    def test_staged_predict_proba(self):
+        """Test if the last staged probabilities match predict_proba"""
+        for multi_output in [False, True]:
+            model = BoosterClassifier(base_estimator="rust_extratree", n_estimators=10,
+                                      multi_output=multi_output).fit(self.X, self.y)
+            staged = list(model.staged_predict_proba(self.X))
+            np.testing.assert_allclose(staged[-1], model.predict_proba(self.X))
+            np.testing.assert_array_equal(list(model.staged_predict(self.X))[-1], model.predict(self.X))
+
+    def test_subsample(self):
+        """Test if the classifier passes subsample to its boosters"""
+        model = BoosterClassifier(n_estimators=10, subsample=0.7).fit(self.X, self.y)
+        self.assertEqual(model.boosters_[0].subsample, 0.7)
+        self.assertGreater(model.score(self.X, self.y), 0.5)
+
+    def test_sparse_input(self):
+        """Test if the classifier fits on sparse inputs"""
+        X, y = classification_data(n_features=10, n_informative=5, n_redundant=2)
+        X_sparse = sparse_data(X, threshold=0.5)
+        clf = BoosterClassifier(base_estimator="rust_extratree", n_estimators=10).fit(X_sparse, y)
+        np.testing.assert_array_equal(clf.predict(X_sparse), clf.predict(X_sparse.toarray()))
+
+    def test_memory_usage(self):
+        """Test if classifiers sum the usage of their boosters"""
+        clf = BoosterClassifier(base_estimator="rust_extratree", n_estimators=5).fit(self.X, self.y)
+        usages = [booster.memory_usage() for booster in clf.boosters_]
+        self.assertEqual(clf.memory_usage()["total"], sum(usage["total"] for usage in usages))
+        bagging = RandomBagClassifier(base_estimator="rust_extratree", n_estimators=5).fit(self.X, self.y)
+        self.assertEqual(len(bagging.memory_usage()["learners"]), 3 * 5)
+
+class TestRandomBagRegressor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.X, cls.y = regression_data()
+
+    def _fit_predict(self, base_estimator, n_jobs, **kwargs):
+        model = RandomBagRegressor(base_estimator=base_estimator, n_estimators=10,
+                                   random_state=42, n_jobs=n_jobs, **kwargs)
+        return model.fit(self.X, self.y).predict(self.X)
+
+    def test_n_jobs_native(self):
+        """Test if parallel bagging with native trees is identical to sequential bagging"""
+        np.testing.assert_array_equal(self._fit_predict("rust_extratree", 4),
+                                      self._fit_predict("rust_extratree", None))
+
+    def test_n_jobs_dropout(self):
+        """Test if stages fitted in a shared input buffer do not depend on the worker split"""
+        for direct_link in [True, False]:
+            predictions = [self._fit_predict("rust_extratree", n_jobs, direct_link=direct_link, dropout=0.2)
+                           for n_jobs in [1, 3]]
+            np.testing.assert_array_equal(predictions[0], predictions[1])
+
+    def test_n_jobs_sklearn(self):
+        """Test if parallel bagging with sklearn learners is identical to sequential bagging"""
+        base_estimator = ExtraTreeRegressor(random_state=42)
+        np.testing.assert_array_equal(self._fit_predict(base_estimator, -1),
+                                      self._fit_predict(base_estimator, 1))
+
+    def test_stacked_matches_per_stage(self):
+        """Test if predictions from the stacked hidden layer match the stage-by-stage ones"""
+        for direct_link in [True, False]:
+            model = RandomBagRegressor(base_estimator=Ridge(), n_estimators=10,
+                                       direct_link=direct_link).fit(self.X, self.y)
+            for X in [self.X, regression_data(n_samples=20000)[0]]:
+                preds = model.predict(X)
+                # Exported models compute the hidden features one stage at a time
+                np.testing.assert_allclose(predict_bundle(export_model(model), X), preds,
+                                           rtol=1e-8, atol=1e-8)
+                np.testing.assert_allclose(np.concatenate([model.predict(X[:30]),
+                                                           model.predict(X[30:])]), preds)
+
+    def test_compile(self):
+        """Test if compiled linear ensembles predict like the stage-by-stage models"""
+        model = RandomBagRegressor(base_estimator=Ridge(), n_estimators=5).fit(self.X, self.y)
+        expected = model.predict(self.X)
+        np.testing.assert_allclose(model.compile().predict(self.X), expected, rtol=1e-8, atol=1e-8)
+
+    def test_float32(self):
+        """Test if float32 models predict like float64 ones with linear base learners"""
+        preds64 = RandomBagRegressor(base_estimator=Ridge(), n_estimators=5).fit(self.X, self.y).predict(self.X)
+        model32 = RandomBagRegressor(base_estimator=Ridge(), n_estimators=5, dtype=np.float32).fit(self.X, self.y)
+        preds32 = model32.predict(self.X)
+        self.assertEqual(preds32.dtype, np.float64)
+        np.testing.assert_allclose(preds32, preds64, rtol=1e-3, atol=1e-2)
+
+    def test_colsample(self):
+        """Test if stages fitted on column subsets fit and store their columns"""
+        X, y = regression_data(n_features=10, n_informative=8)
+        model = RandomBagRegressor(base_estimator="rust_extratree", n_estimators=10, colsample=0.5).fit(X, y)
+        self.assertGreater(model.score(X, y), 0.5)
+        self.assertEqual(model.booster_.export()["columns"].shape[1], 5)
+        self.assertEqual(model.booster_.export()["weights"].shape[0], 5)
+
+    def test_sparse_input(self):
+        """Test if sparse inputs match their dense predictions"""
+        X, y = regression_data(n_features=20)
+        X_sparse = sparse_data(X)
+        model = RandomBagRegressor(base_estimator="rust_extratree", n_estimators=10).fit(X_sparse, y)
+        self.assertFalse(model.scaler_.with_mean)
+        preds = model.predict(X_sparse)
+        np.testing.assert_allclose(model.predict(X_sparse.toarray()), preds, rtol=1e-8, atol=1e-8)
+        self.assertGreater(model.score(X_sparse, y), 0.5)
+
+    def test_compact_weights(self):
+        """Test if compact and packed bagging models predict with the weights they were fitted with"""
+        X, y = regression_data(n_features=50)
+        for params in [{"compact_weights": True}, {"weights_distribution": "sign"},
+                       {"weights_distribution": "int8"}]:
+            model = RandomBagRegressor(base_estimator=Ridge(), n_estimators=10, **params).fit(X, y)
+            np.testing.assert_allclose(predict_bundle(export_model(model), X), model.predict(X),
+                                       rtol=1e-8, atol=1e-8)
+
+    def test_structured_weights(self):
+        """Test if the structured weights are sparse or signed"""
+        X, y = regression_data(n_features=40)
+        for distribution, max_density in [("achlioptas", 0.45), ("very_sparse", 0.3), ("srht", 1.0)]:
+            model = RandomBagRegressor(base_estimator="rust_extratree", n_estimators=5, n_hidden_features=16,
+                                       weights_distribution=distribution).fit(X, y)
+            weights = model.booster_.export()["weights"]
+            self.assertLessEqual(np.mean(weights != 0), max_density)
+            self.assertEqual(len(np.unique(np.abs(weights[weights != 0]))), 1)
+
+    def test_fit_profile(self):
+        """Test if bagging records its stages, without training loss"""
+        model = RandomBagRegressor(base_estimator="rust_extratree", n_estimators=8, n_jobs=2,
+                                   profile=True).fit(self.X, self.y)
+        self.assertEqual(len(model.fit_profile_), 8)
+        self.assertTrue(np.all(model.fit_profile_["fit"] > 0))
+        self.assertTrue(np.all(np.isnan(model.fit_profile_["loss"])))
+
+class TestAdaBoostRegressor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.X, cls.y = regression_data()
+
+    def test_rust_extratree(self):
+        """Test if the native extra tree supports sample weights in AdaBoost"""
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=10, random_state=42)
+        predictions = model.fit(self.X, self.y).predict(self.X)
+        self.assertEqual(predictions.shape, self.y.shape)
+        self.assertGreater(model.score(self.X, self.y), 0.5)
+
+    def test_validation_early_stopping(self):
+        """Test if AdaBoost records one validation loss per fitted stage"""
+        X, y = regression_data(n_samples=200, noise=20.0)
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=50,
+                                  n_iter_no_change=5, relative_tolerance=True, random_state=42)
+        model.fit(X, y)
+        self.assertEqual(len(model.validation_loss_), model.n_estimators_)
+        self.assertTrue(np.all(np.isfinite(model.predict(X))))
+
+    def test_staged_predict(self):
+        """Test if the last staged prediction matches predict, with one prediction per stage"""
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=10,
+                                  random_state=42).fit(self.X, self.y)
+        staged = list(model.staged_predict(self.X))
+        self.assertEqual(len(staged), model.n_estimators_)
+        np.testing.assert_allclose(staged[-1], model.predict(self.X))
+
+    def test_float32(self):
+        """Test if native learners fit on float32 inputs"""
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=5,
+                                  dtype=np.float32).fit(self.X, self.y)
+        self.assertGreater(model.score(self.X, self.y), 0.5)
+
+    def test_float32_staged_predict(self):
+        """Test if float32 staged predictions end at predict, in the model's precision"""
+        X, y = regression_data(n_samples=2000)
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                  dtype=np.float32, random_state=42).fit(X, y)
+        staged = list(model.staged_predict(X))
+        eps = np.finfo(np.float32).eps
+        np.testing.assert_allclose(staged[-1], model.predict(X), rtol=eps, atol=eps * np.abs(y).max())
+
+    def test_subsample(self):
+        """Test if stages fitted on row subsamples differ from full fits and still fit"""
+        full = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=20,
+                                 random_state=42).fit(self.X, self.y)
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=20, subsample=0.5,
+                                  random_state=42).fit(self.X, self.y)
+        self.assertGreater(model.score(self.X, self.y), 0.5)
+        self.assertFalse(np.allclose(model.predict(self.X), full.predict(self.X)))
+        again = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=20, subsample=0.5,
+                                  random_state=42).fit(self.X, self.y)
+        np.testing.assert_array_equal(again.predict(self.X), model.predict(self.X))
+
+    def test_colsample(self):
+        """Test if stages fitted on column subsets fit and store their columns"""
+        X, y = regression_data(n_features=10, n_informative=8)
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=10, colsample=0.5).fit(X, y)
+        self.assertGreater(model.score(X, y), 0.5)
+        self.assertEqual(model.booster_.export()["columns"].shape[1], 5)
+        self.assertEqual(model.booster_.export()["weights"].shape[0], 5)
+
+    def test_sparse_input(self):
+        """Test if sparse inputs match their dense predictions"""
+        X, y = regression_data(n_features=20)
+        X_sparse = sparse_data(X)
+        model = AdaBoostRegressor(base_estimator=Ridge(), n_estimators=10).fit(X_sparse, y)
+        preds = model.predict(X_sparse)
+        np.testing.assert_allclose(model.predict(X_sparse.toarray()), preds, rtol=1e-8, atol=1e-8)
+        self.assertGreater(model.score(X_sparse, y), 0.5)
+
+    def test_weights_distributions(self):
+        """Test if compact, structured and packed weights predict like the exported weights"""
+        X, y = regression_data(n_features=40)
+        for kwargs in [{"compact_weights": True}, {"weights_distribution": "achlioptas"},
+                       {"weights_distribution": "very_sparse"}, {"weights_distribution": "srht"},
+                       {"weights_distribution": "sign"}, {"weights_distribution": "int8"}]:
+            model = AdaBoostRegressor(base_estimator=Ridge(), n_estimators=5, n_hidden_features=32,
+                                      colsample=0.5, **kwargs).fit(X, y)
+            preds = model.predict(X)
+            np.testing.assert_allclose(predict_bundle(export_model(model), X), preds, rtol=1e-8, atol=1e-8)
+            np.testing.assert_array_equal(pickle.loads(pickle.dumps(model)).predict(X), preds)
+
+    def test_fit_profile(self):
+        """Test if AdaBoost records its stages with their weighted loss"""
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=8, tolerance=0.0,
+                                  profile=True).fit(self.X, self.y)
+        self.assertEqual(len(model.fit_profile_), model.n_estimators_)
+        self.assertTrue(np.all((model.fit_profile_["loss"] >= 0) & (model.fit_profile_["loss"] <= 1)))
+
+    def test_memory_usage(self):
+        """Test if the byte breakdown counts the alphas and stage columns"""
+        X, y = regression_data(n_samples=200, n_features=10)
+        model = AdaBoostRegressor(base_estimator="rust_extratree", n_estimators=5, colsample=0.5,
+                                  tolerance=0.0).fit(X, y)
+        usage = model.memory_usage()
+        self.assertEqual(usage["alphas"], 8 * model.n_estimators_)
+        self.assertEqual(usage["columns"], 8 * 5 * model.n_estimators_)
+
+class TestPersistence(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.X, cls.y = regression_data()
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "model.bin")
+
+    def test_pickle(self):
+        """Test if pickled regressors predict like the originals"""
+        for model in [BoosterRegressor(base_estimator="rust_extratree", n_estimators=10),
+                      BoosterRegressor(n_estimators=5),
+                      AdaBoostRegressor(n_estimators=5)]:
+            model.fit(self.X, self.y)
+            loaded = pickle.loads(pickle.dumps(model))
+            np.testing.assert_array_equal(loaded.predict(self.X), model.predict(self.X))
+
+    def test_save_load(self):
+        """Test if saved models predict the same, with or without memory mapping"""
+        from genbooster.persistence import save_model, load_model
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=10).fit(self.X, self.y)
+        save_model(model, self.path)
+        for mmap in [True, False]:
+            loaded = load_model(self.path, mmap=mmap)
+            np.testing.assert_array_equal(loaded.predict(self.X), model.predict(self.X))
+            staged = list(loaded.staged_predict(self.X))
+            np.testing.assert_allclose(staged[-1], model.predict(self.X))
+
+    def test_save_load_bagging(self):
+        """Test if saved bagging models with linfa base learners predict the same"""
+        model = RandomBagRegressor(base_estimator=LinfaRegressor("LinearRegression"),
+                                   n_estimators=5).fit(self.X, self.y)
+        from genbooster.rust_core import load_model
+        model.booster_.save(self.path)
+        booster, metadata = load_model(self.path)
+        np.testing.assert_allclose(booster.predict_bagging(model.scaler_.transform(self.X)) + model.y_mean_,
+                                   model.predict(self.X))
+        self.assertEqual(metadata, b"")
+
+    def test_invalid_file(self):
+        """Test if files that are not models are rejected"""
+        from genbooster.persistence import load_model
+        with open(self.path, "wb") as f:
+            f.write(b"not a model")
+        with self.assertRaises(ValueError):
+            load_model(self.path)
+
+    def test_invalid_columns(self):
+        """Test if files with stage columns outside of the inputs are rejected"""
+        from genbooster.persistence import save_model, load_model
+        model = BoosterRegressor(base_estimator="rust_extratree", n_estimators=3,
+                                 colsample=0.5).fit(self.X, self.y)
+        save_model(model, self.path)
+        columns = export_model(model)["columns"].astype("<i8")
+        block = np.int64(columns.size).astype("<i8").tobytes() + columns.tobytes()
+        corrupted = columns.copy()
+        corrupted.flat[0] = self.X.shape[1]
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertEqual(data.count(block), 1)
+        with open(self.path, "wb") as f:
+            f.write(data.replace(block, block[:8] + corrupted.tobytes()))
+        with self.assertRaises(ValueError):
+            load_model(self.path)
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.X, cls.y = regression_data()
+
+    def test_numpy_predictions(self):
+        """Test if exported models predict like the originals with NumPy only"""
+        for model in [BoosterRegressor(base_estimator="rust_extratree", n_estimators=10),
+                      BoosterRegressor(base_estimator=Ridge(), n_estimators=5),
+                      RandomBagRegressor(base_estimator=ExtraTreeRegressor(), n_estimators=5),
+                      AdaBoostRegressor(n_estimators=5)]:
+            model.fit(self.X, self.y)
+            bundle = export_model(model)
+            np.testing.assert_allclose(predict_bundle(bundle, self.X), model.predict(self.X))
+
+    def test_npz(self):
+        """Test if exported models can be saved and loaded as .npz"""
+        from genbooster import inference
+        model = BoosterRegressor(base_estimator=LinfaRegressor("LinearRegression"),
+                                 n_estimators=5).fit(self.X, self.y)
+        path = os.path.join(tempfile.mkdtemp(), "model.npz")
+        export_model(model, path)
+        np.testing.assert_allclose(inference.predict(inference.load_bundle(path), self.X),
+                                   model.predict(self.X))
+
+    def test_unsupported_learner(self):
+        """Test if base learners other than trees and linear models are rejected"""
+        model = BoosterRegressor(base_estimator=KNeighborsRegressor(), n_estimators=2).fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            export_model(model)
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()